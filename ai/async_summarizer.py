@@ -0,0 +1,234 @@
+"""
+Concurrent transcript summarization with the async OpenAI client
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ai.summarizer import (MAX_CONDENSE_ROUNDS, can_summarize, check_chunk_config, chunk_budget,
+                           chunk_cache_key, chunk_request, fit_notes, split_transcript,
+                           summary_cache_key, summary_request)
+from utils.cache import Cache
+from utils.helpers import safe_get
+
+
+class AsyncTranscriptSummarizer:
+    """Summarizes many transcripts concurrently using AsyncOpenAI
+    
+    At most `max_concurrency` episodes are worked on at once and every API
+    request is cancelled after `request_timeout` seconds. Summaries are
+    cached under the same keys as TranscriptSummarizer, so summaries made
+    by a batch run show up instantly in the menu and vice versa. Cache
+    fills take the same single-flight locks as Cache.get_or_compute, so
+    the menu and any number of batch runs never pay twice for the same
+    summary or chunk, even while it is still being generated.
+    
+    Long transcripts are summarized map-reduce style like in
+    TranscriptSummarizer. All API requests (single-shot, chunk and reduce)
+    share one limit of `max_concurrency` requests in flight across all
+    episodes.
+    """
+    
+    # Backoff while another process holds a summary's fill lock
+    LOCK_POLL_SECONDS = 0.05
+    LOCK_POLL_MAX_SECONDS = 1.0
+    
+    def __init__(self, config: Dict[str, Any], cache: Cache, client: Any = None,
+                 max_concurrency: Optional[int] = None, request_timeout: Optional[float] = None):
+        check_chunk_config(config)
+        self.config = config
+        self.cache = cache
+        self.logger = logging.getLogger(__name__)
+        self.max_concurrency = (max_concurrency if max_concurrency is not None
+                                else safe_get(config, 'openai', 'max_concurrency', default=4))
+        self.request_timeout = request_timeout or safe_get(config, 'openai', 'request_timeout', default=120)
+        
+        # Initialize OpenAI client (tests pass a stand-in)
+        if client is None:
+            try:
+                import openai
+                client = openai.AsyncOpenAI(
+                    api_key=safe_get(config, 'openai', 'api_key'),
+                    max_retries=3
+                )
+            except ImportError:
+                raise ImportError("OpenAI library not installed. Run: pip install openai")
+            except Exception as e:
+                raise Exception(f"Failed to initialize OpenAI client: {e}")
+        self.client = client
+        self._requests: Optional[asyncio.Semaphore] = None
+        self._requests_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flights: Dict[str, List[Any]] = {}
+        self._flights_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _request_slots(self) -> asyncio.Semaphore:
+        """Semaphore limiting API requests in flight, one per event loop"""
+        loop = asyncio.get_running_loop()
+        if self._requests_loop is not loop:
+            self._requests = asyncio.Semaphore(self.max_concurrency)
+            self._requests_loop = loop
+        return self._requests
+    
+    async def asummarize(self, transcript: str, episode_title: str = "") -> Optional[str]:
+        """Generate a 5-paragraph summary from transcript, reusing a cached one"""
+        if not can_summarize(transcript):
+            self.logger.warning("Transcript too short or empty for summarization")
+            return None
+        
+        return await self._get_or_compute(
+            summary_cache_key(transcript), lambda: self._generate_summary(transcript, episode_title)
+        )
+    
+    async def _get_or_compute(self, key: str,
+                              compute: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """Async counterpart of Cache.get_or_compute, sharing its locks"""
+        loop = asyncio.get_running_loop()
+        # The cache does file I/O, so it is used from worker threads
+        value = await loop.run_in_executor(None, self.cache.get, key)
+        if value is not None:
+            return value
+        
+        async with self._single_flight(key):
+            # Another caller may have filled the key while we waited
+            value = await loop.run_in_executor(None, self.cache.get, key)
+            if value is None:
+                value = await compute()
+                if value is not None:
+                    await loop.run_in_executor(None, self.cache.set, key, value)
+        return value
+    
+    @asynccontextmanager
+    async def _single_flight(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock Cache.single_flight(key) takes, without blocking a thread
+        
+        Tasks of this event loop queue on an asyncio.Lock per key; the one
+        at the front polls the cache's FileLock, so waiting for a fill by
+        another process never ties up an executor thread that the holder
+        may need to finish.
+        """
+        loop = asyncio.get_running_loop()
+        if self._flights_loop is not loop:
+            self._flights = {}
+            self._flights_loop = loop
+        flight = self._flights.setdefault(key, [asyncio.Lock(), 0])
+        flight[1] += 1
+        try:
+            async with flight[0]:
+                lock = self.cache.flight_lock(key)
+                delay = self.LOCK_POLL_SECONDS
+                while not lock.acquire(blocking=False):
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.LOCK_POLL_MAX_SECONDS)
+                try:
+                    yield
+                finally:
+                    lock.release()
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0:
+                del self._flights[key]
+    
+    async def _generate_summary(self, transcript: str, episode_title: str) -> Optional[str]:
+        """Summarize a transcript with the API, bypassing the summary cache
+        
+        Chunks of a long transcript are summarized concurrently and cached
+        one by one, then combined as in TranscriptSummarizer._generate_summary.
+        """
+        text, from_notes = transcript, False
+        budget = chunk_budget(self.config)
+        chunks = split_transcript(text, budget)
+        for _ in range(MAX_CONDENSE_ROUNDS):
+            if len(chunks) == 1:
+                break
+            notes = await self._summarize_chunks(chunks, episode_title, from_notes)
+            if notes is None:
+                return None
+            text, from_notes = "\n".join(notes), True
+            chunks = split_transcript(text, budget)
+        if len(chunks) > 1:
+            self.logger.warning(f"Notes still over {budget} tokens after {MAX_CONDENSE_ROUNDS} rounds; "
+                                f"truncating them")
+            text = fit_notes(notes, budget)
+        return await self._complete(summary_request(self.config, text, episode_title, from_notes))
+    
+    async def _summarize_chunks(self, chunks: List[str], episode_title: str,
+                                notes: bool) -> Optional[List[str]]:
+        """Notes on each chunk, in order; None if any chunk failed"""
+        async def summarize_chunk(part: int, chunk: str) -> Optional[str]:
+            request = chunk_request(self.config, chunk, part, len(chunks), episode_title, notes)
+            return await self._get_or_compute(chunk_cache_key(chunk), lambda: self._complete(request))
+        
+        results = await asyncio.gather(*(summarize_chunk(part, chunk)
+                                         for part, chunk in enumerate(chunks, 1)))
+        failed = sum(1 for result in results if result is None)
+        if failed:
+            self.logger.error(f"{failed} of {len(chunks)} transcript chunks failed to summarize")
+            return None
+        return list(results)
+    
+    async def _complete(self, request: Dict[str, Any]) -> Optional[str]:
+        """Run one chat completion, returning its text or None on error or timeout
+        
+        Every request waits for one of the `max_concurrency` request slots.
+        """
+        try:
+            async with self._request_slots():
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(**request),
+                    self.request_timeout
+                )
+            return response.choices[0].message.content.strip()
+        except asyncio.TimeoutError:
+            self.logger.error(f"Summary request timed out after {self.request_timeout}s")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error generating summary: {e}")
+            return None
+    
+    async def asummarize_many(self, episodes: Iterable[Any],
+                              transcript_of: Callable[[Any], Optional[str]],
+                              on_result: Optional[Callable[[Any, Optional[str]], None]] = None
+                              ) -> Dict[int, Optional[str]]:
+        """Summarize episodes concurrently, returning {episode id: summary or None}
+        
+        `transcript_of(episode)` loads an episode's transcript and runs in a
+        worker thread, inside the concurrency limit so only a bounded number
+        of transcripts is held at once. `on_result(episode, summary)` is
+        called as each episode finishes, in completion order; failed or
+        too-short episodes get None. Cancelling the caller cancels every
+        pending request.
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        results: Dict[int, Optional[str]] = {}
+        
+        async def run(episode: Any) -> None:
+            async with semaphore:
+                try:
+                    transcript = await loop.run_in_executor(None, transcript_of, episode)
+                    summary = await self.asummarize(transcript or "", episode.get('title') or "")
+                except Exception as e:
+                    self.logger.error(f"Error summarizing episode {episode.get('id')}: {e}")
+                    summary = None
+            results[episode['id']] = summary
+            if on_result:
+                on_result(episode, summary)
+        
+        tasks = [asyncio.ensure_future(run(episode)) for episode in episodes]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Cancelled (e.g. Ctrl-C) or on_result failed: stop the remaining work
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return results
+    
+    async def aclose(self) -> None:
+        """Close the API client's connections"""
+        close = getattr(self.client, 'close', None)
+        if close:
+            await close()
@@ -2,21 +2,225 @@
 AI-powered transcript summarization using OpenAI
 """
 
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
 from utils.cache import Cache
 from utils.helpers import safe_get
 
+SYSTEM_PROMPT = (
+    "You are a professional podcast summarizer. Create clear, engaging 5-paragraph summaries "
+    "that capture the key points and insights from podcast episodes."
+)
+
+
+def summary_cache_key(transcript: str) -> str:
+    """Cache key of a transcript's summary, shared by the sync and async summarizers"""
+    transcript_hash = hashlib.md5(transcript.encode()).hexdigest()
+    return f"summary_{transcript_hash}"
+
+
+def can_summarize(transcript: Optional[str]) -> bool:
+    """Check that a transcript is long enough to be worth summarizing"""
+    return bool(transcript) and len(transcript.strip()) >= 50
+
+
+# Rough size of a token in English text; keeps chunking free of a tokenizer dependency
+CHARS_PER_TOKEN = 4
+
+# Rounds of condensing notes before they are cut down to fit the final request
+MAX_CONDENSE_ROUNDS = 3
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+SUMMARY_INSTRUCTIONS = """The summary should:
+1. Start with an engaging introduction that captures the main topic
+2. Provide key insights and main points discussed
+3. Include important quotes or statements from speakers
+4. Cover the conclusions or takeaways
+5. End with a thoughtful reflection on the episode's significance"""
+
+
+def chunk_cache_key(chunk: str) -> str:
+    """Cache key of the notes taken on one chunk of a long transcript"""
+    return f"summary_chunk_{hashlib.md5(chunk.encode()).hexdigest()}"
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text`"""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def split_transcript(text: str, max_tokens: int) -> List[str]:
+    """Split text into chunks of about `max_tokens`, on line or sentence boundaries
+    
+    Lines (segments) and sentences are kept whole and packed greedily;
+    only a single sentence longer than the budget is cut, at a word
+    boundary. Text within the budget is returned as the only chunk.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text]
+    
+    pieces = []
+    for line in text.splitlines():
+        for sentence in _SENTENCE_END.split(line.strip()):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:].lstrip()
+            if sentence:
+                pieces.append(sentence)
+    
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if current and size + 1 + len(piece) > max_chars:
+            chunks.append(" ".join(current))
+            current, size = [], 0
+        size += len(piece) + (1 if current else 0)
+        current.append(piece)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def create_summary_prompt(transcript: str, episode_title: str) -> str:
+    """Create the prompt for summary generation"""
+    title_context = f"Episode: {episode_title}\n\n" if episode_title else ""
+    
+    prompt = f"""
+{title_context}Please create a comprehensive 5-paragraph summary of the following podcast transcript. 
+
+{SUMMARY_INSTRUCTIONS}
+
+Transcript:
+{transcript}
+
+Please format the summary as 5 distinct paragraphs with clear transitions between them.
+"""
+    return prompt
+
+
+def create_chunk_prompt(chunk: str, part: int, parts: int, episode_title: str, notes: bool = False) -> str:
+    """Create the prompt taking notes on one part of a long transcript (the map step)
+    
+    With `notes`, the part is itself notes on a transcript, being condensed
+    because they are too long to summarize in one request.
+    """
+    title_context = f"Episode: {episode_title}\n\n" if episode_title else ""
+    source = "notes on a podcast transcript" if notes else "a podcast transcript"
+    
+    prompt = f"""
+{title_context}Below is part {part} of {parts} of {source}. Write concise notes on this part only:
+the topics discussed, the key points and insights, and any notable quotes (verbatim, with the
+speaker if known). Do not add an introduction or conclusion.
+
+Part {part} of {parts}:
+{chunk}
+"""
+    return prompt
+
+
+def create_reduce_prompt(notes: str, episode_title: str) -> str:
+    """Create the prompt combining the notes on all parts into the summary (the reduce step)"""
+    title_context = f"Episode: {episode_title}\n\n" if episode_title else ""
+    
+    prompt = f"""
+{title_context}Please create a comprehensive 5-paragraph summary of a podcast episode from the
+following notes, which were taken on consecutive parts of its transcript and cover the whole
+episode from start to finish.
+
+{SUMMARY_INSTRUCTIONS}
+
+Notes:
+{notes}
+
+Please format the summary as 5 distinct paragraphs with clear transitions between them.
+"""
+    return prompt
+
+
+def summary_request(config: Dict[str, Any], transcript: str, episode_title: str = "",
+                    from_notes: bool = False) -> Dict[str, Any]:
+    """Arguments for the chat completions call producing the 5-paragraph summary
+    
+    `transcript` is the whole transcript, or with `from_notes` the joined
+    notes on its parts.
+    """
+    prompt = (create_reduce_prompt(transcript, episode_title) if from_notes
+              else create_summary_prompt(transcript, episode_title))
+    return {
+        'model': safe_get(config, 'openai', 'model', default='gpt-4'),
+        'messages': [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': safe_get(config, 'openai', 'max_tokens', default=1000),
+        'temperature': 0.7
+    }
+
+
+def chunk_request(config: Dict[str, Any], chunk: str, part: int, parts: int,
+                  episode_title: str = "", notes: bool = False) -> Dict[str, Any]:
+    """Arguments for the chat completions call taking notes on one chunk"""
+    return {
+        'model': safe_get(config, 'openai', 'model', default='gpt-4'),
+        'messages': [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": create_chunk_prompt(chunk, part, parts, episode_title, notes)}
+        ],
+        'max_tokens': safe_get(config, 'openai', 'chunk_summary_tokens', default=400),
+        'temperature': 0.3
+    }
+
+
+def chunk_budget(config: Dict[str, Any]) -> int:
+    """Tokens of transcript (or notes) sent in one request"""
+    return safe_get(config, 'openai', 'chunk_tokens', default=3000)
+
+
+def check_chunk_config(config: Dict[str, Any]) -> None:
+    """Raise ValueError unless notes on a chunk are under half the chunk budget
+    
+    Otherwise condensing the notes on two chunks need not fit them in one,
+    and long transcripts would never get down to a single request.
+    """
+    budget = chunk_budget(config)
+    notes = safe_get(config, 'openai', 'chunk_summary_tokens', default=400)
+    if not 0 < notes * 2 < budget:
+        raise ValueError(
+            f"openai.chunk_summary_tokens ({notes}) must be under half of openai.chunk_tokens ({budget})"
+        )
+
+
+def fit_notes(notes: List[str], max_tokens: int) -> str:
+    """Join notes, cutting each to an equal share of `max_tokens`
+    
+    Used when condensing gives up, so every part of the episode is still
+    represented in the final request.
+    """
+    share = max(max_tokens * CHARS_PER_TOKEN // len(notes) - 1, 1)
+    return "\n".join(note if len(note) <= share else note[:share + 1].rsplit(' ', 1)[0] for note in notes)
+
 
 class TranscriptSummarizer:
     """Handles transcript summarization using OpenAI API"""
     
-    def __init__(self, config: Dict[str, Any], cache: Cache):
+    def __init__(self, config: Dict[str, Any], cache: Cache, client: Any = None):
+        check_chunk_config(config)
         self.config = config
         self.cache = cache
         self.logger = logging.getLogger(__name__)
         
-        # Initialize OpenAI client
+        # Initialize OpenAI client (tests pass a stand-in)
+        if client is not None:
+            self.client = client
+            return
         try:
             import openai
             self.client = openai.OpenAI(
@@ -30,52 +234,68 @@ class TranscriptSummarizer:
     
     def summarize_transcript(self, transcript: str, episode_title: str = "") -> Optional[str]:
         """Generate a 5-paragraph summary from transcript"""
-        if not transcript or len(transcript.strip()) < 50:
+        if not can_summarize(transcript):
             self.logger.warning("Transcript too short or empty for summarization")
             return None
         
         # Create cache key based on transcript content
-        import hashlib
-        transcript_hash = hashlib.md5(transcript.encode()).hexdigest()
-        cache_key = f"summary_{transcript_hash}"
+        cache_key = summary_cache_key(transcript)
         
-        # Check cache first
-        cached_summary = self.cache.get(cache_key)
-        if cached_summary:
-            self.logger.info("Using cached summary")
-            return cached_summary
+        # Only one caller generates a missing summary; concurrent callers
+        # (including other processes) wait for it instead of paying for
+        # another API call
+        return self.cache.get_or_compute(
+            cache_key, lambda: self._generate_summary(transcript, episode_title)
+        )
+    
+    def _generate_summary(self, transcript: str, episode_title: str) -> Optional[str]:
+        """Summarize a transcript with the API, bypassing the summary cache
+        
+        Transcripts over the chunk budget are summarized map-reduce style:
+        notes are taken on each chunk in parallel (and cached per chunk, so
+        a retry after a failure only redoes the missing chunks), then
+        combined into the 5-paragraph summary. Notes that are still too
+        long are condensed the same way first, for up to
+        MAX_CONDENSE_ROUNDS rounds; after that they are cut to fit.
+        """
+        text, from_notes = transcript, False
+        budget = chunk_budget(self.config)
+        chunks = split_transcript(text, budget)
+        for _ in range(MAX_CONDENSE_ROUNDS):
+            if len(chunks) == 1:
+                break
+            notes = self._summarize_chunks(chunks, episode_title, from_notes)
+            if notes is None:
+                return None
+            text, from_notes = "\n".join(notes), True
+            chunks = split_transcript(text, budget)
+        if len(chunks) > 1:
+            self.logger.warning(f"Notes still over {budget} tokens after {MAX_CONDENSE_ROUNDS} rounds; "
+                                f"truncating them")
+            text = fit_notes(notes, budget)
+        return self._complete(summary_request(self.config, text, episode_title, from_notes))
+    
+    def _summarize_chunks(self, chunks: List[str], episode_title: str,
+                          notes: bool) -> Optional[List[str]]:
+        """Notes on each chunk, in order; None if any chunk failed"""
+        def summarize_chunk(part: int, chunk: str) -> Optional[str]:
+            request = chunk_request(self.config, chunk, part, len(chunks), episode_title, notes)
+            return self.cache.get_or_compute(chunk_cache_key(chunk), lambda: self._complete(request))
         
+        workers = safe_get(self.config, 'openai', 'max_concurrency', default=4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(summarize_chunk, range(1, len(chunks) + 1), chunks))
+        failed = sum(1 for result in results if result is None)
+        if failed:
+            self.logger.error(f"{failed} of {len(chunks)} transcript chunks failed to summarize")
+            return None
+        return results
+    
+    def _complete(self, request: Dict[str, Any]) -> Optional[str]:
+        """Run one chat completion, returning its text or None on error"""
         try:
-            # Prepare the prompt for 5-paragraph summary
-            prompt = self._create_summary_prompt(transcript, episode_title)
-            
-            # Get model configuration
-            model = safe_get(self.config, 'openai', 'model', default='gpt-4')
-            max_tokens = safe_get(self.config, 'openai', 'max_tokens', default=1000)
-            
-            # Generate summary
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a professional podcast summarizer. Create clear, engaging 5-paragraph summaries that capture the key points and insights from podcast episodes."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=max_tokens,
-                temperature=0.7
-            )
-            
-            summary = response.choices[0].message.content.strip()
-            
-            # Cache the summary
-            self.cache.set(cache_key, summary)
-            
-            return summary
+            response = self.client.chat.completions.create(**request)
+            return response.choices[0].message.content.strip()
             
         except Exception as e:
             self.logger.error(f"Error generating summary: {e}")
@@ -83,24 +303,7 @@ class TranscriptSummarizer:
     
     def _create_summary_prompt(self, transcript: str, episode_title: str) -> str:
         """Create the prompt for summary generation"""
-        title_context = f"Episode: {episode_title}\n\n" if episode_title else ""
-        
-        prompt = f"""
-{title_context}Please create a comprehensive 5-paragraph summary of the following podcast transcript. 
-
-The summary should:
-1. Start with an engaging introduction that captures the main topic
-2. Provide key insights and main points discussed
-3. Include important quotes or statements from speakers
-4. Cover the conclusions or takeaways
-5. End with a thoughtful reflection on the episode's significance
-
-Transcript:
-{transcript[:8000]}  # Limit transcript length to avoid token limits
-
-Please format the summary as 5 distinct paragraphs with clear transitions between them.
-"""
-        return prompt
+        return create_summary_prompt(transcript, episode_title)
     
     def test_connection(self) -> bool:
         """Test the OpenAI API connection"""
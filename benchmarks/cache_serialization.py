@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: cache record envelope vs. the original pickle format
+
+Compares encode/decode time and record size for payloads shaped like the
+ones the app caches (subscription list, episode list, transcript, summary).
+
+Run: python benchmarks/cache_serialization.py
+"""
+
+import pickle
+import sys
+import time
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from utils.cache_format import decode_record, encode_record, read_created_at
+
+
+def sample_payloads():
+    """Build payloads resembling real cache entries"""
+    subscriptions = [
+        {
+            'id': i,
+            'title': f"Podcast {i}",
+            'author': f"Author {i}",
+            'description': "A show about things. " * 10,
+            'feed_url': f"https://example.com/feed/{i}.xml",
+            'artwork_url': f"https://example.com/art/{i}.jpg",
+            'episode_count': i * 3
+        }
+        for i in range(200)
+    ]
+    episodes = [
+        {
+            'id': i,
+            'title': f"Episode {i}",
+            'description': "In this episode we discuss. " * 8,
+            'pub_date': "2025-07-01",
+            'duration': 3600.0 + i,
+            'has_transcript': True,
+            'duration_formatted': "1.00h",
+            'pub_date_formatted': "2025-07-01",
+            'title_display': f"Episode {i}",
+            'description_display': "In this episode we discuss...",
+        }
+        for i in range(10)
+    ]
+    transcript = "So today we are talking about sleep and energy in the mornings. " * 3000
+    summary = "This episode explores the science of sleep. " * 60
+    return {
+        'subscriptions': subscriptions,
+        'episodes': episodes,
+        'transcript': transcript,
+        'summary': summary,
+    }
+
+
+def pickle_encode(value):
+    """The format used before the envelope: a pickled dict with a datetime"""
+    return pickle.dumps({'data': value, 'timestamp': datetime.now()})
+
+
+def pickle_decode(raw):
+    cached_data = pickle.loads(raw)
+    return cached_data['timestamp'], cached_data['data']
+
+
+def bench(func, number):
+    """Best-of-5 time per call in microseconds"""
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    print(f"{'payload':<14}{'format':<18}{'size':>10}{'encode us':>12}{'decode us':>12}{'expiry us':>12}")
+    print("-" * 78)
+    
+    for name, value in sample_payloads().items():
+        number = 20 if name == 'transcript' else 200
+        
+        old = pickle_encode(value)
+        rows = [(
+            "pickle (old)", len(old),
+            bench(lambda: pickle_encode(value), number),
+            bench(lambda: pickle_decode(old), number),
+            # The old format has to unpickle everything to see the timestamp
+            bench(lambda: pickle_decode(old)[0], number),
+        )]
+        
+        for label, compression in (("envelope", None), ("envelope+zlib", "zlib")):
+            now = time.time()
+            record, _ = encode_record(value, now, compression, 6, 8 * 1024)
+            rows.append((
+                label, len(record),
+                bench(lambda: encode_record(value, now, compression, 6, 8 * 1024), number),
+                bench(lambda: decode_record(record), number),
+                bench(lambda: read_created_at(record), number),
+            ))
+        
+        for label, size, encode_us, decode_us, expiry_us in rows:
+            print(f"{name:<14}{label:<18}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}{expiry_us:>12.2f}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
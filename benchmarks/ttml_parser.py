@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: streaming TTML parser vs. the regex tag stripper
+
+Generates a synthetic Podcasts app transcript (word-level spans, speaker
+agents) of a given length and compares wall time and peak Python memory
+of PodcastDatabase._extract_text_from_ttml and ttml_parser.iter_segments.
+
+Run: python benchmarks/ttml_parser.py [hours]
+"""
+
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to the Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from data.podcast_db import PodcastDatabase
+from data.ttml_parser import iter_segments, segments_to_text
+
+WORDS = "so today we are talking about sleep and energy in the mornings".split()
+
+
+def write_sample(path: Path, hours: float) -> None:
+    """Write a TTML file with one ~6 second paragraph of 12 words per step"""
+    paragraphs = int(hours * 3600 / 6)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<tt xmlns="http://www.w3.org/ns/ttml" '
+                'xmlns:ttm="http://www.w3.org/ns/ttml#metadata" '
+                'xmlns:podcasts="http://podcasts.apple.com/transcript-ttml-internal">'
+                '<body><div>\n')
+        for i in range(paragraphs):
+            begin = i * 6.0
+            f.write(f'<p begin="{begin:.3f}" end="{begin + 6:.3f}" ttm:agent="SPEAKER_{i % 2 + 1}">'
+                    '<span podcasts:unit="sentence">')
+            for j, word in enumerate(WORDS):
+                start = begin + j * 0.5
+                f.write(f'<span podcasts:unit="word" begin="{start:.3f}" end="{start + 0.5:.3f}">{word}</span> ')
+            f.write('</span></p>\n')
+        f.write('</div></body></tt>\n')
+
+
+def measure(func):
+    """Run func once, returning (result, seconds, peak MB)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+
+def main():
+    hours = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+    db = PodcastDatabase(":memory:")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "transcript.ttml"
+        write_sample(path, hours)
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"Sample: {hours:g}h episode, {size_mb:.1f} MB TTML\n")
+        
+        def regex_path():
+            with open(path, 'r', encoding='utf-8') as f:
+                return db._extract_text_from_ttml(f.read())
+        
+        def count_segments():
+            return sum(1 for _ in iter_segments(str(path)))
+        
+        rows = [
+            ("regex (old)",) + measure(regex_path),
+            ("iterparse text",) + measure(lambda: segments_to_text(iter_segments(str(path)))),
+            ("iterparse stream",) + measure(count_segments),
+        ]
+    
+    print(f"{'parser':<20}{'seconds':>10}{'peak MB':>10}  result")
+    print("-" * 60)
+    for label, result, elapsed, peak in rows:
+        described = f"{len(result)} chars" if isinstance(result, str) else f"{result} segments"
+        print(f"{label:<20}{elapsed:>10.2f}{peak:>10.1f}  {described}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,15 +21,34 @@ def create_default_config(config_path: Path) -> None:
         "openai": {
             "api_key": "",
             "model": "gpt-4",
-            "max_tokens": 1000
+            "max_tokens": 1000,
+            "max_concurrency": 4,
+            "request_timeout": 120,
+            "chunk_tokens": 3000,
+            "chunk_summary_tokens": 400
         },
         "cache": {
             "enabled": True,
             "directory": "~/.cache/podcast-cli",
-            "max_age_hours": 24
+            "backend": "file",
+            "max_age_hours": 24,
+            "stale_after_hours": 1,
+            "max_size_mb": 500,
+            "eviction_policy": "lru",
+            "sweep_interval_minutes": 0,
+            "compression": "zlib",
+            "compression_level": 6,
+            "compression_threshold_kb": 8,
+            "memory_max_entries": 256,
+            "memory_max_mb": 32
         },
         "podcast_app": {
-            "database_path": "~/Library/Group Containers/243LU875E5.groups.com.apple.podcasts/Documents/MTLibrary.sqlite"
+            "database_path": "~/Library/Group Containers/243LU875E5.groups.com.apple.podcasts/Documents/MTLibrary.sqlite",
+            "immutable": False,
+            "cached_statements": 64,
+            "snapshot": False,
+            "snapshot_refresh_seconds": 60,
+            "incremental_sync": True
         },
         "save": {
             "directory": "~/Documents/podcast-summaries",
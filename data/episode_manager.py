@@ -3,80 +3,201 @@ Episode management for Podcast CLI
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from datetime import datetime
 from utils.cache import Cache
-from utils.helpers import format_duration, truncate_text
+from utils.helpers import expand_path, format_duration, truncate_text
 from data.podcast_db import PodcastDatabase
+from data.library_sync import LibrarySync
+from data.models import Episode, Podcast
+from data.segment_index import SegmentIndex
+from data.transcript_search import TranscriptSearchIndex
+from data.ttml_parser import Segment
 
 
 class EpisodeManager:
-    """Manages episode data and operations"""
+    """Manages episode data and operations
     
-    def __init__(self, podcast_db: PodcastDatabase, cache: Cache):
+    With a LibrarySync, subscriptions and episode lists are loaded from the
+    incrementally synced local mirror rather than the library; either way
+    they are cached with stale-while-revalidate, so the mirror is synced
+    when a listing is (re)loaded. Searches, which can run on every
+    keystroke, sync it at most once per SEARCH_SYNC_SECONDS.
+    """
+    
+    SEARCH_SYNC_SECONDS = 30
+    
+    def __init__(self, podcast_db: PodcastDatabase, cache: Cache,
+                 library_sync: Optional[LibrarySync] = None,
+                 transcript_search: Optional[TranscriptSearchIndex] = None):
         self.podcast_db = podcast_db
         self.cache = cache
+        self.library_sync = library_sync
+        self.transcript_search = transcript_search
         self.logger = logging.getLogger(__name__)
     
     def get_subscriptions(self) -> List[Dict[str, Any]]:
-        """Get all podcast subscriptions with caching"""
-        cache_key = "subscriptions"
-        cached_data = self.cache.get(cache_key)
-        
-        if cached_data:
-            return cached_data
+        """Get all podcast subscriptions with caching
         
+        Once cached, a stale list is returned immediately and refreshed in
+        the background (see Cache.get_or_compute).
+        """
         try:
-            subscriptions = self.podcast_db.get_subscriptions()
-            self.cache.set(cache_key, subscriptions)
-            return subscriptions
+            return self.cache.get_or_compute(
+                "subscriptions", self._load_subscriptions,
+                stale_while_revalidate=True
+            )
         except Exception as e:
             self.logger.error(f"Error getting subscriptions: {e}")
             raise
     
+    def _load_subscriptions(self) -> List[Podcast]:
+        """Query subscriptions, from the synced mirror when there is one"""
+        if self.library_sync:
+            self.library_sync.sync()
+            return self.library_sync.get_subscriptions()
+        return self.podcast_db.get_subscriptions()
+    
     def get_episodes(self, podcast_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get episodes for a podcast with caching (limited to 10 most recent by default)"""
-        cache_key = f"episodes_{podcast_id}_{limit}"
-        cached_data = self.cache.get(cache_key)
-        
-        if cached_data:
-            return cached_data
+        """Get the most recent episodes for a podcast with caching"""
+        return self.get_episodes_page(podcast_id, limit)['episodes']
+    
+    def get_episodes_page(self, podcast_id: int, limit: int = 10,
+                          before: Optional[Tuple[float, int]] = None,
+                          after: Optional[Tuple[float, int]] = None) -> Dict[str, Any]:
+        """Get one page of episodes for a podcast with caching
         
+        Returns {'episodes', 'next', 'previous'}, where next/previous are the
+        cursors to pass as `before`/`after` for the adjacent pages (None at
+        either end). Each page is cached under its own key.
+        """
         try:
-            # Always limit to 10 episodes for CLI display
-            episodes = self.podcast_db.get_episodes(podcast_id, limit=10)
-            
-            # Process and format episode data
-            formatted_episodes = []
-            for episode in episodes:
-                formatted_episode = self._format_episode(episode)
-                formatted_episodes.append(formatted_episode)
-            
-            self.cache.set(cache_key, formatted_episodes)
-            return formatted_episodes
+            key = f"episodes_page_{podcast_id}_{limit}"
+            if before is not None:
+                key += f"_before_{before[0]}_{before[1]}"
+            elif after is not None:
+                key += f"_after_{after[0]}_{after[1]}"
+            return self.cache.get_or_compute(
+                key,
+                lambda: self._load_episodes_page(podcast_id, limit, before, after),
+                stale_while_revalidate=True
+            )
         except Exception as e:
             self.logger.error(f"Error getting episodes: {e}")
             raise
     
+    def _load_episodes_page(self, podcast_id: int, limit: int,
+                            before: Optional[Tuple[float, int]] = None,
+                            after: Optional[Tuple[float, int]] = None) -> Dict[str, Any]:
+        """Query and format one page of episodes, bypassing the cache"""
+        if self.library_sync:
+            self.library_sync.sync()
+        source = self.library_sync or self.podcast_db
+        # One extra row tells whether there is another page in that direction
+        episodes = source.get_episodes(podcast_id, limit=limit + 1, before=before, after=after)
+        
+        more = len(episodes) > limit
+        if more:
+            episodes = episodes[1:] if after is not None else episodes[:limit]
+        
+        formatted_episodes = [self._format_episode(episode) for episode in episodes]
+        
+        has_older = more if after is None else True
+        has_newer = more if after is not None else before is not None
+        first, last = (episodes[0], episodes[-1]) if episodes else (None, None)
+        return {
+            'episodes': formatted_episodes,
+            'next': (last['pub_timestamp'], last['id']) if has_older and last else None,
+            'previous': (first['pub_timestamp'], first['id']) if has_newer and first else None
+        }
+    
     def get_episode_transcript(self, episode_id: int) -> Optional[str]:
         """Get transcript for an episode with caching"""
-        cache_key = f"transcript_{episode_id}"
-        cached_transcript = self.cache.get(cache_key)
+        try:
+            return self.cache.get_or_compute(
+                f"transcript_{episode_id}",
+                lambda: self.podcast_db.get_episode_transcript(episode_id) or None
+            )
+        except Exception as e:
+            self.logger.error(f"Error getting transcript: {e}")
+            return None
+    
+    def get_episode_transcripts(self, episode_ids: List[int],
+                                max_workers: int = 4) -> Iterator[Tuple[int, Optional[str]]]:
+        """Get transcripts for many episodes, yielding (episode_id, transcript)
         
-        if cached_transcript:
-            return cached_transcript
+        Cached transcripts are yielded first; the rest are fetched in bulk
+        (see PodcastDatabase.get_episode_transcripts) and cached as they arrive.
+        """
+        missing = []
+        for episode_id in episode_ids:
+            transcript = self.cache.get(f"transcript_{episode_id}")
+            if transcript is None:
+                missing.append(episode_id)
+            else:
+                yield episode_id, transcript
         
-        try:
-            transcript = self.podcast_db.get_episode_transcript(episode_id)
+        for episode_id, transcript in self.podcast_db.get_episode_transcripts(missing, max_workers):
             if transcript:
-                self.cache.set(cache_key, transcript)
-            return transcript
+                self.cache.set(f"transcript_{episode_id}", transcript)
+            yield episode_id, transcript
+    
+    def get_segment_index(self, episode_id: int) -> Optional[SegmentIndex]:
+        """Get the time index of an episode's transcript with caching
+        
+        Only episodes with a cached TTML transcript have timing; others
+        return None. An index cached in an older format is rebuilt.
+        """
+        key = f"segments_{episode_id}"
+        try:
+            data = self.cache.get_or_compute(key, lambda: self._build_segment_index(episode_id))
+            if not data:
+                return None
+            index = SegmentIndex.from_dict(data)
+            if index is None:
+                data = self._build_segment_index(episode_id)
+                if not data:
+                    return None
+                self.cache.set(key, data)
+                index = SegmentIndex.from_dict(data)
+            return index
         except Exception as e:
-            self.logger.error(f"Error getting transcript: {e}")
+            self.logger.error(f"Error getting transcript segments: {e}")
+            return None
+    
+    def _build_segment_index(self, episode_id: int) -> Optional[Dict[str, Any]]:
+        segments = self.podcast_db.get_episode_segments(episode_id)
+        return SegmentIndex.from_segments(segments).to_dict() if segments else None
+    
+    def get_transcript_range(self, episode_id: int, start_seconds: float,
+                             end_seconds: float) -> Optional[str]:
+        """Get what was said between two points of an episode, e.g. 42:00-45:00"""
+        index = self.get_segment_index(episode_id)
+        return index.text_between(start_seconds, end_seconds) if index else None
+    
+    def get_segments_between(self, episode_id: int, start_seconds: float,
+                             end_seconds: float) -> List[Segment]:
+        """Get the timed segments overlapping a time range of an episode"""
+        index = self.get_segment_index(episode_id)
+        return index.segments_between(start_seconds, end_seconds) if index else []
+    
+    def get_segment_at(self, episode_id: int, seconds: float) -> Optional[Segment]:
+        """Get the segment being spoken at a point of an episode"""
+        index = self.get_segment_index(episode_id)
+        if not index:
             return None
+        i = index.index_at(seconds)
+        return index.segment(i) if i is not None else None
     
-    def _format_episode(self, episode: Dict[str, Any]) -> Dict[str, Any]:
-        """Format episode data for display"""
+    def _format_episode(self, episode: Any) -> Any:
+        """Format episode data for display
+        
+        Episode records compute their display fields on access and are
+        returned as they are; plain dicts (cached by older versions) get
+        the fields added to a copy.
+        """
+        if isinstance(episode, Episode):
+            return episode
         formatted = episode.copy()
         
         # Format duration
@@ -107,32 +228,78 @@ class EpisodeManager:
         else:
             formatted['description_display'] = "No description available"
         
-        # Check if transcript is available (using new transcript fields)
-        has_transcript = bool(episode.get('entitled_transcript') or episode.get('free_transcript'))
+        # Listings compute has_transcript in SQL; older cached rows carry the snippets
+        has_transcript = episode.get('has_transcript')
+        if has_transcript is None:
+            has_transcript = bool(episode.get('entitled_transcript') or episode.get('free_transcript'))
         formatted['has_transcript'] = has_transcript
         
         return formatted
     
-    def search_podcasts(self, search_term: str) -> List[Dict[str, Any]]:
-        """Search podcasts by title or author"""
+    def search_podcasts(self, search_term: str, limit: int = 20) -> List[Podcast]:
+        """Search podcasts by title or author, best matches first
+        
+        With a LibrarySync this is a ranked, typo-tolerant trigram search
+        over the mirror, cheap enough to run on every keystroke; otherwise
+        the library is scanned with LIKE and the results are cached.
+        """
         try:
-            results = self.podcast_db.search_podcasts(search_term)
+            if self.library_sync:
+                self.library_sync.sync(self.SEARCH_SYNC_SECONDS)
+                results = self.library_sync.search_podcasts(search_term, limit)
+            else:
+                results = self.cache.get_or_compute(
+                    f"search_podcasts_{search_term.strip().lower()}",
+                    lambda: self.podcast_db.search_podcasts(search_term)[:limit]
+                )
             
-            # Format search results
-            formatted_results = []
-            for result in results:
-                formatted_result = result.copy()
-                if result.get('title'):
-                    formatted_result['title_display'] = truncate_text(result['title'], 50)
-                if result.get('author'):
-                    formatted_result['author_display'] = truncate_text(result['author'], 30)
-                formatted_results.append(formatted_result)
-            
-            return formatted_results
+            # Records carry title_display/author_display; older cached dicts do not
+            return [
+                result if isinstance(result, Podcast) else Podcast.from_dict(result)
+                for result in results
+            ]
         except Exception as e:
             self.logger.error(f"Error searching podcasts: {e}")
             raise
     
+    def search_episodes(self, search_term: str, limit: int = 20,
+                        podcast_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Search episodes with transcripts by title, best and most recent first
+        
+        Same strategy as search_podcasts; results are formatted like episodes
+        and carry the podcast title.
+        """
+        try:
+            if self.library_sync:
+                self.library_sync.sync(self.SEARCH_SYNC_SECONDS)
+                results = self.library_sync.search_episodes(search_term, limit, podcast_id)
+            else:
+                results = self.cache.get_or_compute(
+                    f"search_episodes_{podcast_id}_{limit}_{search_term.strip().lower()}",
+                    lambda: self.podcast_db.search_episodes(search_term, limit, podcast_id)
+                )
+            return [self._format_episode(result) for result in results]
+        except Exception as e:
+            self.logger.error(f"Error searching episodes: {e}")
+            raise
+    
+    def search_transcripts(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Search transcripts, most relevant first
+        
+        Searches what is indexed so far and never waits for indexing: the
+        full-text index is brought up to date in the background (only
+        changed episodes are re-indexed). Results are formatted like
+        episodes and carry the podcast title and a highlighted `snippet`.
+        """
+        if not self.transcript_search:
+            return []
+        try:
+            self.transcript_search.start_background_update()
+            return [self._format_episode(result) for result in self.transcript_search.search(query, limit)]
+        except Exception as e:
+            self.logger.error(f"Error searching transcripts: {e}")
+            raise
+    
     def get_episode_by_id(self, episode_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific episode by ID"""
         # This would require a new method in PodcastDatabase
@@ -149,5 +316,13 @@ class EpisodeManager:
         self.logger.info("Cache cleared")
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
-        return self.cache.get_stats() 
\ No newline at end of file
+        """Get cache statistics, including per-namespace hit ratios and latencies"""
+        return self.cache.get_stats()
+    
+    def dump_cache_stats(self, path: Optional[str] = None) -> str:
+        """Get cache statistics as JSON, optionally writing them to `path`"""
+        stats_json = self.cache.get_stats_json()
+        if path:
+            with open(expand_path(path), 'w') as f:
+                f.write(stats_json)
+        return stats_json 
\ No newline at end of file
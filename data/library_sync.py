@@ -0,0 +1,495 @@
+"""
+Incremental mirror of the Podcasts library in an app-owned SQLite store
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Sequence, Set, Tuple, Type
+
+from data.models import Episode, Podcast, Record
+from data.podcast_db import PodcastDatabase
+from data.queries import keyset_clause
+
+
+def trigrams(text: str) -> Set[str]:
+    """Three-character windows of each word of `text`"""
+    return {word[i:i + 3] for word in text.split() for i in range(len(word) - 2)}
+
+
+def supports_trigram(conn: sqlite3.Connection) -> bool:
+    """Whether this SQLite build has FTS5 with the trigram tokenizer (3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.trigram_probe USING fts5(text, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.trigram_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def trigram_query(term: str) -> str:
+    """FTS5 trigram query matching any trigram of `term`"""
+    return " OR ".join('"{}"'.format(gram.replace('"', '""')) for gram in sorted(trigrams(term)))
+
+
+class LibrarySync:
+    """Keeps podcasts and episodes mirrored in a local SQLite file
+    
+    A sync first compares `PRAGMA data_version` with the value seen last
+    time; if nothing was committed to the library since, it returns
+    immediately. data_version is only comparable on one connection, so
+    the first sync of a run compares the library file state stored by
+    the previous run's sync instead. Otherwise it diffs
+    the (Z_PK, Z_OPT) pairs of each table against the mirror and fetches
+    full rows only for the ones that were inserted or updated, so the cost
+    of a refresh follows the number of changes rather than the size of
+    the library.
+    
+    The mirror answers the same listing calls as PodcastDatabase
+    (`get_subscriptions`, `get_episodes`), without the transcript snippet
+    columns. Per-podcast transcript episode counts are kept materialized in
+    `podcast_stats` and only recomputed for podcasts whose episodes changed,
+    so listing subscriptions never groups over the episodes table.
+    
+    Podcast titles/authors and episode titles are also indexed in FTS5
+    trigram tables, kept in step with the mirror by triggers, for ranked
+    substring and typo-tolerant title search (`search_podcasts`,
+    `search_episodes`). SQLite older than 3.34 has no trigram tokenizer;
+    there candidates are found by LIKE over the mirror instead.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS podcasts (
+        id INTEGER PRIMARY KEY,
+        z_opt INTEGER,
+        title TEXT,
+        author TEXT,
+        description TEXT,
+        feed_url TEXT,
+        artwork_url TEXT
+    );
+    CREATE TABLE IF NOT EXISTS episodes (
+        id INTEGER PRIMARY KEY,
+        z_opt INTEGER,
+        podcast_id INTEGER,
+        title TEXT,
+        description TEXT,
+        pub_date REAL,
+        duration REAL,
+        asset_url TEXT,
+        transcript_identifier TEXT,
+        playback_position REAL,
+        playback_state INTEGER,
+        has_transcript INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_episodes_page
+        ON episodes(podcast_id, pub_date, id) WHERE has_transcript;
+    CREATE TABLE IF NOT EXISTS podcast_stats (
+        podcast_id INTEGER PRIMARY KEY,
+        episode_count INTEGER NOT NULL,
+        latest_pub_date REAL
+    );
+    CREATE TABLE IF NOT EXISTS sync_state (
+        name TEXT PRIMARY KEY,
+        value
+    );
+    """
+    
+    # Title search tables, created when SQLite has the FTS5 trigram tokenizer (3.34+)
+    SEARCH_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS podcast_search USING fts5(
+        title, author, content='podcasts', content_rowid='id', tokenize='trigram'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS episode_search USING fts5(
+        title, content='episodes', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER IF NOT EXISTS podcasts_search_insert AFTER INSERT ON podcasts BEGIN
+        INSERT INTO podcast_search (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END;
+    CREATE TRIGGER IF NOT EXISTS podcasts_search_delete AFTER DELETE ON podcasts BEGIN
+        INSERT INTO podcast_search (podcast_search, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+    END;
+    CREATE TRIGGER IF NOT EXISTS podcasts_search_update AFTER UPDATE ON podcasts BEGIN
+        INSERT INTO podcast_search (podcast_search, rowid, title, author)
+        VALUES ('delete', old.id, old.title, old.author);
+        INSERT INTO podcast_search (rowid, title, author) VALUES (new.id, new.title, new.author);
+    END;
+    CREATE TRIGGER IF NOT EXISTS episodes_search_insert AFTER INSERT ON episodes BEGIN
+        INSERT INTO episode_search (rowid, title) VALUES (new.id, new.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS episodes_search_delete AFTER DELETE ON episodes BEGIN
+        INSERT INTO episode_search (episode_search, rowid, title) VALUES ('delete', old.id, old.title);
+    END;
+    CREATE TRIGGER IF NOT EXISTS episodes_search_update AFTER UPDATE ON episodes BEGIN
+        INSERT INTO episode_search (episode_search, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO episode_search (rowid, title) VALUES (new.id, new.title);
+    END;
+    """
+    SEARCH_TRIGGERS = ('podcasts_search_insert', 'podcasts_search_delete', 'podcasts_search_update',
+                       'episodes_search_insert', 'episodes_search_delete', 'episodes_search_update')
+    
+    # Bumped when existing mirrors need migrating (see _migrate)
+    SCHEMA_VERSION = 3
+    
+    # Title search: candidates fetched from the trigram index, the share of a
+    # term's trigrams a title must contain, and the bonus for the newest date
+    SEARCH_CANDIDATES = 200
+    MIN_TRIGRAM_OVERLAP = 0.3
+    RECENCY_WEIGHT = 0.5
+    
+    PODCAST_COLUMNS = ('id', 'z_opt', 'title', 'author', 'description', 'feed_url', 'artwork_url')
+    EPISODE_COLUMNS = ('id', 'z_opt', 'podcast_id', 'title', 'description', 'pub_date', 'duration',
+                       'asset_url', 'transcript_identifier', 'playback_position', 'playback_state',
+                       'has_transcript')
+    
+    def __init__(self, podcast_db: PodcastDatabase, store_path: str):
+        self.podcast_db = podcast_db
+        self.store_path = Path(store_path).expanduser()
+        self.store_path.parent.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._last_version: Optional[Tuple[int, int]] = None
+        self._touched_podcasts: Set[int] = set()
+        self._last_check: Optional[float] = None
+        
+        self._conn = sqlite3.connect(str(self.store_path), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self.has_trigram = supports_trigram(self._conn)
+        if self.has_trigram:
+            existed = self._conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'podcast_search'"
+            ).fetchone()
+            self._conn.executescript(self.SEARCH_SCHEMA)
+            if not existed:
+                # Mirror filled while SQLite lacked the tokenizer
+                self._conn.execute("INSERT INTO podcast_search (podcast_search) VALUES ('rebuild')")
+                self._conn.execute("INSERT INTO episode_search (episode_search) VALUES ('rebuild')")
+        else:
+            self.logger.warning(
+                f"SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer; "
+                "title search falls back to LIKE"
+            )
+            # Left over from a newer SQLite, they would fail every write
+            for trigger in self.SEARCH_TRIGGERS:
+                self._conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        self._migrate()
+        
+        # Mirrors created before podcast_stats existed need a full build once
+        if 'stats_built' not in self.get_state():
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._refresh_podcast_stats(None)
+                    self._set_state('stats_built', time.time())
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+    
+    def _migrate(self) -> None:
+        """Bring a mirror written by an older version up to SCHEMA_VERSION"""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 2:
+            # Paging compares (pub_date, id) row values, which never match NULL
+            self._conn.execute("DROP INDEX IF EXISTS idx_episodes_listing")
+            self._conn.execute("UPDATE episodes SET pub_date = 0 WHERE pub_date IS NULL")
+        if version < 3 and self.has_trigram:
+            # Title search tables are filled by triggers from now on
+            self._conn.execute("INSERT INTO podcast_search (podcast_search) VALUES ('rebuild')")
+            self._conn.execute("INSERT INTO episode_search (episode_search) VALUES ('rebuild')")
+        self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+    
+    def sync(self, max_age_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """Bring the mirror up to date with the library
+        
+        With `max_age_seconds`, the library is not even checked if that was
+        done less than that long ago (for calls as frequent as keystrokes).
+        Returns counts of upserted and deleted rows per table.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (max_age_seconds is not None and self._last_check is not None
+                    and now - self._last_check < max_age_seconds):
+                return {'podcasts': (0, 0), 'episodes': (0, 0), 'skipped': True}
+            self._last_check = now
+            version = self.podcast_db.get_data_version()
+            if version == self._last_version:
+                return {'podcasts': (0, 0), 'episodes': (0, 0), 'skipped': True}
+            # Read before syncing, so a commit made meanwhile forces a sync next run
+            file_state = self.podcast_db.get_file_state()
+            if self._last_version is None and self.get_state().get('file_state') == file_state:
+                # Nothing committed since the last run's sync
+                self._last_version = version
+                return {'podcasts': (0, 0), 'episodes': (0, 0), 'skipped': True}
+            
+            started = time.monotonic()
+            result = {'skipped': False}
+            self._touched_podcasts = set()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result['podcasts'] = self._sync_table(
+                    'podcasts', self.PODCAST_COLUMNS, self.podcast_db.get_podcast_rows
+                )
+                result['episodes'] = self._sync_table(
+                    'episodes', self.EPISODE_COLUMNS, self.podcast_db.get_episode_rows
+                )
+                self._set_state('last_sync', time.time())
+                self._set_state('file_state', file_state)
+                self._on_synced(result)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            
+            self._last_version = version
+            changed = sum(sum(counts) for key, counts in result.items() if key != 'skipped')
+            if changed:
+                self.logger.info(
+                    f"Library sync applied {changed} changes in {time.monotonic() - started:.2f}s"
+                )
+            return result
+    
+    def _sync_table(self, table: str, columns: Tuple[str, ...], fetch_rows) -> Tuple[int, int]:
+        """Apply inserts, updates and deletes for one table; returns (upserted, deleted)"""
+        remote = self.podcast_db.get_row_versions(table)
+        local = dict(self._conn.execute(f"SELECT id, z_opt FROM {table}").fetchall())
+        
+        changed_ids = [pk for pk, opt in remote.items() if local.get(pk) != opt]
+        deleted_ids = [(pk,) for pk in local if pk not in remote]
+        
+        if table == 'episodes':
+            # Podcasts an episode belonged to before and after the change
+            self._touched_podcasts.update(
+                self._podcasts_of(changed_ids + [pk for pk, in deleted_ids])
+            )
+        
+        if changed_ids:
+            rows = fetch_rows(changed_ids)
+            if table == 'episodes':
+                self._touched_podcasts.update(row['podcast_id'] for row in rows)
+            placeholders = ", ".join("?" * len(columns))
+            # An upsert rather than INSERT OR REPLACE, so the search triggers see updates
+            updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+            self._conn.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                [tuple(row[column] for column in columns) for row in rows]
+            )
+        if deleted_ids:
+            self._conn.executemany(f"DELETE FROM {table} WHERE id = ?", deleted_ids)
+        
+        return len(changed_ids), len(deleted_ids)
+    
+    def _podcasts_of(self, episode_ids: List[int], chunk_size: int = 500) -> Set[int]:
+        """Podcast ids currently recorded in the mirror for the given episodes"""
+        podcast_ids = set()
+        for start in range(0, len(episode_ids), chunk_size):
+            chunk = episode_ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            podcast_ids.update(
+                row[0] for row in self._conn.execute(
+                    f"SELECT DISTINCT podcast_id FROM episodes WHERE id IN ({placeholders})", chunk
+                )
+            )
+        return podcast_ids
+    
+    def _on_synced(self, result: Dict[str, Any]) -> None:
+        """Hook for derived tables, called inside the sync transaction"""
+        if self._touched_podcasts:
+            self._refresh_podcast_stats(self._touched_podcasts)
+    
+    def _refresh_podcast_stats(self, podcast_ids: Optional[Set[int]], chunk_size: int = 500) -> None:
+        """Recompute podcast_stats rows for the given podcasts (all when None)
+        
+        Each podcast is answered from the partial paging index, so the cost
+        follows the number of touched podcasts, not the library size.
+        """
+        rebuild = """
+        INSERT INTO podcast_stats (podcast_id, episode_count, latest_pub_date)
+        SELECT podcast_id, COUNT(*), MAX(pub_date)
+        FROM episodes
+        WHERE has_transcript {condition}
+        GROUP BY podcast_id
+        """
+        if podcast_ids is None:
+            self._conn.execute("DELETE FROM podcast_stats")
+            self._conn.execute(rebuild.format(condition=""))
+            return
+        
+        ids = [pk for pk in podcast_ids if pk is not None]
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            placeholders = ", ".join("?" * len(chunk))
+            self._conn.execute(f"DELETE FROM podcast_stats WHERE podcast_id IN ({placeholders})", chunk)
+            self._conn.execute(
+                rebuild.format(condition=f"AND podcast_id IN ({placeholders})"), chunk
+            )
+    
+    def _set_state(self, name: str, value: Any) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)", (name, value)
+        )
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Get the stored sync bookkeeping (last_sync, file_state, stats_built)"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, value FROM sync_state").fetchall())
+    
+    def get_subscriptions(self) -> List[Podcast]:
+        """Get podcasts that have episodes with transcripts, from podcast_stats"""
+        query = """
+        SELECT podcasts.id, podcasts.title, podcasts.author, podcasts.description,
+               podcasts.feed_url, podcasts.artwork_url, podcast_stats.episode_count,
+               podcast_stats.latest_pub_date AS latest_pub_timestamp
+        FROM podcast_stats
+        INNER JOIN podcasts ON podcasts.id = podcast_stats.podcast_id
+        WHERE podcasts.title IS NOT NULL
+        ORDER BY podcasts.title
+        """
+        return self._fetch_records(Podcast, query)
+    
+    def get_episodes(self, podcast_id: int, limit: int = 10,
+                     before: Optional[Tuple[float, int]] = None,
+                     after: Optional[Tuple[float, int]] = None) -> List[Episode]:
+        """Get a page of episodes with transcripts for a podcast, from the mirror
+        
+        Same ordering and cursors as PodcastDatabase.get_episodes; each page
+        is a seek on the (podcast_id, pub_date, id) index.
+        """
+        cursor_condition, order, params = keyset_clause("pub_date", "id", before, after)
+        query = f"""
+        SELECT id, podcast_id, title, description, pub_date AS pub_timestamp, duration,
+               asset_url, playback_position, playback_state, has_transcript
+        FROM episodes
+        WHERE podcast_id = ? AND has_transcript
+        {cursor_condition}
+        ORDER BY {order}
+        LIMIT ?
+        """
+        episodes = self._fetch_records(Episode, query, (podcast_id, *params, limit))
+        if after:
+            episodes.reverse()
+        return episodes
+    
+    def search_podcasts(self, term: str, limit: int = 20) -> List[Podcast]:
+        """Search podcasts by title or author, best and most recently updated first
+        
+        Only podcasts with transcript episodes are returned, like
+        get_subscriptions. See `_rank` for matching and ranking.
+        """
+        candidates = self._candidates('podcast_search', 'podcasts', "title || ' ' || IFNULL(author, '')", term)
+        if not candidates:
+            return []
+        placeholders = ", ".join("?" * len(candidates))
+        query = f"""
+        SELECT podcasts.id, podcasts.title, podcasts.author, podcasts.description,
+               podcast_stats.latest_pub_date AS latest_pub_timestamp
+        FROM podcasts
+        INNER JOIN podcast_stats ON podcast_stats.podcast_id = podcasts.id
+        WHERE podcasts.id IN ({placeholders})
+        """
+        podcasts = self._fetch_records(Podcast, query, candidates)
+        ranked = self._rank(term, podcasts, lambda podcast: f"{podcast.title or ''} {podcast.author or ''}",
+                            lambda podcast: podcast.latest_pub_timestamp)
+        return ranked[:limit]
+    
+    def search_episodes(self, term: str, limit: int = 20,
+                        podcast_id: Optional[int] = None) -> List[Episode]:
+        """Search episodes with transcripts by title, best and most recent first"""
+        candidates = self._candidates('episode_search', 'episodes', "title", term)
+        if not candidates:
+            return []
+        placeholders = ", ".join("?" * len(candidates))
+        query = f"""
+        SELECT episodes.id, episodes.title, episodes.description, episodes.pub_date AS pub_timestamp,
+               episodes.duration, episodes.podcast_id, podcasts.title AS podcast_title,
+               episodes.has_transcript
+        FROM episodes
+        LEFT JOIN podcasts ON podcasts.id = episodes.podcast_id
+        WHERE episodes.id IN ({placeholders}) AND episodes.has_transcript
+        """
+        params = list(candidates)
+        if podcast_id is not None:
+            query += " AND episodes.podcast_id = ?"
+            params.append(podcast_id)
+        episodes = self._fetch_records(Episode, query, params)
+        ranked = self._rank(term, episodes, lambda episode: episode.title or "",
+                            lambda episode: episode.pub_timestamp)
+        return ranked[:limit]
+    
+    def _fetch_records(self, record_type: Type[Record], query: str, params: Sequence[Any] = ()) -> List[Any]:
+        """Run a query on the mirror, building `record_type` records from its rows"""
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.row_factory = record_type.row_factory()
+            cursor.execute(query, params)
+            return cursor.fetchall()
+    
+    def _candidates(self, fts_table: str, table: str, text_sql: str, term: str) -> List[int]:
+        """Ids of rows that may match `term`, best bm25 first
+        
+        Terms of three or more characters match any of their trigrams, so
+        substrings and misspellings still find candidates; shorter terms
+        fall back to a word-prefix LIKE over the mirror. Without the trigram
+        index, rows are ranked by how many of the trigrams LIKE finds.
+        """
+        term = term.strip().lower()
+        if not term:
+            return []
+        grams = trigram_query(term)
+        with self._lock:
+            if grams and not self.has_trigram:
+                patterns = [f"%{gram}%" for gram in sorted(trigrams(term))]
+                matches = " + ".join(f"(LOWER({text_sql}) LIKE ?)" for _ in patterns)
+                rows = self._conn.execute(
+                    f"SELECT id FROM {table} WHERE {matches} > 0 ORDER BY {matches} DESC LIMIT ?",
+                    (*patterns, *patterns, self.SEARCH_CANDIDATES)
+                ).fetchall()
+            elif grams:
+                rows = self._conn.execute(
+                    f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH ? ORDER BY rank LIMIT ?",
+                    (grams, self.SEARCH_CANDIDATES)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    f"SELECT id FROM {table} WHERE LOWER({text_sql}) LIKE ? OR LOWER({text_sql}) LIKE ? LIMIT ?",
+                    (f"{term}%", f"% {term}%", self.SEARCH_CANDIDATES)
+                ).fetchall()
+        return [row[0] for row in rows]
+    
+    def _rank(self, term: str, rows: List[Any], text_of, date_of) -> List[Any]:
+        """Order candidate rows by relevance to `term` and recency
+        
+        Relevance is the share of the term's trigrams found in the text
+        (rows below MIN_TRIGRAM_OVERLAP are dropped as noise), plus a bonus
+        when the text contains the term verbatim. The newest row gets an
+        extra RECENCY_WEIGHT, decaying over months.
+        """
+        term = term.strip().lower()
+        term_grams = trigrams(term)
+        dates = [date_of(row) or 0 for row in rows]
+        newest = max(dates, default=0)
+        
+        scored = []
+        for row, date in zip(rows, dates):
+            text = text_of(row).lower()
+            overlap = len(term_grams & trigrams(text)) / len(term_grams) if term_grams else 1.0
+            if overlap < self.MIN_TRIGRAM_OVERLAP:
+                continue
+            score = overlap + (1.0 if term in text else 0.0)
+            score += self.RECENCY_WEIGHT / (1 + (newest - date) / (86400 * 180))
+            scored.append((score, row))
+        
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [row for _, row in scored]
+    
+    def close(self) -> None:
+        """Close the mirror database"""
+        with self._lock:
+            self._conn.close()
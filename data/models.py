@@ -0,0 +1,174 @@
+"""
+Compact record types for podcasts and episodes
+"""
+
+import datetime
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from utils.helpers import format_duration, truncate_text
+
+logger = logging.getLogger(__name__)
+
+# The library's timestamps need this offset to convert to correct dates
+# (adding 978,244,620 seconds turns the stored 1994 dates into 2025)
+TIMESTAMP_OFFSET = 978244620
+
+
+def timestamp_to_date(timestamp: float) -> str:
+    """Convert a library timestamp to a YYYY-MM-DD date string"""
+    try:
+        date_obj = datetime.datetime.fromtimestamp(timestamp + TIMESTAMP_OFFSET)
+        return date_obj.strftime('%Y-%m-%d')
+    except Exception as e:
+        logger.error(f"Error converting timestamp {timestamp}: {e}")
+        return str(timestamp)  # Fallback to raw timestamp if conversion fails
+
+
+def date_to_timestamp(date: str) -> float:
+    """Convert a YYYY-MM-DD date (local midnight) to a library timestamp"""
+    return datetime.datetime.strptime(date, '%Y-%m-%d').timestamp() - TIMESTAMP_OFFSET
+
+
+class Record:
+    """Base for slotted, dict-compatible row records
+    
+    Subclasses list their stored fields in `__slots__` and any computed
+    (display) fields in `DERIVED`. Both can be read like dict keys, so
+    records can be passed wherever the app used plain row dicts
+    (`record['title']`, `record.get('title_display')`), while storing one
+    slot per column instead of a per-row dict.
+    """
+    
+    __slots__ = ()
+    DERIVED: Tuple[str, ...] = ()
+    
+    def __init__(self, *values: Any, **fields: Any):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+        for name in self.__slots__[len(values):]:
+            object.__setattr__(self, name, fields.pop(name, None))
+        if fields:
+            raise TypeError(f"Unknown {type(self).__name__} fields: {', '.join(fields)}")
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Record':
+        """Build a record from a row dict, ignoring keys that are not fields"""
+        return cls(*(data.get(name) for name in cls.__slots__))
+    
+    @classmethod
+    def row_factory(cls) -> Callable[[Any, tuple], 'Record']:
+        """A sqlite3 row_factory building records from columns named like fields
+        
+        Columns are matched to fields by name (use `AS` aliases); unmatched
+        fields are None. The mapping is worked out once per query.
+        """
+        cache = {'description': None, 'positions': ()}
+        
+        def factory(cursor, row):
+            description = cursor.description
+            if description is not cache['description']:
+                names = {column[0]: i for i, column in enumerate(description)}
+                cache['positions'] = tuple(names.get(name) for name in cls.__slots__)
+                cache['description'] = description
+            return cls(*(None if i is None else row[i] for i in cache['positions']))
+        
+        return factory
+    
+    def values(self) -> Tuple[Any, ...]:
+        """Stored field values, in slot order"""
+        return tuple(getattr(self, name) for name in self.__slots__)
+    
+    def keys(self) -> Tuple[str, ...]:
+        return self.__slots__ + self.DERIVED
+    
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return ((name, getattr(self, name)) for name in self.keys())
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ or key in self.DERIVED
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self:
+            return getattr(self, key)
+        raise KeyError(key)
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key) if key in self else default
+    
+    def copy(self) -> 'Record':
+        return type(self)(*self.values())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict of stored and derived fields"""
+        return dict(self.items())
+    
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.values() == other.values()
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(id={getattr(self, 'id', None)!r}, title={getattr(self, 'title', None)!r})"
+    
+    def __reduce__(self):
+        # Pickled as the class and a flat tuple of values, no per-field names
+        return (type(self), self.values())
+
+
+class Podcast(Record):
+    """A podcast subscription"""
+    
+    __slots__ = ('id', 'title', 'author', 'description', 'feed_url', 'artwork_url',
+                 'episode_count', 'latest_pub_timestamp')
+    DERIVED = ('latest_pub_date', 'title_display', 'author_display')
+    
+    @property
+    def latest_pub_date(self) -> Optional[str]:
+        return timestamp_to_date(self.latest_pub_timestamp) if self.latest_pub_timestamp else None
+    
+    @property
+    def title_display(self) -> Optional[str]:
+        return truncate_text(self.title, 50) if self.title else None
+    
+    @property
+    def author_display(self) -> Optional[str]:
+        return truncate_text(self.author, 30) if self.author else None
+
+
+class Episode(Record):
+    """An episode, with display fields computed on access"""
+    
+    __slots__ = ('id', 'podcast_id', 'title', 'description', 'pub_timestamp', 'duration',
+                 'asset_url', 'playback_position', 'playback_state', 'has_transcript',
+                 'podcast_title', 'snippet', 'rank', 'entitled_transcript', 'free_transcript')
+    DERIVED = ('pub_date', 'pub_date_formatted', 'duration_formatted', 'title_display',
+               'description_display')
+    
+    @property
+    def pub_date(self) -> Optional[str]:
+        return timestamp_to_date(self.pub_timestamp) if self.pub_timestamp else None
+    
+    @property
+    def pub_date_formatted(self) -> str:
+        return self.pub_date or "Unknown"
+    
+    @property
+    def duration_formatted(self) -> str:
+        return format_duration(self.duration) if self.duration else "Unknown"
+    
+    @property
+    def title_display(self) -> str:
+        return truncate_text(self.title, 60) if self.title else "Untitled"
+    
+    @property
+    def description_display(self) -> str:
+        return truncate_text(self.description, 100) if self.description else "No description available"
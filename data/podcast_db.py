@@ -2,76 +2,289 @@
 Podcast database interface for reading from macOS Podcast app
 """
 
+import os
 import sqlite3
 import logging
+import threading
+import weakref
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
 from datetime import datetime
+from urllib.parse import quote
+from data.models import Episode, Podcast, timestamp_to_date
+from data.queries import (TABLES, LibraryQueries, LibrarySchema, create_indexes, dict_factory,
+                          schema_key)
+from data.snapshot import LibrarySnapshot
+from data.ttml_index import TTMLIndex
+from data.ttml_parser import Segment, iter_segments, segments_to_text
 from utils.helpers import expand_path, safe_get
 
+# Where the Podcasts app caches downloaded TTML transcripts
+TTML_DIR = "~/Library/Group Containers/243LU875E5.groups.com.apple.podcasts/Library/Cache/Assets/TTML"
+
+
+class _ThreadConnection:
+    """Held in a thread's local storage; dropped, and finalized, when the thread exits"""
+
+
+def _discard_connection(lock: threading.Lock, connections: List[sqlite3.Connection],
+                        conn: sqlite3.Connection) -> None:
+    with lock:
+        if conn in connections:
+            connections.remove(conn)
+    conn.close()
+
 
 class PodcastDatabase:
-    """Interface to the macOS Podcast app database"""
+    """Interface to the macOS Podcast app database
+    
+    Each thread keeps one long-lived read-only connection, closed when the
+    thread exits. Before a connection is reused the database file is
+    stat'ed, and the connection is reopened if the file was replaced (or,
+    in immutable mode, changed at all), since SQLite would otherwise keep
+    reading the old inode.
+    
+    With `snapshot_dir` set, queries run against a LibrarySnapshot copy of
+    the library instead of the live file, opened in immutable mode.
     
-    def __init__(self, database_path: str):
-        self.database_path = expand_path(database_path)
+    Transcript files are located through a TTMLIndex of `ttml_dir`,
+    persisted at `ttml_index_path` when given.
+    
+    SQL comes from data.queries: the schema is introspected once per
+    schema version and the statements built for it are shared by all
+    connections. Snapshot copies also get the indexes it recommends.
+    """
+    
+    def __init__(self, database_path: str, immutable: bool = False,
+                 cached_statements: int = 64, snapshot_dir: Optional[str] = None,
+                 snapshot_refresh_seconds: float = 60, ttml_dir: str = TTML_DIR,
+                 ttml_index_path: Optional[str] = None):
+        self.source_path = expand_path(database_path)
+        self.snapshot = None
+        if snapshot_dir:
+            self.snapshot = LibrarySnapshot(self.source_path, expand_path(snapshot_dir),
+                                            snapshot_refresh_seconds, prepare=create_indexes)
+            self.database_path = self.snapshot.snapshot_path
+            immutable = True
+        else:
+            self.database_path = self.source_path
+        self.immutable = immutable
+        self.cached_statements = cached_statements
         self.logger = logging.getLogger(__name__)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._version_lock = threading.Lock()
+        self._version_conn: Optional[sqlite3.Connection] = None
+        self._version_signature: Optional[Tuple] = None
+        self._version_generation = 0
+        self._query_sets: Dict[Tuple, LibraryQueries] = {}
+        self.ttml_index = TTMLIndex(
+            expand_path(ttml_dir), expand_path(ttml_index_path) if ttml_index_path else None
+        )
     
-    def _get_connection(self) -> sqlite3.Connection:
-        """Get a connection to the podcast database"""
-        if not self.database_path.exists():
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], cache_dir: Path) -> "PodcastDatabase":
+        """Create a database from the podcast_app section of the app config
+        
+        The snapshot and TTML index are kept under `cache_dir`.
+        """
+        use_snapshot = safe_get(config, 'podcast_app', 'snapshot', default=False)
+        return cls(
+            safe_get(config, 'podcast_app', 'database_path'),
+            immutable=safe_get(config, 'podcast_app', 'immutable', default=False),
+            cached_statements=safe_get(config, 'podcast_app', 'cached_statements', default=64),
+            snapshot_dir=str(cache_dir / "snapshot") if use_snapshot else None,
+            snapshot_refresh_seconds=safe_get(config, 'podcast_app', 'snapshot_refresh_seconds', default=60),
+            ttml_index_path=str(cache_dir / "ttml_index.json")
+        )
+    
+    def _file_signature(self) -> Tuple:
+        """Identify the current database file; a change means reconnect"""
+        try:
+            st = os.stat(self.database_path)
+        except FileNotFoundError:
             raise FileNotFoundError(
                 f"Podcast database not found at {self.database_path}. "
                 "Make sure the Podcast app is installed and has been used."
             )
+        if self.immutable:
+            # SQLite assumes an immutable file never changes, so any write
+            # to it has to be picked up by reopening
+            return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        return (st.st_dev, st.st_ino)
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's read-only connection to the podcast database"""
+        if self.snapshot:
+            self.snapshot.refresh()
+        signature = self._file_signature()
+        conn = getattr(self._local, 'connection', None)
+        if conn is not None and self._local.signature == signature:
+            return conn
+        
+        if conn is not None:
+            self.logger.info("Podcast database file changed, reconnecting")
+            self._close_connection(conn)
+        
+        conn = self._open()
+        try:
+            queries = self._load_queries(conn)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        
+        self._local.connection = conn
+        self._local.queries = queries
+        self._local.signature = signature
+        # Short-lived threads (cache revalidation, indexing) must not leave
+        # their connection open, nor a snapshot file it still reads
+        self._local.holder = _ThreadConnection()
+        weakref.finalize(self._local.holder, _discard_connection,
+                         self._connections_lock, self._connections, conn)
+        with self._connections_lock:
+            self._connections.append(conn)
+        return conn
+    
+    def _open(self) -> sqlite3.Connection:
+        """Open a new read-only connection to the database file"""
+        uri = f"file:{quote(str(self.database_path))}?mode=ro"
+        if self.immutable:
+            uri += "&immutable=1"
+        return sqlite3.connect(uri, uri=True, cached_statements=self.cached_statements,
+                               check_same_thread=False)
+    
+    def _load_queries(self, conn: sqlite3.Connection) -> LibraryQueries:
+        """Statements for the connection's schema, introspecting it on first sight"""
+        key = schema_key(conn)
+        with self._connections_lock:
+            queries = self._query_sets.get(key)
+        if queries is None:
+            queries = LibraryQueries(LibrarySchema.introspect(conn))
+            with self._connections_lock:
+                self._query_sets[key] = queries
+        return queries
+    
+    def _queries(self) -> LibraryQueries:
+        """Statements for this thread's connection (after _get_connection)"""
+        return self._local.queries
+    
+    def _close_connection(self, conn: sqlite3.Connection) -> None:
+        _discard_connection(self._connections_lock, self._connections, conn)
+    
+    def close(self) -> None:
+        """Close the connections of all threads"""
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+    
+    # Core Data tables mirrored by LibrarySync, keyed by the mirror's table name
+    SYNC_TABLES = TABLES
+    
+    def get_data_version(self) -> Tuple[int, int]:
+        """Get (connection generation, PRAGMA data_version)
+        
+        data_version changes whenever another connection commits, but it
+        is only comparable between calls on the same connection. It is
+        therefore always read on one connection shared by every thread,
+        and the generation number changes whenever that connection is
+        reopened (the file was replaced or, in immutable mode, changed).
+        """
+        if self.snapshot:
+            self.snapshot.refresh()
+        signature = self._file_signature()
+        with self._version_lock:
+            if self._version_conn is None or self._version_signature != signature:
+                if self._version_conn is not None:
+                    self._version_conn.close()
+                self._version_conn = self._open()
+                self._version_signature = signature
+                self._version_generation += 1
+            version = self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+            return self._version_generation, version
+    
+    def get_file_state(self) -> str:
+        """Identify the database contents on disk, comparable across runs
         
-        return sqlite3.connect(str(self.database_path))
+        Built from the inode, size and mtime of the database file and its
+        WAL, which change with every commit; unlike data_version it can be
+        stored and compared after a restart.
+        """
+        parts = []
+        for path in (str(self.database_path), f"{self.database_path}-wal"):
+            try:
+                st = os.stat(path)
+                parts.append(f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}")
+            except FileNotFoundError:
+                parts.append("-")
+        return "/".join(parts)
+    
+    def get_row_versions(self, table: str) -> Dict[int, int]:
+        """Get {Z_PK: Z_OPT} for a mirrored table
+        
+        Core Data bumps Z_OPT on every update of a row, so comparing these
+        pairs finds inserted, updated and deleted rows without reading any
+        of the wide columns.
+        """
+        with self._get_connection() as conn:
+            cursor = conn.execute(self._queries().row_versions[table])
+            return dict(cursor.fetchall())
+    
+    def get_transcript_versions(self) -> Dict[int, int]:
+        """Get {Z_PK: Z_OPT} for episodes that have a transcript file or snippet"""
+        with self._get_connection() as conn:
+            cursor = conn.execute(self._queries().transcript_versions)
+            return dict(cursor.fetchall())
     
-    def get_subscriptions(self) -> List[Dict[str, Any]]:
+    def get_podcast_rows(self, podcast_ids: List[int], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """Get podcast rows by primary key, for mirroring"""
+        return self._fetch_in_chunks(lambda queries: queries.podcast_rows, podcast_ids, chunk_size,
+                                     row_factory=dict_factory)
+    
+    def get_episode_rows(self, episode_ids: List[int], chunk_size: int = 500) -> List[Dict[str, Any]]:
+        """Get episode rows by primary key, for mirroring
+        
+        Transcript snippets are reduced to a has_transcript flag in SQL so
+        the large JSON columns are never loaded.
+        """
+        rows = self._fetch_in_chunks(lambda queries: queries.episode_rows, episode_ids, chunk_size,
+                                     row_factory=dict_factory)
+        for row in rows:
+            row['has_transcript'] = bool(row['has_transcript'])
+        return rows
+    
+    def _fetch_in_chunks(self, query_of: Callable[[LibraryQueries], str], ids: List[int],
+                         chunk_size: int, row_factory: Optional[Callable] = None) -> List[Any]:
+        """Run an `IN ({placeholders})` query over ids in bounded chunks"""
+        rows = []
+        with self._get_connection() as conn:
+            query = query_of(self._queries())
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory
+            for start in range(0, len(ids), chunk_size):
+                chunk = ids[start:start + chunk_size]
+                placeholders = ", ".join("?" * len(chunk))
+                rows.extend(cursor.execute(query.format(placeholders=placeholders), chunk).fetchall())
+        return rows
+    
+    def get_subscriptions(self) -> List[Podcast]:
         """Get all podcast subscriptions that have episodes with transcripts"""
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Query to get podcast subscriptions that have episodes with transcripts
-                # Only include podcasts that actually have episodes with transcript snippets in the database
-                query = """
-                SELECT 
-                    ZMTPODCAST.Z_PK as podcast_id,
-                    ZMTPODCAST.ZTITLE as title,
-                    ZMTPODCAST.ZAUTHOR as author,
-                    ZMTPODCAST.ZITEMDESCRIPTION as description,
-                    ZMTPODCAST.ZFEEDURL as feed_url,
-                    ZMTPODCAST.ZIMAGEURL as artwork_url,
-                    COUNT(ZMTEPISODE.Z_PK) as episode_count
-                FROM ZMTPODCAST 
-                INNER JOIN ZMTEPISODE ON ZMTPODCAST.Z_PK = ZMTEPISODE.ZPODCAST
-                WHERE ZMTPODCAST.ZTITLE IS NOT NULL
-                AND (ZMTEPISODE.ZENTITLEDTRANSCRIPTSNIPPET IS NOT NULL 
-                     OR ZMTEPISODE.ZFREETRANSCRIPTSNIPPET IS NOT NULL)
-                GROUP BY ZMTPODCAST.Z_PK, ZMTPODCAST.ZTITLE, ZMTPODCAST.ZAUTHOR, 
-                         ZMTPODCAST.ZITEMDESCRIPTION, ZMTPODCAST.ZFEEDURL, ZMTPODCAST.ZIMAGEURL
-                HAVING COUNT(ZMTEPISODE.Z_PK) > 0
-                ORDER BY ZMTPODCAST.ZTITLE
-                """
-                
-                cursor.execute(query)
-                rows = cursor.fetchall()
-                
-                subscriptions = []
-                for row in rows:
-                    subscription = {
-                        'id': row[0],
-                        'title': row[1],
-                        'author': row[2],
-                        'description': row[3],
-                        'feed_url': row[4],
-                        'artwork_url': row[5],
-                        'episode_count': row[6]
-                    }
-                    subscriptions.append(subscription)
-                
-                return subscriptions
+                cursor.row_factory = Podcast.row_factory()
+                cursor.execute(self._queries().subscriptions)
+                return cursor.fetchall()
                 
         except sqlite3.Error as e:
             self.logger.error(f"Database error: {e}")
@@ -82,65 +295,35 @@ class PodcastDatabase:
     
     def _convert_timestamp_to_date(self, timestamp: int) -> str:
         """Convert podcast timestamp to correct date string"""
-        try:
-            import datetime
-            # The timestamps need an offset to convert to correct 2025 dates
-            # Based on analysis, adding 978,244,620 seconds converts 1994 dates to 2025
-            offset = 978244620
-            corrected_timestamp = timestamp + offset
-            date_obj = datetime.datetime.fromtimestamp(corrected_timestamp)
-            return date_obj.strftime('%Y-%m-%d')
-        except Exception as e:
-            self.logger.error(f"Error converting timestamp {timestamp}: {e}")
-            return str(timestamp)  # Fallback to raw timestamp if conversion fails
+        return timestamp_to_date(timestamp)
     
-    def get_episodes(self, podcast_id: int, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get episodes for a specific podcast (most recent 10 with transcripts by default)"""
+    def get_episodes(self, podcast_id: int, limit: int = 10,
+                     include_snippets: bool = False,
+                     before: Optional[Tuple[float, int]] = None,
+                     after: Optional[Tuple[float, int]] = None) -> List[Episode]:
+        """Get episodes for a specific podcast (most recent 10 with transcripts by default)
+        
+        Listings only need to know whether a transcript exists, so by default
+        `has_transcript` is computed in SQL and the large snippet JSON columns
+        are not read; pass include_snippets=True to get them as well.
+        
+        Episodes are ordered newest first by (pub date, id). `before` and
+        `after` take a (pub_timestamp, id) cursor from a previous page and
+        return the episodes just older or newer than it instead of using
+        OFFSET. Pages are index seeks only with `snapshot` enabled, whose
+        copy carries the index; see keyset_clause.
+        """
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                # Query to get episodes for a podcast that have transcript snippets
-                # Order by publication date descending to get most recent first
-                query = """
-                SELECT 
-                    ZMTEPISODE.Z_PK as episode_id,
-                    ZMTEPISODE.ZTITLE as title,
-                    ZMTEPISODE.ZITEMDESCRIPTION as description,
-                    ZMTEPISODE.ZPUBDATE as pub_date,
-                    ZMTEPISODE.ZDURATION as duration,
-                    ZMTEPISODE.ZASSETURL as asset_url,
-                    ZMTEPISODE.ZENTITLEDTRANSCRIPTSNIPPET as entitled_transcript,
-                    ZMTEPISODE.ZFREETRANSCRIPTSNIPPET as free_transcript,
-                    ZMTEPISODE.ZPLAYHEAD as playback_position,
-                    ZMTEPISODE.ZPLAYSTATE as playback_state
-                FROM ZMTEPISODE 
-                WHERE ZMTEPISODE.ZPODCAST = ?
-                AND (ZMTEPISODE.ZENTITLEDTRANSCRIPTSNIPPET IS NOT NULL 
-                     OR ZMTEPISODE.ZFREETRANSCRIPTSNIPPET IS NOT NULL)
-                ORDER BY ZMTEPISODE.ZPUBDATE DESC
-                LIMIT ?
-                """
-                
-                cursor.execute(query, (podcast_id, limit))
-                rows = cursor.fetchall()
-                
-                episodes = []
-                for row in rows:
-                    episode = {
-                        'id': row[0],
-                        'title': row[1],
-                        'description': row[2],
-                        'pub_date': self._convert_timestamp_to_date(row[3]) if row[3] else None,
-                        'duration': row[4],
-                        'asset_url': row[5],
-                        'entitled_transcript': row[6],
-                        'free_transcript': row[7],
-                        'playback_position': row[8],
-                        'playback_state': row[9]
-                    }
-                    episodes.append(episode)
-                
+                # Episodes of the podcast that have transcript snippets, most recent first
+                query, params = self._queries().episode_page(include_snippets, before, after)
+                cursor.row_factory = Episode.row_factory()
+                cursor.execute(query, (podcast_id, *params, limit))
+                episodes = cursor.fetchall()
+                if after:
+                    episodes.reverse()
                 return episodes
                 
         except sqlite3.Error as e:
@@ -150,6 +333,26 @@ class PodcastDatabase:
             self.logger.error(f"Error reading episodes: {e}")
             raise
     
+    def get_transcript_episodes(self, podcast_id: Optional[int] = None,
+                                since: Optional[float] = None) -> List[Episode]:
+        """Get every episode with a transcript, newest first, with its podcast title
+        
+        Optionally limited to one podcast and to episodes published at or
+        after the library timestamp `since`.
+        """
+        params = [value for value in (podcast_id, since) if value is not None]
+        try:
+            with self._get_connection() as conn:
+                query = self._queries().transcript_episodes(podcast_id is not None, since is not None)
+                cursor = conn.cursor()
+                cursor.row_factory = Episode.row_factory()
+                cursor.execute(query, params)
+                return cursor.fetchall()
+                
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error: {e}")
+            raise
+    
     def get_episode_transcript(self, episode_id: int) -> Optional[str]:
         """Get transcript for a specific episode"""
         try:
@@ -157,32 +360,22 @@ class PodcastDatabase:
                 cursor = conn.cursor()
                 
                 # First try to get the transcript identifier (file path)
-                query = """
-                SELECT ZTRANSCRIPTIDENTIFIER, ZENTITLEDTRANSCRIPTSNIPPET, ZFREETRANSCRIPTSNIPPET
-                FROM ZMTEPISODE 
-                WHERE Z_PK = ?
-                """
-                
-                cursor.execute(query, (episode_id,))
+                queries = self._queries()
+                cursor.execute(queries.transcript_identifier, (episode_id,))
                 row = cursor.fetchone()
                 
                 if row:
                     transcript_identifier = row[0]
-                    entitled_snippet = row[1]
-                    free_snippet = row[2]
                     
                     # Try to read the full transcript file first
-                    if transcript_identifier:
-                        full_transcript = self._read_transcript_file(transcript_identifier)
-                        if full_transcript and len(full_transcript.strip()) > 50:
-                            return full_transcript
+                    full_transcript = self._transcript_from_file(transcript_identifier)
+                    if full_transcript:
+                        return full_transcript
                     
-                    # Fall back to snippets if file reading fails
-                    transcript_json = entitled_snippet or free_snippet
-                    if transcript_json:
-                        snippet_transcript = self._extract_transcript_text(transcript_json)
-                        if snippet_transcript and len(snippet_transcript.strip()) > 50:
-                            return snippet_transcript
+                    # Fall back to snippets if file reading fails; they are
+                    # only loaded here, never for listings
+                    cursor.execute(queries.transcript_snippets, (episode_id,))
+                    return self._transcript_from_snippets(*cursor.fetchone())
                 return None
                 
         except sqlite3.Error as e:
@@ -192,51 +385,130 @@ class PodcastDatabase:
             self.logger.error(f"Error reading transcript: {e}")
             return None
     
+    def get_episode_transcripts(self, episode_ids: List[int], max_workers: int = 4,
+                                chunk_size: int = 500) -> Iterator[Tuple[int, Optional[str]]]:
+        """Get transcripts for many episodes, yielding (episode_id, transcript) as they finish
+        
+        Identifiers and snippets are read with one `IN (...)` query per
+        chunk of ids, and TTML files are located and parsed in a thread pool.
+        Episodes without a usable transcript are yielded with None.
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Fetched chunk by chunk so only one chunk of snippets is held at a time
+            for start in range(0, len(episode_ids), chunk_size):
+                chunk = episode_ids[start:start + chunk_size]
+                try:
+                    rows = self._fetch_in_chunks(lambda queries: queries.transcript_rows, chunk, chunk_size)
+                except sqlite3.Error as e:
+                    self.logger.error(f"Database error: {e}")
+                    rows = []
+                
+                found = {row[0] for row in rows}
+                for episode_id in chunk:
+                    if episode_id not in found:
+                        yield episode_id, None
+                
+                futures = {
+                    executor.submit(self._resolve_transcript, *row[1:]): row[0]
+                    for row in rows
+                }
+                for future in as_completed(futures):
+                    episode_id = futures[future]
+                    try:
+                        yield episode_id, future.result()
+                    except Exception as e:
+                        self.logger.error(f"Error reading transcript for episode {episode_id}: {e}")
+                        yield episode_id, None
+    
+    def _resolve_transcript(self, transcript_identifier: Optional[str], entitled_snippet: Optional[str],
+                            free_snippet: Optional[str]) -> Optional[str]:
+        """Transcript from the TTML file, falling back to the snippets"""
+        return (self._transcript_from_file(transcript_identifier)
+                or self._transcript_from_snippets(entitled_snippet, free_snippet))
+    
+    def _transcript_from_file(self, transcript_identifier: Optional[str]) -> Optional[str]:
+        """Full transcript from the TTML file, if it exists and is not trivially short"""
+        if transcript_identifier:
+            full_transcript = self._read_transcript_file(transcript_identifier)
+            if full_transcript and len(full_transcript.strip()) > 50:
+                return full_transcript
+        return None
+    
+    def _transcript_from_snippets(self, entitled_snippet: Optional[str],
+                                  free_snippet: Optional[str]) -> Optional[str]:
+        """Transcript text from the snippet JSON columns"""
+        transcript_json = entitled_snippet or free_snippet
+        if transcript_json:
+            snippet_transcript = self._extract_transcript_text(transcript_json)
+            if snippet_transcript and len(snippet_transcript.strip()) > 50:
+                return snippet_transcript
+        return None
+    
+    def _find_transcript_file(self, transcript_identifier: str) -> Optional[Path]:
+        """Locate the cached TTML file for a transcript identifier"""
+        # Construct the path to the transcript file
+        base_path = self.ttml_index.base_path
+        
+        # The identifier format is like: "PodcastContent221/v4/06/d0/0d/06d00dc6-f417-0085-1989-b64671af104f/transcript_1000552192762.ttml"
+        # We need to find the actual file which might have additional suffixes
+        identifier_parts = transcript_identifier.split('/')
+        if len(identifier_parts) < 2:
+            return None
+        
+        # Try to find the file with various possible suffixes
+        possible_paths = [
+            base_path / transcript_identifier,
+            base_path / f"{transcript_identifier}-{identifier_parts[-1]}",
+            base_path / f"{transcript_identifier}-{identifier_parts[-1].replace('.ttml', '')}.ttml"
+        ]
+        
+        for path in possible_paths:
+            if path.exists():
+                return path
+        
+        # Look the file up by name in the TTML directory index
+        return self.ttml_index.lookup(identifier_parts[-1])
+    
+    def get_episode_segments(self, episode_id: int) -> Optional[List[Segment]]:
+        """Get the timed transcript segments of an episode from its TTML file
+        
+        Returns None when the episode has no cached TTML transcript (snippet
+        JSON carries no timing).
+        """
+        try:
+            with self._get_connection() as conn:
+                row = conn.execute(self._queries().transcript_identifier, (episode_id,)).fetchone()
+            if not row or not row[0]:
+                return None
+            transcript_file = self._find_transcript_file(row[0])
+            if not transcript_file:
+                return None
+            return list(iter_segments(str(transcript_file))) or None
+        except (sqlite3.Error, ET.ParseError, OSError) as e:
+            self.logger.error(f"Error reading transcript segments: {e}")
+            return None
+    
     def _read_transcript_file(self, transcript_identifier: str) -> Optional[str]:
         """Read and parse transcript from TTML file"""
         try:
             import re
-            from pathlib import Path
-            
-            # Construct the path to the transcript file
-            base_path = Path("~/Library/Group Containers/243LU875E5.groups.com.apple.podcasts/Library/Cache/Assets/TTML")
-            base_path = base_path.expanduser()
-            
-            # The identifier format is like: "PodcastContent221/v4/06/d0/0d/06d00dc6-f417-0085-1989-b64671af104f/transcript_1000552192762.ttml"
-            # We need to find the actual file which might have additional suffixes
-            identifier_parts = transcript_identifier.split('/')
-            if len(identifier_parts) < 2:
-                return None
-            
-            # Try to find the file with various possible suffixes
-            possible_paths = [
-                base_path / transcript_identifier,
-                base_path / f"{transcript_identifier}-{identifier_parts[-1]}",
-                base_path / f"{transcript_identifier}-{identifier_parts[-1].replace('.ttml', '')}.ttml"
-            ]
-            
-            transcript_file = None
-            for path in possible_paths:
-                if path.exists():
-                    transcript_file = path
-                    break
-            
-            if not transcript_file:
-                # Try to find the file by searching for the filename
-                filename = identifier_parts[-1]
-                for file_path in base_path.rglob(f"*{filename}*"):
-                    if file_path.is_file():
-                        transcript_file = file_path
-                        break
             
+            transcript_file = self._find_transcript_file(transcript_identifier)
             if not transcript_file:
                 return None
             
-            # Read the TTML file
+            # Stream the timed paragraphs out of the TTML file
+            try:
+                text = segments_to_text(iter_segments(str(transcript_file)))
+            except ET.ParseError as e:
+                self.logger.warning(f"Malformed TTML in {transcript_file}, stripping tags instead: {e}")
+                text = ""
+            if text:
+                return text
+            
+            # Not paragraph-structured (or malformed): strip the tags from the whole file
             with open(transcript_file, 'r', encoding='utf-8') as f:
                 content = f.read()
-            
-            # Extract text from TTML format
             return self._extract_text_from_ttml(content)
             
         except Exception as e:
@@ -288,42 +560,41 @@ class PodcastDatabase:
             self.logger.error(f"Error parsing transcript JSON: {e}")
             return transcript_json  # Return raw JSON if parsing fails
     
-    def search_podcasts(self, search_term: str) -> List[Dict[str, Any]]:
+    def search_podcasts(self, search_term: str) -> List[Podcast]:
         """Search podcasts by title or author"""
         try:
             with self._get_connection() as conn:
                 cursor = conn.cursor()
                 
-                query = """
-                SELECT 
-                    ZMTPODCAST.Z_PK as podcast_id,
-                    ZMTPODCAST.ZTITLE as title,
-                    ZMTPODCAST.ZAUTHOR as author,
-                    ZMTPODCAST.ZITEMDESCRIPTION as description
-                FROM ZMTPODCAST 
-                WHERE ZMTPODCAST.ZTITLE LIKE ? OR ZMTPODCAST.ZAUTHOR LIKE ?
-                ORDER BY ZMTPODCAST.ZTITLE
-                """
-                
                 search_pattern = f"%{search_term}%"
-                cursor.execute(query, (search_pattern, search_pattern))
-                rows = cursor.fetchall()
-                
-                results = []
-                for row in rows:
-                    result = {
-                        'id': row[0],
-                        'title': row[1],
-                        'author': row[2],
-                        'description': row[3]
-                    }
-                    results.append(result)
-                
-                return results
+                cursor.row_factory = Podcast.row_factory()
+                cursor.execute(self._queries().search_podcasts, (search_pattern, search_pattern))
+                return cursor.fetchall()
                 
         except sqlite3.Error as e:
             self.logger.error(f"Database error: {e}")
             raise
         except Exception as e:
             self.logger.error(f"Error searching podcasts: {e}")
-            raise 
\ No newline at end of file
+            raise
+    
+    def search_episodes(self, search_term: str, limit: int = 20,
+                        podcast_id: Optional[int] = None) -> List[Episode]:
+        """Search episodes with transcripts by title, most recent first"""
+        try:
+            with self._get_connection() as conn:
+                params = [f"%{search_term}%"]
+                if podcast_id is not None:
+                    params.append(podcast_id)
+                params.append(limit)
+                cursor = conn.cursor()
+                cursor.row_factory = Episode.row_factory()
+                cursor.execute(self._queries().search_episodes[podcast_id is not None], params)
+                return cursor.fetchall()
+                
+        except sqlite3.Error as e:
+            self.logger.error(f"Database error: {e}")
+            raise
+        except Exception as e:
+            self.logger.error(f"Error searching episodes: {e}")
+            raise
\ No newline at end of file
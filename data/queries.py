@@ -0,0 +1,349 @@
+"""
+Schema-aware SQL for the Podcasts library database
+"""
+
+import hashlib
+import logging
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Core Data tables read by the app, keyed by logical name
+TABLES = {'podcasts': 'ZMTPODCAST', 'episodes': 'ZMTEPISODE'}
+
+# Logical column -> physical candidates, first one present wins. The
+# alternatives cover columns renamed or split between app versions.
+COLUMNS = {
+    'podcasts': {
+        'id': ('Z_PK',),
+        'z_opt': ('Z_OPT',),
+        'title': ('ZTITLE',),
+        'author': ('ZAUTHOR',),
+        'description': ('ZITEMDESCRIPTION',),
+        'feed_url': ('ZFEEDURL',),
+        'artwork_url': ('ZIMAGEURL',),
+    },
+    'episodes': {
+        'id': ('Z_PK',),
+        'z_opt': ('Z_OPT',),
+        'podcast_id': ('ZPODCAST',),
+        'title': ('ZTITLE',),
+        'description': ('ZITEMDESCRIPTION', 'ZITEMDESCRIPTIONWITHOUTHTML'),
+        'pub_date': ('ZPUBDATE',),
+        'duration': ('ZDURATION',),
+        'asset_url': ('ZASSETURL',),
+        'transcript_identifier': ('ZTRANSCRIPTIDENTIFIER', 'ZENTITLEDTRANSCRIPTIDENTIFIER',
+                                  'ZFREETRANSCRIPTIDENTIFIER'),
+        'playback_position': ('ZPLAYHEAD',),
+        'playback_state': ('ZPLAYSTATE',),
+        'entitled_transcript': ('ZENTITLEDTRANSCRIPTSNIPPET',),
+        'free_transcript': ('ZFREETRANSCRIPTSNIPPET',),
+    },
+}
+
+# Columns without which no query can work; anything else reads as NULL when missing
+REQUIRED_COLUMNS = {'podcasts': ('id', 'z_opt', 'title'), 'episodes': ('id', 'z_opt', 'podcast_id')}
+
+# Index created in snapshot copies over the episodes that have transcripts
+EPISODE_INDEX = "app_episodes_by_podcast"
+
+
+class SchemaError(sqlite3.DatabaseError):
+    """The library database lacks tables or columns the app cannot do without"""
+
+
+def keyset_clause(date_column: str, id_column: str,
+                  before: Optional[Tuple[float, int]] = None,
+                  after: Optional[Tuple[float, int]] = None) -> Tuple[str, str, Tuple]:
+    """Build the seek condition, ORDER BY and parameters for a newest-first page
+    
+    With `after`, rows are selected oldest first (so LIMIT keeps the ones
+    closest to the cursor) and the caller reverses them.
+    
+    `(date, id) < (d, i)` is spelled out as `date <= d AND (date < d OR
+    id < i)`: SQLite cannot seek an expression index with a row value,
+    but it can range-scan on the leading `date <= d` term.
+    
+    The library's date expression, `COALESCE(ZPUBDATE, 0)`, only has an
+    index in snapshot copies (see LibraryQueries.index_statements). On the
+    live library a page still avoids OFFSET, but SQLite filters and sorts
+    the podcast's transcript episodes for every page.
+    """
+    if before is not None:
+        date, pk = before
+        return (f"AND {date_column} <= ? AND ({date_column} < ? OR {id_column} < ?)",
+                f"{date_column} DESC, {id_column} DESC", (date, date, pk))
+    if after is not None:
+        date, pk = after
+        return (f"AND {date_column} >= ? AND ({date_column} > ? OR {id_column} > ?)",
+                f"{date_column} ASC, {id_column} ASC", (date, date, pk))
+    return "", f"{date_column} DESC, {id_column} DESC", ()
+
+
+def dict_factory(cursor: sqlite3.Cursor, row: tuple) -> Dict[str, Any]:
+    """sqlite3 row_factory returning {column alias: value} dicts"""
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+def schema_key(conn: sqlite3.Connection) -> Tuple:
+    """Identify the schema of a library database
+    
+    Combines SQLite's schema cookie (bumped by any DDL) with the Core Data
+    model version recorded in Z_METADATA, so a migrated library is always
+    introspected again.
+    """
+    cookie = conn.execute("PRAGMA schema_version").fetchone()[0]
+    try:
+        row = conn.execute("SELECT Z_VERSION, Z_PLIST FROM Z_METADATA LIMIT 1").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    if not row:
+        return (cookie, None, None)
+    plist = row[1] if isinstance(row[1], bytes) else str(row[1] or "").encode()
+    return (cookie, row[0], hashlib.sha1(plist).hexdigest())
+
+
+class LibrarySchema:
+    """Physical column names resolved for one version of the library schema"""
+    
+    def __init__(self, columns: Dict[str, Dict[str, Optional[str]]]):
+        self.columns = columns
+    
+    @classmethod
+    def introspect(cls, conn: sqlite3.Connection) -> 'LibrarySchema':
+        """Resolve the logical columns against the database's tables
+        
+        Raises SchemaError if a table or required column is missing.
+        """
+        columns: Dict[str, Dict[str, Optional[str]]] = {}
+        for table, physical_table in TABLES.items():
+            present = {row[1].upper() for row in conn.execute(f"PRAGMA table_info({physical_table})")}
+            if not present:
+                raise SchemaError(f"Podcast database has no {physical_table} table")
+            resolved = {
+                name: next((column for column in candidates if column in present), None)
+                for name, candidates in COLUMNS[table].items()
+            }
+            missing = [name for name in REQUIRED_COLUMNS[table] if resolved[name] is None]
+            if missing:
+                raise SchemaError(
+                    f"Unsupported podcast database schema: {physical_table} lacks "
+                    + ", ".join(f"{'/'.join(COLUMNS[table][name])}" for name in missing)
+                )
+            absent = [name for name, column in resolved.items() if column is None]
+            if absent:
+                logger.warning(f"{physical_table} has no column for {', '.join(absent)}; reading them as NULL")
+            columns[table] = resolved
+        return cls(columns)
+    
+    def has(self, table: str, name: str) -> bool:
+        return self.columns[table][name] is not None
+    
+    def column(self, table: str, name: str, qualified: bool = True) -> str:
+        """Column reference, or NULL when the column does not exist
+        
+        Index definitions cannot qualify columns, hence `qualified`.
+        """
+        column = self.columns[table][name]
+        if not column:
+            return "NULL"
+        return f"{TABLES[table]}.{column}" if qualified else column
+    
+    def select(self, table: str, *names: str) -> str:
+        """SELECT list of columns aliased to their logical names"""
+        return ",\n               ".join(f"{self.column(table, name)} AS {name}" for name in names)
+    
+    def any_not_null(self, table: str, *names: str, qualified: bool = True) -> str:
+        """Condition true when any of the (existing) columns is set"""
+        terms = [f"{self.column(table, name, qualified)} IS NOT NULL"
+                 for name in names if self.has(table, name)]
+        return f"({' OR '.join(terms)})" if terms else "0"
+
+
+class LibraryQueries:
+    """The SQL statements the app runs, built once per schema
+    
+    Statement texts are fixed per schema and query shape, so sqlite3's
+    per-connection statement cache keeps reusing the compiled statements
+    instead of preparing freshly formatted SQL on every call.
+    """
+    
+    def __init__(self, schema: LibrarySchema):
+        self.schema = schema
+        s = schema
+        podcast, episode = TABLES['podcasts'], TABLES['episodes']
+        self.pub_date = f"COALESCE({s.column('episodes', 'pub_date')}, 0)"
+        self.has_snippet = s.any_not_null('episodes', 'entitled_transcript', 'free_transcript')
+        self._statements: Dict[Tuple, str] = {}
+        
+        self.row_versions = {
+            table: f"SELECT {s.column(table, 'id')}, {s.column(table, 'z_opt')} FROM {physical}"
+            for table, physical in TABLES.items()
+        }
+        self.transcript_versions = f"""
+        SELECT {s.column('episodes', 'id')}, {s.column('episodes', 'z_opt')} FROM {episode}
+        WHERE {s.any_not_null('episodes', 'transcript_identifier', 'entitled_transcript', 'free_transcript')}
+        """
+        self.podcast_rows = f"""
+        SELECT {s.select('podcasts', 'id', 'z_opt', 'title', 'author', 'description', 'feed_url',
+                         'artwork_url')}
+        FROM {podcast}
+        WHERE {s.column('podcasts', 'id')} IN ({{placeholders}})
+        """
+        self.episode_rows = f"""
+        SELECT {s.select('episodes', 'id', 'z_opt', 'podcast_id', 'title', 'description')},
+               {self.pub_date} AS pub_date,
+               {s.select('episodes', 'duration', 'asset_url', 'transcript_identifier',
+                         'playback_position', 'playback_state')},
+               {self.has_snippet} AS has_transcript
+        FROM {episode}
+        WHERE {s.column('episodes', 'id')} IN ({{placeholders}})
+        """
+        self.transcript_rows = f"""
+        SELECT {s.select('episodes', 'id', 'transcript_identifier', 'entitled_transcript',
+                         'free_transcript')}
+        FROM {episode}
+        WHERE {s.column('episodes', 'id')} IN ({{placeholders}})
+        """
+        self.transcript_identifier = f"""
+        SELECT {s.column('episodes', 'transcript_identifier')} FROM {episode}
+        WHERE {s.column('episodes', 'id')} = ?
+        """
+        self.transcript_snippets = f"""
+        SELECT {s.column('episodes', 'entitled_transcript')}, {s.column('episodes', 'free_transcript')}
+        FROM {episode}
+        WHERE {s.column('episodes', 'id')} = ?
+        """
+        # Only podcasts that actually have episodes with transcript snippets;
+        # counted per podcast first so the count walks the snippet index only
+        self.subscriptions = f"""
+        SELECT {s.select('podcasts', 'id', 'title', 'author', 'description', 'feed_url', 'artwork_url')},
+               counts.episode_count
+        FROM (
+            SELECT {s.column('episodes', 'podcast_id')} AS podcast_id, COUNT(*) AS episode_count
+            FROM {episode}
+            WHERE {self.has_snippet}
+            GROUP BY {s.column('episodes', 'podcast_id')}
+        ) AS counts
+        INNER JOIN {podcast} ON {s.column('podcasts', 'id')} = counts.podcast_id
+        WHERE {s.column('podcasts', 'title')} IS NOT NULL
+        ORDER BY {s.column('podcasts', 'title')}
+        """
+        self.search_podcasts = f"""
+        SELECT {s.select('podcasts', 'id', 'title', 'author', 'description')}
+        FROM {podcast}
+        WHERE {s.column('podcasts', 'title')} LIKE ? OR {s.column('podcasts', 'author')} LIKE ?
+        ORDER BY {s.column('podcasts', 'title')}
+        """
+        search_episodes = f"""
+        SELECT {s.select('episodes', 'id', 'title', 'description')},
+               {self.pub_date} AS pub_timestamp,
+               {s.select('episodes', 'duration', 'podcast_id')},
+               {s.column('podcasts', 'title')} AS podcast_title,
+               1 AS has_transcript
+        FROM {episode}
+        LEFT JOIN {podcast} ON {s.column('podcasts', 'id')} = {s.column('episodes', 'podcast_id')}
+        WHERE {s.column('episodes', 'title')} LIKE ?
+        AND {self.has_snippet}
+        {{podcast_filter}}
+        ORDER BY {self.pub_date} DESC
+        LIMIT ?
+        """
+        self.search_episodes = {
+            False: search_episodes.format(podcast_filter=""),
+            True: search_episodes.format(podcast_filter=f"AND {s.column('episodes', 'podcast_id')} = ?"),
+        }
+    
+    def transcript_episodes(self, by_podcast: bool = False, since: bool = False) -> str:
+        """SQL listing every transcript episode, newest first
+        
+        Takes ([podcast_id], [since timestamp]) for the enabled filters.
+        """
+        s = self.schema
+        key = ('transcript_episodes', by_podcast, since)
+        if key not in self._statements:
+            filters = ""
+            if by_podcast:
+                filters += f"AND {s.column('episodes', 'podcast_id')} = ?\n"
+            if since:
+                filters += f"AND {self.pub_date} >= ?\n"
+            self._statements[key] = f"""
+            SELECT {s.select('episodes', 'id', 'podcast_id', 'title', 'description')},
+                   {self.pub_date} AS pub_timestamp,
+                   {s.select('episodes', 'duration')},
+                   {s.column('podcasts', 'title')} AS podcast_title,
+                   1 AS has_transcript
+            FROM {TABLES['episodes']}
+            LEFT JOIN {TABLES['podcasts']} ON {s.column('podcasts', 'id')} = {s.column('episodes', 'podcast_id')}
+            WHERE {self.has_snippet}
+            {filters}ORDER BY {self.pub_date} DESC, {s.column('episodes', 'id')} DESC
+            """
+        return self._statements[key]
+    
+    def episode_page(self, include_snippets: bool = False,
+                     before: Optional[Tuple[float, int]] = None,
+                     after: Optional[Tuple[float, int]] = None) -> Tuple[str, Tuple]:
+        """SQL and cursor parameters for a newest-first page of transcript episodes
+        
+        Takes (podcast_id, *cursor params, limit). Rows come oldest first
+        with `after`; see keyset_clause.
+        """
+        s = self.schema
+        cursor_condition, order, params = keyset_clause(self.pub_date, s.column('episodes', 'id'),
+                                                        before, after)
+        direction = 'before' if before is not None else 'after' if after is not None else None
+        key = (include_snippets, direction)
+        if key not in self._statements:
+            snippet_columns = s.select('episodes', 'entitled_transcript', 'free_transcript') + ",\n               " \
+                if include_snippets else ""
+            self._statements[key] = f"""
+            SELECT {s.select('episodes', 'id', 'podcast_id')},
+                   {self.pub_date} AS pub_timestamp,
+                   {s.select('episodes', 'title', 'description', 'duration', 'asset_url',
+                             'playback_position', 'playback_state')},
+                   {snippet_columns}1 AS has_transcript
+            FROM {TABLES['episodes']}
+            WHERE {s.column('episodes', 'podcast_id')} = ?
+            AND {self.has_snippet}
+            {cursor_condition}
+            ORDER BY {order}
+            LIMIT ?
+            """
+        return self._statements[key], params
+    
+    def index_statements(self) -> List[str]:
+        """CREATE INDEX statements recommended for this schema
+        
+        The partial index holds exactly the listed (transcript) episodes,
+        keyed like the listing's ORDER BY: an episode page, at any depth,
+        is a range seek with no sort, and subscription counts scan only
+        transcript episodes instead of every episode.
+        """
+        s = self.schema
+        if not s.has('episodes', 'entitled_transcript') and not s.has('episodes', 'free_transcript'):
+            return []
+        columns = {name: s.column('episodes', name, qualified=False) for name in ('podcast_id', 'pub_date', 'id')}
+        has_snippet = s.any_not_null('episodes', 'entitled_transcript', 'free_transcript', qualified=False)
+        return [
+            f"CREATE INDEX IF NOT EXISTS {EPISODE_INDEX} ON {TABLES['episodes']} "
+            f"({columns['podcast_id']}, COALESCE({columns['pub_date']}, 0), {columns['id']}) "
+            f"WHERE {has_snippet}"
+        ]
+
+
+def create_indexes(conn: sqlite3.Connection) -> List[str]:
+    """Create the recommended indexes in a writable copy of the library
+    
+    Returns the statements run. The copy's statistics are refreshed (from
+    a bounded sample, to keep large libraries quick) so the planner picks
+    the new indexes over Core Data's own.
+    """
+    statements = LibraryQueries(LibrarySchema.introspect(conn)).index_statements()
+    for statement in statements:
+        conn.execute(statement)
+    if statements:
+        conn.execute("PRAGMA analysis_limit=1000")
+        conn.execute("ANALYZE")
+    conn.commit()
+    return statements
@@ -0,0 +1,119 @@
+"""
+Compact time index over a transcript's segments
+"""
+
+import bisect
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from data.ttml_parser import Segment
+
+
+class SegmentIndex:
+    """Transcript segments stored as parallel arrays over one text buffer
+    
+    `starts`/`ends` hold segment times in seconds and `offsets` the start
+    of each segment's text in `text` (segments are joined by one space),
+    so a time-range lookup is two bisects and one string slice. Speakers
+    are interned into a small table referenced by `speaker_ids`.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, starts: array, ends: array, offsets: array, speaker_ids: array,
+                 speakers: List[Optional[str]], text: str):
+        self.starts = starts
+        self.ends = ends
+        self.offsets = offsets
+        self.speaker_ids = speaker_ids
+        self.speakers = speakers
+        self.text = text
+    
+    @classmethod
+    def from_segments(cls, segments: Iterable[Segment]) -> 'SegmentIndex':
+        """Build an index from parsed segments, in document order"""
+        starts, ends, offsets, speaker_ids = array('d'), array('d'), array('I'), array('H')
+        speakers: List[Optional[str]] = []
+        speaker_lookup: Dict[Optional[str], int] = {}
+        parts: List[str] = []
+        position = 0
+        previous_end = 0.0
+        
+        for segment in segments:
+            # Untimed paragraphs inherit the previous end so times stay sorted
+            begin = segment.begin if segment.begin is not None else previous_end
+            end = segment.end if segment.end is not None else begin
+            starts.append(max(begin, starts[-1] if starts else 0.0))
+            ends.append(end)
+            previous_end = end
+            
+            if segment.speaker not in speaker_lookup:
+                speaker_lookup[segment.speaker] = len(speakers)
+                speakers.append(segment.speaker)
+            speaker_ids.append(speaker_lookup[segment.speaker])
+            
+            offsets.append(position)
+            parts.append(segment.text)
+            position += len(segment.text) + 1
+        
+        return cls(starts, ends, offsets, speaker_ids, speakers, " ".join(parts))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Cacheable form: the arrays as raw bytes"""
+        return {
+            'version': self.VERSION,
+            'starts': self.starts.tobytes(),
+            'ends': self.ends.tobytes(),
+            'offsets': self.offsets.tobytes(),
+            'speaker_ids': self.speaker_ids.tobytes(),
+            'speakers': list(self.speakers),
+            'text': self.text,
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> Optional['SegmentIndex']:
+        """Rebuild an index from `to_dict` output; None if it is from another version"""
+        if data.get('version') != cls.VERSION:
+            return None
+        arrays = []
+        for name, typecode in (('starts', 'd'), ('ends', 'd'), ('offsets', 'I'), ('speaker_ids', 'H')):
+            values = array(typecode)
+            values.frombytes(data[name])
+            arrays.append(values)
+        return cls(*arrays, data['speakers'], data['text'])
+    
+    def __len__(self) -> int:
+        return len(self.starts)
+    
+    def segment(self, i: int) -> Segment:
+        """The i-th segment"""
+        text_end = self.offsets[i + 1] - 1 if i + 1 < len(self.offsets) else len(self.text)
+        return Segment(self.starts[i], self.ends[i], self.speakers[self.speaker_ids[i]],
+                       self.text[self.offsets[i]:text_end])
+    
+    def index_at(self, seconds: float) -> Optional[int]:
+        """Index of the segment being spoken at `seconds`, if any"""
+        i = bisect.bisect_right(self.starts, seconds) - 1
+        if i >= 0 and seconds < self.ends[i]:
+            return i
+        return None
+    
+    def _span(self, start: float, end: float) -> range:
+        """Indices of the segments overlapping [start, end)"""
+        lo = max(bisect.bisect_right(self.starts, start) - 1, 0)
+        if lo < len(self) and self.ends[lo] <= start:
+            lo += 1
+        hi = bisect.bisect_left(self.starts, end)
+        return range(lo, max(lo, hi))
+    
+    def segments_between(self, start: float, end: float) -> List[Segment]:
+        """Segments overlapping the time range [start, end) seconds"""
+        return [self.segment(i) for i in self._span(start, end)]
+    
+    def text_between(self, start: float, end: float) -> str:
+        """Transcript text spoken in [start, end) seconds, as one slice of the buffer"""
+        span = self._span(start, end)
+        if not span:
+            return ""
+        text_end = self.offsets[span.stop] - 1 if span.stop < len(self) else len(self.text)
+        return self.text[self.offsets[span.start]:text_end]
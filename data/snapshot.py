@@ -0,0 +1,137 @@
+"""
+Local snapshot of the Podcasts app library database
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
+
+from utils.cache_backends import FileLock
+
+
+class LibrarySnapshot:
+    """Private copy of MTLibrary.sqlite taken with the SQLite online backup API
+    
+    Reading a copy means we never wait on (or block) the Podcasts app's
+    write locks and every query within one snapshot sees the same data.
+    The copy is only refreshed when the size or mtime of the source file
+    or its WAL changed since the last copy, and at most once per
+    `min_refresh_seconds`.
+    
+    `prepare`, if given, is called with a connection to each new copy
+    before it is swapped in, e.g. to add indexes the source lacks.
+    """
+    
+    def __init__(self, source_path: Path, snapshot_dir: Path,
+                 min_refresh_seconds: float = 60,
+                 prepare: Optional[Callable[[sqlite3.Connection], Any]] = None):
+        self.source_path = source_path
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_path = snapshot_dir / "MTLibrary.snapshot.sqlite"
+        self.state_path = snapshot_dir / "MTLibrary.snapshot.json"
+        self.min_refresh_seconds = min_refresh_seconds
+        self.prepare = prepare
+        self.logger = logging.getLogger(__name__)
+        self._last_check = 0.0
+        self._state: Optional[Dict[str, Any]] = None
+    
+    def source_signature(self) -> Dict[str, Any]:
+        """Size and mtime of the source database and its WAL file"""
+        signature = {}
+        for suffix in ("", "-wal"):
+            path = Path(f"{self.source_path}{suffix}")
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                if not suffix:
+                    raise FileNotFoundError(
+                        f"Podcast database not found at {self.source_path}. "
+                        "Make sure the Podcast app is installed and has been used."
+                    )
+                signature[f"db{suffix}"] = None
+                continue
+            signature[f"db{suffix}"] = [st.st_size, st.st_mtime_ns]
+        return signature
+    
+    def _load_state(self) -> Dict[str, Any]:
+        if self._state is None:
+            try:
+                with open(self.state_path, 'r') as f:
+                    self._state = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._state = {}
+        return self._state
+    
+    def is_current(self, signature: Optional[Dict[str, Any]] = None) -> bool:
+        """Check whether the snapshot was taken from the current source"""
+        if not self.snapshot_path.exists():
+            return False
+        signature = signature or self.source_signature()
+        return self._load_state().get('source') == signature
+    
+    def refresh(self, force: bool = False) -> bool:
+        """Copy the source into the snapshot if it changed
+        
+        Returns True if a new snapshot was written.
+        """
+        now = time.monotonic()
+        if (not force and self.snapshot_path.exists()
+                and now - self._last_check < self.min_refresh_seconds):
+            return False
+        self._last_check = now
+        
+        # Taken before copying: a write that lands during the copy leaves
+        # the signature stale, so the next refresh copies again
+        signature = self.source_signature()
+        if not force and self.is_current(signature):
+            return False
+        
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        with FileLock(self.snapshot_dir / "snapshot.lock"):
+            # Another process may have refreshed while we waited for the lock
+            self._state = None
+            if not force and self.is_current(signature):
+                return False
+            
+            started = time.monotonic()
+            self._copy()
+            self._state = {'source': signature, 'copied_at': time.time()}
+            with open(self.state_path, 'w') as f:
+                json.dump(self._state, f)
+        
+        self.logger.info(
+            f"Refreshed library snapshot in {time.monotonic() - started:.2f}s "
+            f"({self.snapshot_path.stat().st_size / (1024 * 1024):.1f} MB)"
+        )
+        return True
+    
+    def _copy(self) -> None:
+        """Back up the source into a temp file and atomically swap it in"""
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.snapshot_dir), suffix=".tmp")
+        os.close(fd)
+        try:
+            source = sqlite3.connect(f"file:{quote(str(self.source_path))}?mode=ro", uri=True)
+            target = sqlite3.connect(tmp_path)
+            try:
+                # One step, so the copy comes from a single read transaction
+                source.backup(target)
+                if self.prepare:
+                    self.prepare(target)
+                # The snapshot is opened with immutable=1, which cannot read a WAL
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+                source.close()
+            os.replace(tmp_path, self.snapshot_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
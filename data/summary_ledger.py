@@ -0,0 +1,63 @@
+"""
+Durable record of which episodes the batch command has summarized
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Set
+
+
+class SummaryLedger:
+    """Episodes whose summary has been generated, keyed by episode id
+    
+    The summary cache expires entries (by age, by sweep and by LRU once
+    max_size_mb is reached), so it cannot tell a later batch run which
+    episodes are done. The ledger never expires: an episode is recorded
+    with its summary when it finishes and stays recorded.
+    Knowing an episode is done needs no transcript, so checking a large
+    library stays cheap.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS summaries (
+        episode_id INTEGER PRIMARY KEY,
+        summary TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def record(self, episode_id: int, summary: str) -> None:
+        """Record (or replace) the summary of an episode"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (episode_id, summary, created_at) VALUES (?, ?, ?)",
+                (episode_id, summary, time.time())
+            )
+    
+    def get(self, episode_id: int) -> Optional[str]:
+        """The recorded summary of an episode, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT summary FROM summaries WHERE episode_id = ?", (episode_id,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def summarized_ids(self, episode_ids: Iterable[int]) -> Set[int]:
+        """The subset of `episode_ids` that has a recorded summary"""
+        with self._lock:
+            recorded = {row[0] for row in self._conn.execute("SELECT episode_id FROM summaries")}
+        return recorded.intersection(episode_ids)
+    
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
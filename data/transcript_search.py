@@ -0,0 +1,265 @@
+"""
+Full-text search over episode transcripts with SQLite FTS5
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from data.models import Episode
+from data.podcast_db import PodcastDatabase
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all of its words
+    
+    Each word is quoted so punctuation and FTS5 operators in user input
+    cannot cause syntax errors; a trailing `*` keeps prefix matching.
+    """
+    terms = []
+    for word in re.findall(r"\w+\*?", text):
+        prefix = word.endswith('*')
+        word = word.rstrip('*')
+        terms.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(terms)
+
+
+class TranscriptSearchIndex:
+    """App-owned FTS5 index of every episode transcript
+    
+    Transcripts are read through PodcastDatabase (TTML file, falling back
+    to the snippet JSON) and indexed with the episode and podcast titles.
+    Like LibrarySync, an update is skipped while the library's
+    data_version is unchanged, and otherwise only re-indexes episodes
+    whose Z_OPT differs from the one recorded when they were indexed.
+    Episodes without a readable transcript are recorded too (with no
+    text), so they are only retried once their row changes.
+    Results are ranked with bm25, title matches weighted above body text.
+    
+    Transcripts are read outside the index lock, so searches keep being
+    answered from what is indexed so far while `update` (usually run on
+    the worker thread by `start_background_update`) works through the
+    library.
+    """
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        episode_id INTEGER PRIMARY KEY,
+        z_opt INTEGER,
+        podcast_id INTEGER,
+        podcast_title TEXT,
+        title TEXT,
+        description TEXT,
+        pub_date REAL,
+        duration REAL
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS transcript_fts USING fts5(
+        title, body, tokenize='porter unicode61'
+    );
+    """
+    
+    # bm25 column weights: (title, body)
+    TITLE_WEIGHT = 5.0
+    BODY_WEIGHT = 1.0
+    
+    def __init__(self, podcast_db: PodcastDatabase, index_path: str, batch_size: int = 100):
+        self.podcast_db = podcast_db
+        self.index_path = Path(index_path).expanduser()
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self._worker_condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_max_workers = 4
+        self._update_requested = False
+        self._update_running = False
+        self._last_version: Optional[Tuple[int, int]] = None
+        self._closed = False
+        
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+    
+    def update(self, max_workers: int = 4) -> Dict[str, int]:
+        """Index new and changed transcripts and drop removed ones
+        
+        Returns {'indexed', 'missing', 'deleted', 'skipped'} counts, where
+        `missing` episodes had no readable transcript; work is committed
+        in batches, so an interrupted update keeps what it finished.
+        """
+        with self._update_lock:
+            version = self.podcast_db.get_data_version()
+            if version == self._last_version:
+                return {'indexed': 0, 'missing': 0, 'deleted': 0, 'skipped': 1}
+            
+            started = time.monotonic()
+            remote = self.podcast_db.get_transcript_versions()
+            with self._lock:
+                local = dict(self._conn.execute("SELECT episode_id, z_opt FROM documents").fetchall())
+            changed_ids = [pk for pk, opt in remote.items() if local.get(pk) != opt]
+            deleted_ids = [pk for pk in local if pk not in remote]
+            
+            if deleted_ids:
+                with self._lock:
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    for episode_id in deleted_ids:
+                        self._delete(episode_id)
+                    self._conn.execute("COMMIT")
+            
+            indexed = missing = 0
+            for start in range(0, len(changed_ids), self.batch_size):
+                if self._closed:
+                    return {'indexed': indexed, 'missing': missing, 'deleted': len(deleted_ids), 'skipped': 0}
+                batch_indexed, batch_missing = self._index_batch(
+                    changed_ids[start:start + self.batch_size], max_workers
+                )
+                indexed += batch_indexed
+                missing += batch_missing
+            
+            self._last_version = version
+            if indexed or missing or deleted_ids:
+                self.logger.info(
+                    f"Transcript index: {indexed} indexed, {missing} without transcript, "
+                    f"{len(deleted_ids)} removed in {time.monotonic() - started:.2f}s"
+                )
+            return {'indexed': indexed, 'missing': missing, 'deleted': len(deleted_ids), 'skipped': 0}
+    
+    def start_background_update(self, max_workers: int = 4) -> bool:
+        """Ask the indexing worker to run `update` unless it already is
+        
+        The worker is one long-lived daemon thread, started on first use.
+        Its library connection lives as long as it does, so the
+        data_version check in `update` can skip unchanged libraries.
+        Returns whether a new update was requested.
+        """
+        with self._worker_condition:
+            if self._closed or self._update_requested or self._update_running:
+                return False
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run_worker, name="transcript-index", daemon=True)
+                self._worker.start()
+            self._worker_max_workers = max_workers
+            self._update_requested = True
+            self._worker_condition.notify_all()
+            return True
+    
+    def _run_worker(self) -> None:
+        while True:
+            with self._worker_condition:
+                while not self._update_requested and not self._closed:
+                    self._worker_condition.wait()
+                if self._closed:
+                    return
+                self._update_requested = False
+                self._update_running = True
+            try:
+                self.update(self._worker_max_workers)
+            except Exception as e:
+                self.logger.warning(f"Transcript index update failed: {e}")
+            finally:
+                with self._worker_condition:
+                    self._update_running = False
+                    self._worker_condition.notify_all()
+    
+    @property
+    def updating(self) -> bool:
+        """Whether a background update is requested or in progress"""
+        with self._worker_condition:
+            return self._update_requested or self._update_running
+    
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Wait for a background update to finish"""
+        with self._worker_condition:
+            self._worker_condition.wait_for(
+                lambda: not (self._update_requested or self._update_running), timeout
+            )
+    
+    def _index_batch(self, episode_ids: List[int], max_workers: int) -> Tuple[int, int]:
+        """Read one batch of transcripts, then index it in a single transaction
+        
+        Returns (indexed, missing) counts.
+        """
+        episodes = {row['id']: row for row in self.podcast_db.get_episode_rows(episode_ids)}
+        podcast_ids = list({row['podcast_id'] for row in episodes.values() if row['podcast_id']})
+        podcast_titles = {row['id']: row['title'] for row in self.podcast_db.get_podcast_rows(podcast_ids)}
+        transcripts = [
+            (episode_id, transcript)
+            for episode_id, transcript in self.podcast_db.get_episode_transcripts(episode_ids, max_workers)
+            if episode_id in episodes
+        ]
+        
+        indexed = missing = 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for episode_id, transcript in transcripts:
+                    episode = episodes[episode_id]
+                    self._delete(episode_id)
+                    self._conn.execute(
+                        "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (episode_id, episode['z_opt'], episode['podcast_id'],
+                         podcast_titles.get(episode['podcast_id']), episode['title'],
+                         episode['description'], episode['pub_date'], episode['duration'])
+                    )
+                    # Without a transcript only the document row is kept, recording
+                    # the Z_OPT so the episode is skipped until it changes
+                    if not transcript:
+                        missing += 1
+                        continue
+                    self._conn.execute(
+                        "INSERT INTO transcript_fts (rowid, title, body) VALUES (?, ?, ?)",
+                        (episode_id, episode['title'] or "", transcript)
+                    )
+                    indexed += 1
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return indexed, missing
+    
+    def _delete(self, episode_id: int) -> None:
+        self._conn.execute("DELETE FROM transcript_fts WHERE rowid = ?", (episode_id,))
+        self._conn.execute("DELETE FROM documents WHERE episode_id = ?", (episode_id,))
+    
+    def search(self, query: str, limit: int = 10) -> List[Episode]:
+        """Find episodes whose transcript or title matches all words of `query`
+        
+        Results are ordered by bm25 relevance and carry a highlighted
+        excerpt of the matching transcript text in `snippet`.
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        sql = f"""
+        SELECT documents.episode_id AS id, documents.podcast_id, documents.podcast_title,
+               documents.title, documents.description, documents.pub_date AS pub_timestamp,
+               documents.duration, 1 AS has_transcript,
+               snippet(transcript_fts, 1, '[', ']', '…', 16) AS snippet,
+               bm25(transcript_fts, {self.TITLE_WEIGHT}, {self.BODY_WEIGHT}) AS rank
+        FROM transcript_fts
+        INNER JOIN documents ON documents.episode_id = transcript_fts.rowid
+        WHERE transcript_fts MATCH ?
+        ORDER BY rank
+        LIMIT ?
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.row_factory = Episode.row_factory()
+            cursor.execute(sql, (match, limit))
+            return cursor.fetchall()
+    
+    def close(self) -> None:
+        """Close the index database; a background update stops after its current batch"""
+        with self._worker_condition:
+            self._closed = True
+            self._worker_condition.notify_all()
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,165 @@
+"""
+Persistent filename index of the Podcasts app TTML transcript cache
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class TTMLIndex:
+    """Maps TTML file names to their paths under the transcript cache
+    
+    The directory tree is recorded per directory (mtime, files, subdirs)
+    and saved as JSON. A refresh stats every known directory but only
+    lists the ones whose mtime changed, since adding or removing an entry
+    is what changes a directory's mtime. Lookups are dictionary hits.
+    """
+    
+    VERSION = 1
+    
+    def __init__(self, base_path: Path, index_path: Optional[Path] = None,
+                 min_refresh_seconds: float = 30):
+        self.base_path = base_path
+        self.index_path = index_path
+        self.min_refresh_seconds = min_refresh_seconds
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        self._names: Dict[str, str] = {}
+        self._last_refresh = 0.0
+        self._loaded = False
+    
+    @staticmethod
+    def _keys(filename: str) -> List[str]:
+        """Names a file is indexed under
+        
+        Cached files are sometimes stored as `<name>-<suffix>`, so the part
+        before the first dash is indexed as well.
+        """
+        keys = [filename]
+        if '-' in filename:
+            keys.append(filename.split('-', 1)[0])
+        return keys
+    
+    def _load(self) -> None:
+        """Read the persisted index, if any"""
+        self._loaded = True
+        if not self.index_path:
+            return
+        try:
+            with open(self.index_path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION and data.get('base_path') == str(self.base_path):
+                self._dirs = data['dirs']
+                self._rebuild_names()
+        except (FileNotFoundError, json.JSONDecodeError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                self.logger.warning(f"Ignoring unreadable TTML index {self.index_path}: {e}")
+    
+    def _save(self) -> None:
+        """Persist the index atomically"""
+        if not self.index_path:
+            return
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': self.VERSION, 'base_path': str(self.base_path),
+                       'dirs': self._dirs}, f)
+        os.replace(tmp_path, self.index_path)
+    
+    def _rebuild_names(self) -> None:
+        names = {}
+        for rel_dir, entry in self._dirs.items():
+            for filename in entry['files']:
+                rel_path = os.path.join(rel_dir, filename) if rel_dir else filename
+                for key in self._keys(filename):
+                    names.setdefault(key, rel_path)
+        self._names = names
+    
+    def refresh(self) -> bool:
+        """Re-list directories whose mtime changed; returns True if anything did"""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._last_refresh = time.monotonic()
+            
+            started = time.monotonic()
+            dirs: Dict[str, Dict[str, Any]] = {}
+            changed = False
+            pending = [""]
+            while pending:
+                rel_dir = pending.pop()
+                path = self.base_path / rel_dir if rel_dir else self.base_path
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except (FileNotFoundError, NotADirectoryError):
+                    changed = changed or rel_dir in self._dirs
+                    continue
+                
+                entry = self._dirs.get(rel_dir)
+                if entry is None or entry['mtime'] != mtime:
+                    entry = self._list_dir(path, mtime)
+                    changed = True
+                    if entry is None:
+                        continue
+                dirs[rel_dir] = entry
+                pending.extend(os.path.join(rel_dir, name) if rel_dir else name
+                               for name in entry['subdirs'])
+            
+            if changed or len(dirs) != len(self._dirs):
+                self._dirs = dirs
+                self._rebuild_names()
+                self._save()
+                self.logger.info(
+                    f"Indexed {len(self._names)} TTML names in {len(dirs)} directories "
+                    f"in {time.monotonic() - started:.2f}s"
+                )
+                return True
+            return False
+    
+    def _list_dir(self, path: Path, mtime: int) -> Optional[Dict[str, Any]]:
+        """List one directory into an index entry"""
+        files, subdirs = [], []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+        except (FileNotFoundError, NotADirectoryError, PermissionError):
+            return None
+        return {'mtime': mtime, 'files': files, 'subdirs': subdirs}
+    
+    def lookup(self, filename: str) -> Optional[Path]:
+        """Find a cached file by name, refreshing the index on a miss
+        
+        Misses refresh at most once per `min_refresh_seconds`, so repeated
+        lookups for transcripts that were never downloaded stay cheap.
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            first_use = not self._dirs
+        if first_use:
+            self.refresh()
+        
+        path = self._find(filename)
+        if path is None and time.monotonic() - self._last_refresh >= self.min_refresh_seconds:
+            if self.refresh():
+                path = self._find(filename)
+        return path
+    
+    def _find(self, filename: str) -> Optional[Path]:
+        for key in self._keys(filename):
+            rel_path = self._names.get(key)
+            if rel_path is not None:
+                path = self.base_path / rel_path
+                if path.is_file():
+                    return path
+        return None
@@ -0,0 +1,77 @@
+"""
+Streaming parser for Podcasts app TTML transcripts
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Union
+
+TTML_NS = "http://www.w3.org/ns/ttml"
+TTML_METADATA_NS = "http://www.w3.org/ns/ttml#metadata"
+
+# Paragraph tags with and without the TTML namespace
+_P_TAGS = {f"{{{TTML_NS}}}p", "p"}
+_AGENT_ATTR = f"{{{TTML_METADATA_NS}}}agent"
+
+_CLOCK_RE = re.compile(r"^(?:(\d+):)?(\d+):(\d+(?:\.\d+)?)$")
+_OFFSET_RE = re.compile(r"^(\d+(?:\.\d+)?)(h|m|s|ms)?$")
+_OFFSET_UNITS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001, None: 1.0}
+
+
+class Segment(NamedTuple):
+    """One timed paragraph of a transcript"""
+    begin: Optional[float]
+    end: Optional[float]
+    speaker: Optional[str]
+    text: str
+
+
+def parse_time(value: Optional[str]) -> Optional[float]:
+    """Convert a TTML time expression (`12.5`, `01:02.5`, `1:02:03`, `250ms`) to seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    match = _CLOCK_RE.match(value)
+    if match:
+        hours, minutes, seconds = match.groups()
+        return int(hours or 0) * 3600 + int(minutes) * 60 + float(seconds)
+    match = _OFFSET_RE.match(value)
+    if match:
+        return float(match.group(1)) * _OFFSET_UNITS[match.group(2)]
+    return None
+
+
+def iter_segments(source: Union[str, IO[bytes]]) -> Iterator[Segment]:
+    """Stream the `<p>` paragraphs of a TTML document as Segments
+    
+    `source` is a path or binary file object. Each paragraph is detached
+    from the tree once read, so memory stays flat however long the
+    episode is. Word-level `<span>`s are joined into the paragraph text.
+    Raises xml.etree.ElementTree.ParseError on malformed documents.
+    """
+    stack = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        
+        stack.pop()
+        if elem.tag not in _P_TAGS:
+            continue
+        
+        text = " ".join(piece.strip() for piece in elem.itertext() if piece.strip())
+        if text:
+            yield Segment(
+                parse_time(elem.get("begin")),
+                parse_time(elem.get("end")),
+                elem.get(_AGENT_ATTR),
+                text,
+            )
+        if stack:
+            stack[-1].remove(elem)
+        elem.clear()
+
+
+def segments_to_text(segments: Iterable[Segment]) -> str:
+    """Plain transcript text from segments"""
+    return " ".join(segment.text for segment in segments)
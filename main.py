@@ -3,7 +3,9 @@
 Podcast CLI - A simple CLI application for podcast management and summarization
 """
 
+import argparse
 import sys
+from datetime import datetime
 from pathlib import Path
 
 # Add the project root to the Python path
@@ -15,8 +17,53 @@ from config.settings import load_config
 from utils.helpers import setup_logging
 
 
+def parse_date(value: str) -> str:
+    """argparse type for YYYY-MM-DD dates"""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a YYYY-MM-DD date")
+    return value
+
+
+def positive_int(value: str) -> int:
+    """argparse type for counts that must be at least 1"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' is not a whole number")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"{number} is not a positive number")
+    return number
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse the command line; no command starts the interactive menu"""
+    parser = argparse.ArgumentParser(
+        description="Browse and summarize podcasts from the macOS Podcast app"
+    )
+    commands = parser.add_subparsers(dest='command')
+    
+    summarize = commands.add_parser(
+        'summarize', help="Summarize episodes in bulk without the menu",
+        description="Summarize every episode with a transcript that has no summary yet"
+    )
+    target = summarize.add_mutually_exclusive_group(required=True)
+    target.add_argument('--all', action='store_true', help="Episodes of all subscriptions")
+    target.add_argument('--podcast', help="Podcast id or part of its title")
+    summarize.add_argument('--since', type=parse_date, metavar='YYYY-MM-DD',
+                           help="Only episodes published on or after this date")
+    summarize.add_argument('--workers', type=positive_int, metavar='N',
+                           help="Concurrent summary requests (default: openai.max_concurrency)")
+    summarize.add_argument('--limit', type=positive_int, metavar='N', help="Summarize at most N episodes")
+    summarize.add_argument('--pdf', action='store_true', help="Save each new summary as a PDF")
+    summarize.add_argument('--rss', action='store_true', help="Add each new summary to the RSS feed")
+    return parser.parse_args(argv)
+
+
 def main():
     """Main application entry point"""
+    args = parse_args()
     try:
         # Setup logging
         setup_logging()
@@ -24,6 +71,13 @@ def main():
         # Load configuration
         config = load_config()
         
+        if args.command == 'summarize':
+            from ui.batch import run_summarize_command
+            sys.exit(run_summarize_command(
+                config, podcast=args.podcast, since=args.since, workers=args.workers,
+                limit=args.limit, pdf=args.pdf, rss=args.rss
+            ))
+        
         # Initialize and run the main menu
         menu = PodcastMenu(config)
         menu.run()
@@ -4,7 +4,9 @@ Test script for Podcast CLI components
 """
 
 import sys
+from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add the project root to the Python path
 project_root = Path(__file__).parent
@@ -69,6 +71,1194 @@ def test_cache():
         print(f"❌ Cache test failed: {e}")
 
 
+def test_cache_memory_tier():
+    """Test the in-memory LRU tier in front of the file cache"""
+    print("\nTesting cache memory tier...")
+    
+    try:
+        import tempfile
+        from utils.cache import MemoryCache
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            cache.set("subscriptions", [{"id": 1}])
+            
+            # A fresh instance has to read from disk once, then serves from memory
+            cache = Cache(tmp_dir)
+            assert cache.get("subscriptions") == [{"id": 1}]
+            assert cache.get("subscriptions") == [{"id": 1}]
+            stats = cache.get_stats()
+            assert stats['disk_hits'] == 1
+            assert stats['memory_hits'] == 1
+            print("✅ Memory tier serves repeat reads")
+        
+        lru = MemoryCache(max_entries=2, max_bytes=1024)
+        now = datetime.now().timestamp()
+        lru.set("a", 1, now, 10)
+        lru.set("b", 2, now, 10)
+        lru.get("a")
+        lru.set("c", 3, now, 10)
+        assert lru.get("b") is None
+        assert lru.get("a") is not None
+        lru.set("big", "x", now, 2048)
+        assert lru.get("big") is None
+        print("✅ Memory tier evicts least recently used entries")
+        
+    except Exception as e:
+        print(f"❌ Cache memory tier test failed: {e}")
+
+
+def test_cache_sqlite_backend():
+    """Test the single-file SQLite cache backend and file migration"""
+    print("\nTesting SQLite cache backend...")
+    
+    try:
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            Cache(tmp_dir).set("transcript_1", "hello world")
+            
+            # Existing .cache files are imported when the database is created
+            cache = Cache(tmp_dir, backend="sqlite")
+            assert cache.get("transcript_1") == "hello world"
+            assert not list(Path(tmp_dir).glob("*.cache"))
+            print("✅ File cache entries migrated")
+            
+            cache.set("summary_abc", "summary")
+            stats = cache.get_stats()
+            assert stats['backend'] == "sqlite"
+            assert stats['entries'] == 2
+            cache.clear()
+            assert cache.get_stats()['entries'] == 0
+            cache.close()
+            print("✅ SQLite backend set/get/stats/clear working")
+        
+    except Exception as e:
+        print(f"❌ SQLite cache backend test failed: {e}")
+
+
+def test_cache_sweep():
+    """Test expiry sweeps and size-quota eviction"""
+    print("\nTesting cache sweep...")
+    
+    try:
+        import os
+        import tempfile
+        import time
+        
+        for backend in ("file", "sqlite"):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                cache = Cache(tmp_dir, backend=backend, max_size_bytes=2500)
+                for i in range(5):
+                    cache.set(f"transcript_{i}", "x" * 1000)
+                    if backend == "file":
+                        # Spread access times so LRU order is deterministic
+                        path = cache.store._path(f"transcript_{i}")
+                        os.utime(path, (time.time() - 100 + i, time.time()))
+                
+                report = cache.sweep()
+                assert report['entries_removed'] == 3
+                assert report['bytes_reclaimed'] > 0
+                assert cache.get_stats()['size_bytes'] <= 2500
+                # Swept entries are gone from the memory tier as well
+                assert cache.get("transcript_0") is None
+                assert len(cache.memory) == 2
+                cache.memory.clear()
+                assert cache.get("transcript_4") is not None
+                assert cache.get("transcript_0") is None
+                cache.close()
+            print(f"✅ {backend} sweep enforces the size quota")
+        
+    except Exception as e:
+        print(f"❌ Cache sweep test failed: {e}")
+
+
+def test_cache_compression():
+    """Test transparent compression of large cache values"""
+    print("\nTesting cache compression...")
+    
+    try:
+        import pickle
+        import tempfile
+        
+        transcript = "And that is why we talk about sleep. " * 2000
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for codec in ("zlib", "lzma"):
+                cache = Cache(tmp_dir, compression=codec)
+                cache.set(f"transcript_{codec}", transcript)
+                raw = cache.store.read(f"transcript_{codec}")
+                assert raw.startswith(b"PCC") and raw[4] != 0  # codec byte
+                assert len(raw) < len(transcript) / 4
+                cache.memory.clear()
+                assert cache.get(f"transcript_{codec}") == transcript
+            print("✅ Large values compressed and restored")
+            
+            # Records written before compression existed are plain pickles
+            legacy = pickle.dumps({'data': "legacy", 'timestamp': datetime.now()})
+            cache.store.write("legacy_key", legacy, datetime.now().timestamp())
+            assert cache.get("legacy_key") == "legacy"
+            print("✅ Uncompressed records still readable")
+            
+            # Legacy records without a timestamp never expired; they survive
+            # the upgrade and are migrated when first read
+            import os
+            untimed = pickle.dumps({'data': "untimed"})
+            cache.store.write("untimed_key", untimed, 0)
+            week_ago = datetime.now().timestamp() - 7 * 86400
+            os.utime(cache.store._path("untimed_key"), (week_ago, week_ago))
+            cache.sweep()
+            assert cache.get("untimed_key") == "untimed"
+            assert cache.store.read("untimed_key").startswith(b"PCC")
+            cache.sweep()
+            cache.memory.clear()
+            assert cache.get("untimed_key") == "untimed"
+            print("✅ Legacy records without a timestamp kept and migrated")
+        
+    except Exception as e:
+        print(f"❌ Cache compression test failed: {e}")
+
+
+def test_cache_stale_while_revalidate():
+    """Test stale-while-revalidate reads"""
+    print("\nTesting stale-while-revalidate...")
+    
+    try:
+        import tempfile
+        import threading
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir, stale_after_hours=0)
+            cache.set("subscriptions", ["old"])
+            
+            refreshed = threading.Event()
+            
+            def refresh():
+                refreshed.set()
+                return ["new"]
+            
+            assert cache.get("subscriptions", revalidate=refresh) == ["old"]
+            assert refreshed.wait(5)
+            for _ in range(50):
+                if cache.get("subscriptions") == ["new"]:
+                    break
+                threading.Event().wait(0.05)
+            assert cache.get("subscriptions") == ["new"]
+            print("✅ Stale value served and refreshed in background")
+        
+    except Exception as e:
+        print(f"❌ Stale-while-revalidate test failed: {e}")
+
+
+def test_cache_single_flight():
+    """Test atomic writes and single-flight get_or_compute"""
+    print("\nTesting single-flight cache fills...")
+    
+    try:
+        import tempfile
+        import threading
+        import time
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            calls = []
+            
+            def compute():
+                calls.append(1)
+                time.sleep(0.1)
+                return "summary text"
+            
+            results = []
+            threads = [
+                threading.Thread(target=lambda: results.append(cache.get_or_compute("summary_x", compute)))
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            assert len(calls) == 1
+            assert results == ["summary text"] * 5
+            assert not list(Path(tmp_dir).glob("*.tmp"))
+            print("✅ Concurrent misses computed once")
+            
+            # Idle lock files are swept; a held one is left alone
+            from utils.cache_backends import FileLock, hash_key
+            cache.get_or_compute("summary_y", lambda: "other")
+            assert len(list(Path(tmp_dir, "locks").glob("*.lock"))) == 2
+            with FileLock(Path(tmp_dir, "locks", f"{hash_key('summary_x')}.lock")):
+                assert cache.sweep()['locks_removed'] == 1
+            assert cache.sweep()['locks_removed'] == 1
+            assert not list(Path(tmp_dir, "locks").glob("*.lock"))
+            assert cache.get_or_compute("summary_z", lambda: "again") == "again"
+            print("✅ Idle lock files removed by the sweep")
+        
+    except Exception as e:
+        print(f"❌ Single-flight test failed: {e}")
+
+
+def test_cache_record_format():
+    """Test the versioned cache record envelope"""
+    print("\nTesting cache record format...")
+    
+    try:
+        import tempfile
+        import time
+        from utils.cache_format import CorruptRecordError, decode_record, encode_record, read_created_at
+        
+        created_at = time.time()
+        value = [{"id": 1, "title": "Episode", "has_transcript": True}]
+        record, size = encode_record(value, created_at)
+        assert read_created_at(record) == created_at
+        assert decode_record(record)[1] == value
+        
+        # Types marshal cannot handle fall back to pickle
+        record, _ = encode_record({"when": datetime(2025, 1, 1)}, created_at)
+        assert decode_record(record)[1] == {"when": datetime(2025, 1, 1)}
+        print("✅ Records round-trip")
+        
+        try:
+            decode_record(record[:-3])
+            assert False, "truncated record decoded"
+        except CorruptRecordError:
+            pass
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            cache.store.write("episodes_1_10", b"PCC\x01garbage", created_at)
+            assert cache.get("episodes_1_10") is None
+            assert cache.store.read("episodes_1_10") is None
+        print("✅ Corrupt records detected and removed")
+        
+    except Exception as e:
+        print(f"❌ Cache record format test failed: {e}")
+
+
+def test_cache_metrics():
+    """Test per-namespace cache instrumentation"""
+    print("\nTesting cache metrics...")
+    
+    try:
+        import json
+        import tempfile
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            cache.set("episodes_1_10", [{"id": 1}])
+            cache.get("episodes_1_10")
+            cache.get("episodes_2_10")
+            cache.get("summary_abc")
+            
+            stats = cache.get_stats()
+            episodes = stats['namespaces']['episodes']
+            assert episodes['memory_hit'] == 1
+            assert episodes['miss'] == 1
+            assert episodes['hit_ratio'] == 0.5
+            assert stats['namespaces']['summary']['miss'] == 1
+            assert json.loads(cache.get_stats_json())['namespaces']['episodes']['writes'] == 1
+            
+            formatted = DisplayFormatter.format_cache_stats(stats)
+            assert "episodes" in formatted
+            print("✅ Namespace metrics recorded and rendered")
+        
+    except Exception as e:
+        print(f"❌ Cache metrics test failed: {e}")
+
+
+class FakeOpenAI:
+    """Stand-in for the OpenAI/AsyncOpenAI client used by the summarizer tests
+    
+    `reply(prompt)` gives the completion text (or raises, failing the
+    request). Prompts are recorded in order, and for the async client the
+    requests in flight are counted while each one sleeps `delay(prompt)`.
+    """
+    
+    def __init__(self, reply=lambda prompt: "Summary", is_async=False, delay=lambda prompt: 0):
+        self.reply = reply
+        self.delay = delay
+        self.prompts = []
+        self.active = self.peak = self.cancelled = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(
+            create=self._acreate if is_async else self._create
+        ))
+    
+    @property
+    def calls(self):
+        return len(self.prompts)
+    
+    def _respond(self, prompt):
+        content = self.reply(prompt)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+    
+    def _create(self, **kwargs):
+        prompt = kwargs['messages'][1]['content']
+        self.prompts.append(prompt)
+        return self._respond(prompt)
+    
+    async def _acreate(self, **kwargs):
+        import asyncio
+        prompt = kwargs['messages'][1]['content']
+        self.prompts.append(prompt)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay(prompt))
+            return self._respond(prompt)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+
+
+def create_test_library(path, podcasts=2, episodes_per_podcast=3):
+    """Create a minimal MTLibrary.sqlite with the tables the app reads"""
+    import sqlite3
+    
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE ZMTPODCAST (
+            Z_PK INTEGER PRIMARY KEY, Z_OPT INTEGER, ZTITLE VARCHAR, ZAUTHOR VARCHAR,
+            ZITEMDESCRIPTION VARCHAR, ZFEEDURL VARCHAR, ZIMAGEURL VARCHAR
+        );
+        CREATE TABLE ZMTEPISODE (
+            Z_PK INTEGER PRIMARY KEY, Z_OPT INTEGER, ZPODCAST INTEGER, ZTITLE VARCHAR,
+            ZITEMDESCRIPTION VARCHAR, ZPUBDATE TIMESTAMP, ZDURATION FLOAT, ZASSETURL VARCHAR,
+            ZENTITLEDTRANSCRIPTSNIPPET VARCHAR, ZFREETRANSCRIPTSNIPPET VARCHAR,
+            ZTRANSCRIPTIDENTIFIER VARCHAR, ZPLAYHEAD FLOAT, ZPLAYSTATE INTEGER
+        );
+    """)
+    episode_id = 1
+    for podcast_id in range(1, podcasts + 1):
+        conn.execute(
+            "INSERT INTO ZMTPODCAST VALUES (?, 1, ?, ?, ?, ?, ?)",
+            (podcast_id, f"Podcast {podcast_id}", f"Author {podcast_id}",
+             "Description", f"https://example.com/{podcast_id}.xml", None)
+        )
+        for i in range(episodes_per_podcast):
+            snippet = '[{"content": "Transcript text for episode %d of podcast %d, long enough to summarize."}]' % (i, podcast_id)
+            conn.execute(
+                "INSERT INTO ZMTEPISODE VALUES (?, 1, ?, ?, ?, ?, ?, NULL, ?, NULL, NULL, 0, 0)",
+                (episode_id, podcast_id, f"Episode {i}", "Episode description",
+                 700000000 + i * 86400, 3600, snippet)
+            )
+            episode_id += 1
+    conn.commit()
+    conn.close()
+
+
+def test_podcast_database():
+    """Test the read-only persistent database connection"""
+    print("\nTesting podcast database...")
+    
+    try:
+        import os
+        import shutil
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            db = PodcastDatabase(str(library))
+            
+            assert len(db.get_subscriptions()) == 2
+            episodes = db.get_episodes(1)
+            assert len(episodes) == 3
+            assert all(episode['has_transcript'] for episode in episodes)
+            assert episodes[0]['entitled_transcript'] is None
+            assert "Transcript text" in db.get_episodes(1, include_snippets=True)[0]['entitled_transcript']
+            assert "Transcript text" in db.get_episode_transcript(episodes[0]['id'])
+            print("✅ Episode listing skips snippet payloads, transcript loads on demand")
+            
+            transcripts = dict(db.get_episode_transcripts([1, 2, 3, 99], chunk_size=2))
+            assert transcripts[99] is None
+            assert all("Transcript text" in transcripts[i] for i in (1, 2, 3))
+            print("✅ Bulk transcript retrieval returns every requested episode")
+            assert db._get_connection() is db._get_connection()
+            print("✅ Connection reused across queries")
+            
+            # Replacing the file (as the Podcasts app does) forces a reconnect
+            replacement = Path(tmp_dir) / "replacement.sqlite"
+            create_test_library(replacement, podcasts=3)
+            os.replace(replacement, library)
+            assert len(db.get_subscriptions()) == 3
+            print("✅ Reconnected after the database file was replaced")
+            
+            import threading
+            for _ in range(20):
+                thread = threading.Thread(target=db.get_subscriptions)
+                thread.start()
+                thread.join()
+            assert len(db._connections) == 1
+            print("✅ Connections of finished threads are closed")
+            
+            try:
+                db._get_connection().execute("DELETE FROM ZMTEPISODE")
+                assert False, "write succeeded on read-only connection"
+            except Exception:
+                pass
+            db.close()
+            print("✅ Connection is read-only")
+        
+    except Exception as e:
+        print(f"❌ Podcast database test failed: {e}")
+        raise
+
+
+def test_library_snapshot():
+    """Test reading from a local snapshot of the library"""
+    print("\nTesting library snapshot...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            db = PodcastDatabase(str(library), snapshot_dir=str(Path(tmp_dir) / "snapshot"),
+                                 snapshot_refresh_seconds=0)
+            
+            assert len(db.get_subscriptions()) == 2
+            assert db.snapshot.snapshot_path.exists()
+            assert db.snapshot.refresh() is False
+            print("✅ Snapshot copied once and reused while unchanged")
+            
+            conn = sqlite3.connect(str(library))
+            conn.execute("INSERT INTO ZMTPODCAST (Z_PK, ZTITLE) VALUES (9, 'New Podcast')")
+            conn.execute("INSERT INTO ZMTEPISODE (Z_PK, ZPODCAST, ZFREETRANSCRIPTSNIPPET) VALUES (99, 9, '[]')")
+            conn.commit()
+            conn.close()
+            
+            assert len(db.get_subscriptions()) == 3
+            db.close()
+            print("✅ Snapshot refreshed after the source changed")
+        
+    except Exception as e:
+        print(f"❌ Library snapshot test failed: {e}")
+
+
+def test_library_queries():
+    """Test schema detection and the prepared query layer"""
+    print("\nTesting library queries...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        from data.queries import EPISODE_INDEX, SchemaError
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            db = PodcastDatabase(str(library), snapshot_dir=str(Path(tmp_dir) / "snapshot"))
+            assert len(db.get_subscriptions()) == 2
+            conn = db._get_connection()
+            queries = db._queries()
+            query, params = queries.episode_page(before=(700000000, 3))
+            assert queries.episode_page(before=(1, 1))[0] is query
+            plan = " ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", (1, *params, 10)))
+            assert EPISODE_INDEX in plan and "TEMP B-TREE" not in plan
+            db.close()
+            print("✅ Snapshot indexed for seeks, statements built once")
+            
+            conn = sqlite3.connect(str(library))
+            conn.execute("ALTER TABLE ZMTEPISODE RENAME COLUMN ZITEMDESCRIPTION TO ZITEMDESCRIPTIONWITHOUTHTML")
+            conn.execute("ALTER TABLE ZMTEPISODE DROP COLUMN ZPLAYHEAD")
+            conn.commit()
+            db = PodcastDatabase(str(library))
+            episode = db.get_episodes(1)[0]
+            assert episode['description'] == "Episode description"
+            assert episode['playback_position'] is None
+            db.close()
+            
+            conn.execute("ALTER TABLE ZMTEPISODE DROP COLUMN ZPODCAST")
+            conn.commit()
+            conn.close()
+            db = PodcastDatabase(str(library))
+            try:
+                db.get_subscriptions()
+                assert False, "missing ZPODCAST not detected"
+            except SchemaError as e:
+                assert "ZPODCAST" in str(e)
+            db.close()
+            print("✅ Renamed and missing columns detected from the schema")
+        
+    except Exception as e:
+        print(f"❌ Library queries test failed: {e}")
+
+
+def test_library_sync():
+    """Test the incrementally synced library mirror"""
+    print("\nTesting library sync...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        from data.library_sync import LibrarySync
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            db = PodcastDatabase(str(library))
+            sync = LibrarySync(db, str(Path(tmp_dir) / "library.sqlite"))
+            
+            result = sync.sync()
+            assert result['podcasts'] == (2, 0) and result['episodes'] == (6, 0)
+            assert len(sync.get_subscriptions()) == 2
+            assert len(sync.get_episodes(1)) == 3
+            assert sync.sync()['skipped'] is True
+            print("✅ Initial sync mirrored the library, unchanged library skipped")
+            
+            conn = sqlite3.connect(str(library))
+            conn.execute("UPDATE ZMTEPISODE SET ZTITLE = 'Renamed', Z_OPT = 2 WHERE Z_PK = 1")
+            conn.execute("DELETE FROM ZMTEPISODE WHERE Z_PK = 2")
+            conn.commit()
+            conn.close()
+            
+            result = sync.sync()
+            assert result['episodes'] == (1, 1) and result['podcasts'] == (0, 0)
+            titles = [episode['title'] for episode in sync.get_episodes(1)]
+            assert 'Renamed' in titles and len(titles) == 2
+            counts = {podcast['id']: podcast['episode_count'] for podcast in sync.get_subscriptions()}
+            assert counts == {1: 2, 2: 3}
+            
+            # Moving an episode updates the stats of both podcasts
+            conn = sqlite3.connect(str(library))
+            conn.execute("UPDATE ZMTEPISODE SET ZPODCAST = 2, Z_OPT = 3 WHERE Z_PK = 1")
+            conn.commit()
+            conn.close()
+            sync.sync()
+            counts = {podcast['id']: podcast['episode_count'] for podcast in sync.get_subscriptions()}
+            assert counts == {1: 1, 2: 4}
+            print("✅ Only changed and deleted rows were applied, podcast stats kept current")
+            
+            import threading
+            results = []
+            thread = threading.Thread(target=lambda: results.append(sync.sync()))
+            thread.start()
+            thread.join()
+            assert results[0]['skipped'] is True
+            sync.close()
+            db.close()
+            
+            # A new run skips an unchanged library, but not one changed meanwhile
+            db = PodcastDatabase(str(library))
+            sync = LibrarySync(db, str(Path(tmp_dir) / "library.sqlite"))
+            assert sync.sync()['skipped'] is True
+            sync.close()
+            conn = sqlite3.connect(str(library))
+            conn.execute("UPDATE ZMTEPISODE SET ZTITLE = 'Again', Z_OPT = 4 WHERE Z_PK = 1")
+            conn.commit()
+            conn.close()
+            sync = LibrarySync(db, str(Path(tmp_dir) / "library.sqlite"))
+            assert sync.sync()['episodes'] == (1, 0)
+            print("✅ Unchanged library skipped from other threads and after a restart")
+            
+            from unittest import mock
+            from data.episode_manager import EpisodeManager
+            manager = EpisodeManager(db, Cache(str(Path(tmp_dir) / "cache")), library_sync=sync)
+            with mock.patch.object(sync, 'get_subscriptions', wraps=sync.get_subscriptions) as loads:
+                assert len(manager.get_subscriptions()) == 2
+                assert len(manager.get_subscriptions()) == 2
+                assert loads.call_count == 1
+            assert "Again" in [episode['title'] for episode in manager.get_episodes_page(2)['episodes']]
+            sync.close()
+            db.close()
+            print("✅ Listings from the mirror are served through the cache tier")
+        
+    except Exception as e:
+        print(f"❌ Library sync test failed: {e}")
+        raise
+
+
+def test_episode_paging():
+    """Test keyset pagination of episode listings"""
+    print("\nTesting episode paging...")
+    
+    try:
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        from data.library_sync import LibrarySync
+        from data.episode_manager import EpisodeManager
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library, podcasts=1, episodes_per_podcast=25)
+            db = PodcastDatabase(str(library))
+            sync = LibrarySync(db, str(Path(tmp_dir) / "library.sqlite"))
+            
+            for library_sync in (None, sync):
+                cache = Cache(str(Path(tmp_dir) / f"cache_{library_sync is None}"))
+                manager = EpisodeManager(db, cache, library_sync)
+                
+                first = manager.get_episodes_page(1, limit=10)
+                assert [e['id'] for e in first['episodes']] == list(range(25, 15, -1))
+                assert first['previous'] is None
+                second = manager.get_episodes_page(1, limit=10, before=first['next'])
+                last = manager.get_episodes_page(1, limit=10, before=second['next'])
+                assert [e['id'] for e in last['episodes']] == [5, 4, 3, 2, 1]
+                assert last['next'] is None
+                back = manager.get_episodes_page(1, limit=10, after=last['previous'])
+                assert back['episodes'] == second['episodes']
+                assert manager.get_episodes(1, limit=3)[0]['id'] == 25
+            
+            sync.close()
+            db.close()
+            print("✅ Pages follow (pub date, id) cursors in both directions")
+        
+    except Exception as e:
+        print(f"❌ Episode paging test failed: {e}")
+
+
+def test_ttml_index():
+    """Test the persistent TTML filename index"""
+    print("\nTesting TTML index...")
+    
+    try:
+        import os
+        import tempfile
+        from data.ttml_index import TTMLIndex
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            base = Path(tmp_dir) / "TTML"
+            nested = base / "PodcastContent1" / "v4" / "ab"
+            nested.mkdir(parents=True)
+            (nested / "transcript_1.ttml-transcript_1.ttml").write_text("<tt/>")
+            index_path = Path(tmp_dir) / "ttml_index.json"
+            
+            index = TTMLIndex(base, index_path, min_refresh_seconds=0)
+            assert index.lookup("transcript_1.ttml") == nested / "transcript_1.ttml-transcript_1.ttml"
+            assert index_path.exists()
+            assert index.refresh() is False
+            print("✅ Files found by name, unchanged tree not re-listed")
+            
+            # A new file changes its directory's mtime and is picked up
+            other = base / "PodcastContent2"
+            other.mkdir()
+            (other / "transcript_2.ttml").write_text("<tt/>")
+            os.utime(base, ns=(0, 0))
+            reloaded = TTMLIndex(base, index_path, min_refresh_seconds=0)
+            assert reloaded.lookup("transcript_2.ttml") == other / "transcript_2.ttml"
+            assert reloaded.lookup("transcript_1.ttml") is not None
+            print("✅ Persisted index reloaded and refreshed incrementally")
+        
+    except Exception as e:
+        print(f"❌ TTML index test failed: {e}")
+
+
+def test_ttml_parser():
+    """Test the streaming TTML segment parser"""
+    print("\nTesting TTML parser...")
+    
+    try:
+        import io
+        from data.ttml_parser import iter_segments, parse_time, segments_to_text
+        
+        ttml = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tt xmlns="http://www.w3.org/ns/ttml" xmlns:ttm="http://www.w3.org/ns/ttml#metadata">
+<body><div>
+<p begin="0.5" end="00:00:02.250" ttm:agent="SPEAKER_1"><span>Hello</span> <span>there.</span></p>
+<p begin="1:02.0" end="62500ms" ttm:agent="SPEAKER_2"><span>Welcome</span> <span>back.</span></p>
+</div></body></tt>"""
+        segments = list(iter_segments(io.BytesIO(ttml)))
+        assert len(segments) == 2
+        assert segments[0] == (0.5, 2.25, "SPEAKER_1", "Hello there.")
+        assert segments[1].begin == 62.0 and segments[1].end == 62.5
+        assert segments_to_text(segments) == "Hello there. Welcome back."
+        assert parse_time("1:00:00") == 3600 and parse_time("bogus") is None
+        print("✅ Segments carry timing, speaker and text")
+        
+    except Exception as e:
+        print(f"❌ TTML parser test failed: {e}")
+
+
+def test_segment_index():
+    """Test time-range lookups on transcript segments"""
+    print("\nTesting segment index...")
+    
+    try:
+        import tempfile
+        from types import SimpleNamespace
+        from data.episode_manager import EpisodeManager
+        from data.segment_index import SegmentIndex
+        from data.ttml_parser import Segment
+        
+        # Silence between 10s and 20s
+        segments = [
+            Segment(0.0, 5.0, "SPEAKER_1", "Hello there."),
+            Segment(5.0, 10.0, "SPEAKER_2", "Welcome back."),
+            Segment(20.0, 30.0, "SPEAKER_1", "After the break."),
+        ]
+        index = SegmentIndex.from_dict(SegmentIndex.from_segments(segments).to_dict())
+        assert len(index) == 3 and index.segment(1) == segments[1]
+        assert index.index_at(0.0) == 0 and index.index_at(5.0) == 1
+        assert index.index_at(10.0) is None and index.index_at(15.0) is None
+        assert index.index_at(30.0) is None and index.index_at(-1.0) is None
+        assert index.text_between(0, 5) == "Hello there."
+        assert index.text_between(4.99, 5.01) == "Hello there. Welcome back."
+        assert index.text_between(10, 20) == "" and index.segments_between(10, 20) == []
+        assert index.text_between(9.5, 20.5) == "Welcome back. After the break."
+        assert index.text_between(7, 8) == "Welcome back."
+        assert index.segments_between(100, 200) == []
+        print("✅ Segment index answers time-range lookups at boundaries and gaps")
+        
+        calls = []
+        
+        def get_episode_segments(episode_id):
+            calls.append(episode_id)
+            return segments if episode_id == 1 else None
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            manager = EpisodeManager(SimpleNamespace(get_episode_segments=get_episode_segments), Cache(tmp_dir))
+            assert manager.get_transcript_range(1, 3, 6) == "Hello there. Welcome back."
+            assert manager.get_transcript_range(1, 12, 18) == ""
+            assert [s.text for s in manager.get_segments_between(1, 10, 25)] == ["After the break."]
+            assert manager.get_segment_at(1, 5.0).speaker == "SPEAKER_2"
+            assert manager.get_segment_at(1, 15.0) is None
+            assert calls == [1]
+            assert manager.get_transcript_range(2, 0, 60) is None
+            assert manager.get_segments_between(2, 0, 60) == []
+            assert manager.get_segment_at(2, 1.0) is None
+            print("✅ EpisodeManager time lookups use the cached index")
+            
+            outdated = dict(manager.cache.get("segments_1"), version=SegmentIndex.VERSION - 1)
+            manager.cache.set("segments_1", outdated)
+            assert manager.get_segment_at(1, 5.0).speaker == "SPEAKER_2"
+            assert manager.cache.get("segments_1")['version'] == SegmentIndex.VERSION
+            assert calls.count(1) == 2 and calls[-1] == 1
+            print("✅ Index cached in an older format rebuilt")
+        
+    except Exception as e:
+        print(f"❌ Segment index test failed: {e}")
+        raise
+
+
+def test_transcript_search():
+    """Test the FTS5 transcript index"""
+    print("\nTesting transcript search...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        from data.transcript_search import TranscriptSearchIndex, fts_query
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            db = PodcastDatabase(str(library), ttml_dir=str(Path(tmp_dir) / "TTML"))
+            index = TranscriptSearchIndex(db, str(Path(tmp_dir) / "search.sqlite"))
+            
+            assert index.update()['indexed'] == 6
+            assert index.update()['skipped'] == 1
+            results = index.search("episode 2 of podcast 1")
+            assert results[0]['id'] == 3 and results[0]['podcast_title'] == "Podcast 1"
+            assert "[podcast]" in results[0]['snippet'].lower()
+            assert index.search('summar*') and not index.search('"unbalanced')
+            assert fts_query('AND OR "x"') == '"AND" "OR" "x"'
+            print("✅ Transcripts indexed and ranked with highlighted snippets")
+            
+            conn = sqlite3.connect(str(library))
+            conn.execute("""UPDATE ZMTEPISODE SET Z_OPT = 2,
+                            ZENTITLEDTRANSCRIPTSNIPPET = '[{"content": "Now this one is all about volcanoes and lava flows."}]'
+                            WHERE Z_PK = 1""")
+            conn.execute("DELETE FROM ZMTEPISODE WHERE Z_PK = 2")
+            conn.commit()
+            conn.close()
+            
+            assert index.update() == {'indexed': 1, 'missing': 0, 'deleted': 1, 'skipped': 0}
+            assert [r['id'] for r in index.search("volcanoes")] == [1]
+            print("✅ Only changed transcripts re-indexed")
+            
+            # An unusable transcript is recorded and not retried until its row changes
+            conn = sqlite3.connect(str(library))
+            conn.execute("""UPDATE ZMTEPISODE SET Z_OPT = 2,
+                            ZENTITLEDTRANSCRIPTSNIPPET = '[{"content": "Too short."}]' WHERE Z_PK = 3""")
+            conn.commit()
+            assert index.update() == {'indexed': 0, 'missing': 1, 'deleted': 0, 'skipped': 0}
+            conn.execute("UPDATE ZMTEPISODE SET Z_OPT = 2 WHERE Z_PK = 4")
+            conn.commit()
+            conn.close()
+            assert index.update() == {'indexed': 1, 'missing': 0, 'deleted': 0, 'skipped': 0}
+            assert 3 not in [r['id'] for r in index.search("episode 2 of podcast 1")]
+            index.close()
+            print("✅ Episodes without a transcript skipped until they change")
+            
+            from unittest import mock
+            from data.episode_manager import EpisodeManager
+            index = TranscriptSearchIndex(db, str(Path(tmp_dir) / "fresh.sqlite"))
+            manager = EpisodeManager(db, Cache(str(Path(tmp_dir) / "cache")), transcript_search=index)
+            with mock.patch.object(db, 'get_transcript_versions', wraps=db.get_transcript_versions) as scans:
+                manager.search_transcripts("volcanoes")
+                index.wait(10)
+                assert not index.updating
+                assert [r['id'] for r in manager.search_transcripts("volcanoes")] == [1]
+                index.wait(10)
+                assert scans.call_count == 1
+            index.close()
+            db.close()
+            print("✅ Index built in the background without blocking searches")
+            print("✅ Searches on an unchanged library do not rescan it")
+        
+    except Exception as e:
+        print(f"❌ Transcript search test failed: {e}")
+        raise
+
+
+def test_title_search():
+    """Test ranked podcast and episode title search"""
+    print("\nTesting title search...")
+    
+    try:
+        import sqlite3
+        import tempfile
+        from data.podcast_db import PodcastDatabase
+        from data.library_sync import LibrarySync
+        from data.episode_manager import EpisodeManager
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library, podcasts=3, episodes_per_podcast=4)
+            conn = sqlite3.connect(str(library))
+            conn.execute("UPDATE ZMTPODCAST SET ZTITLE = 'Huberman Lab', ZAUTHOR = 'Scicomm Media' WHERE Z_PK = 1")
+            conn.execute("UPDATE ZMTPODCAST SET ZTITLE = 'Lex Fridman Podcast' WHERE Z_PK = 2")
+            conn.execute("UPDATE ZMTEPISODE SET ZTITLE = 'Sleep and dreams' WHERE Z_PK = 1")
+            conn.execute("UPDATE ZMTEPISODE SET ZTITLE = 'Better sleep habits' WHERE Z_PK = 12")
+            conn.commit()
+            
+            db = PodcastDatabase(str(library))
+            sync = LibrarySync(db, str(Path(tmp_dir) / "library.sqlite"))
+            manager = EpisodeManager(db, Cache(str(Path(tmp_dir) / "cache")), sync)
+            
+            assert [p['id'] for p in manager.search_podcasts("huberman")] == [1]
+            assert [p['id'] for p in manager.search_podcasts("hubreman")] == [1]
+            assert [p['id'] for p in manager.search_podcasts("sc")] == [1]
+            # Equal matches: the more recent episode ranks first
+            assert [e['id'] for e in manager.search_episodes("sleep")] == [12, 1]
+            assert [e['id'] for e in manager.search_episodes("slepe", podcast_id=1)] == [1]
+            print("✅ Substring, prefix and misspelled titles found, recent first")
+            
+            conn.execute("UPDATE ZMTEPISODE SET ZTITLE = 'Volcanoes', Z_OPT = 2 WHERE Z_PK = 1")
+            conn.commit()
+            conn.close()
+            # Searches reuse a recent sync; listing subscriptions syncs again
+            assert [e['id'] for e in manager.search_episodes("sleep")] == [12, 1]
+            manager.get_subscriptions()
+            assert [e['id'] for e in manager.search_episodes("sleep")] == [12]
+            assert [e['id'] for e in manager.search_episodes("volcano")] == [1]
+            
+            fallback = EpisodeManager(db, Cache(str(Path(tmp_dir) / "cache_like")))
+            assert [p['id'] for p in fallback.search_podcasts("Lex")] == [2]
+            sync.close()
+            
+            # Without the trigram tokenizer, candidates come from LIKE
+            from unittest import mock
+            with mock.patch('data.library_sync.supports_trigram', return_value=False):
+                plain = LibrarySync(db, str(Path(tmp_dir) / "plain.sqlite"))
+            plain.sync()
+            assert [p['id'] for p in plain.search_podcasts("hubreman")] == [1]
+            assert [e['id'] for e in plain.search_episodes("sleep")] == [12]
+            plain.close()
+            db.close()
+            print("✅ Title index follows library changes")
+        
+    except Exception as e:
+        print(f"❌ Title search test failed: {e}")
+
+
+def test_models():
+    """Test the slotted podcast and episode records"""
+    print("\nTesting record models...")
+    
+    try:
+        import pickle
+        import sqlite3
+        from data.models import Episode, Podcast
+        from utils.helpers import format_duration
+        
+        episode = Episode(id=7, podcast_id=1, title="Sleep and dreams", duration=3660,
+                          pub_timestamp=700000000, has_transcript=1)
+        assert episode['title'] == "Sleep and dreams" and episode.get('rank') is None
+        assert episode['duration_formatted'] == format_duration(3660)
+        assert episode['pub_date'] and episode['description_display'] == "No description available"
+        assert 'title_display' in episode and 'missing' not in episode
+        assert episode.get('missing', 'default') == 'default'
+        assert dict(episode.items())['id'] == 7
+        assert not hasattr(episode, '__dict__')
+        print("✅ Records read like dicts, display fields computed on access")
+        
+        pickled = pickle.dumps(episode, protocol=pickle.HIGHEST_PROTOCOL)
+        assert pickle.loads(pickled) == episode
+        assert len(pickled) < len(pickle.dumps(episode.to_dict(), protocol=pickle.HIGHEST_PROTOCOL))
+        print("✅ Records pickle compactly and round-trip")
+        
+        conn = sqlite3.connect(":memory:")
+        conn.row_factory = Podcast.row_factory()
+        podcast = conn.execute("SELECT 3 AS id, 'Huberman Lab' AS title, 12 AS episode_count").fetchone()
+        assert isinstance(podcast, Podcast) and podcast['episode_count'] == 12
+        assert podcast['author'] is None and podcast['title_display'] == "Huberman Lab"
+        conn.close()
+        print("✅ row_factory maps columns to fields by name")
+        
+    except Exception as e:
+        print(f"❌ Models test failed: {e}")
+
+
+def test_async_summarizer():
+    """Test bounded-concurrency async summarization"""
+    print("\nTesting async summarizer...")
+    
+    try:
+        import asyncio
+        import tempfile
+        from ai.async_summarizer import AsyncTranscriptSummarizer
+        from ai.summarizer import summary_cache_key
+        
+        client = FakeOpenAI(lambda prompt: " Summary ", is_async=True,
+                            delay=lambda prompt: 5 if "slow" in prompt else 0.01)
+        transcripts = {i: f"Transcript {i} " + "words " * 20 for i in range(1, 7)}
+        episodes = [{'id': i, 'title': f"Episode {i}"} for i in transcripts]
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            cache.set(summary_cache_key(transcripts[1]), "Cached summary")
+            summarizer = AsyncTranscriptSummarizer({}, cache, client=client, max_concurrency=2,
+                                                   request_timeout=0.5)
+            finished = []
+            results = asyncio.run(summarizer.asummarize_many(
+                episodes, lambda episode: transcripts[episode['id']],
+                on_result=lambda episode, summary: finished.append(episode['id'])
+            ))
+            assert results[1] == "Cached summary" and results[2] == "Summary"
+            assert client.calls == 5 and client.peak == 2
+            assert sorted(finished) == list(transcripts)
+            assert cache.get(summary_cache_key(transcripts[3])) == "Summary"
+            print("✅ Concurrency bounded, summaries shared through the cache")
+            
+            slow = "slow " * 20
+            assert asyncio.run(summarizer.asummarize(slow)) is None
+            assert client.cancelled == 1
+            
+            async def cancel_batch():
+                batch = asyncio.ensure_future(summarizer.asummarize_many(
+                    [{'id': i, 'title': "slow"} for i in range(10)], lambda episode: slow + str(episode['id'])
+                ))
+                await asyncio.sleep(0.1)
+                batch.cancel()
+                try:
+                    await batch
+                except asyncio.CancelledError:
+                    return True
+            
+            assert asyncio.run(cancel_batch()) and client.active == 0
+            assert client.calls == 8
+            print("✅ Timed out and cancelled requests are abandoned")
+            
+            # A second cache on the same directory stands in for another process
+            shared = "Shared transcript " + "words " * 20
+            other = AsyncTranscriptSummarizer({}, Cache(tmp_dir), client=client)
+            
+            async def summarize_twice():
+                return await asyncio.gather(summarizer.asummarize(shared), other.asummarize(shared))
+            
+            assert asyncio.run(summarize_twice()) == ["Summary", "Summary"]
+            assert client.calls == 9
+            print("✅ Concurrent fills of one summary share a single request")
+            
+            # Waiters for a fill must not use up the executor the holder needs
+            from concurrent.futures import ThreadPoolExecutor
+            repeated = "Repeated transcript " + "words " * 20
+            summarizer = AsyncTranscriptSummarizer({}, Cache(tmp_dir), client=client, max_concurrency=6)
+            
+            async def summarize_repeats():
+                executor = ThreadPoolExecutor(max_workers=2)
+                asyncio.get_running_loop().set_default_executor(executor)
+                return await asyncio.wait_for(summarizer.asummarize_many(
+                    [{'id': i, 'title': "Repeat"} for i in range(6)], lambda episode: repeated
+                ), 10)
+            
+            assert set(asyncio.run(summarize_repeats()).values()) == {"Summary"}
+            assert client.calls == 10
+            print("✅ Fill waiters leave the executor to the holder")
+        
+    except Exception as e:
+        print(f"❌ Async summarizer test failed: {e}")
+        raise
+
+
+def test_batch_summarize():
+    """Test headless batch summarization"""
+    print("\nTesting batch summarize...")
+    
+    try:
+        import tempfile
+        from ai.async_summarizer import AsyncTranscriptSummarizer
+        from data.episode_manager import EpisodeManager
+        from data.models import timestamp_to_date
+        from data.podcast_db import PodcastDatabase
+        from data.summary_ledger import SummaryLedger
+        from ui.batch import BatchProgress, BatchSummarizer, format_eta
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            library = Path(tmp_dir) / "MTLibrary.sqlite"
+            create_test_library(library)
+            cache = Cache(str(Path(tmp_dir) / "cache"))
+            db = PodcastDatabase(str(library))
+            client = FakeOpenAI(is_async=True)
+            ledger = SummaryLedger(str(Path(tmp_dir) / "cache" / "summaries.sqlite"))
+            batch = BatchSummarizer({}, EpisodeManager(db, cache),
+                                    AsyncTranscriptSummarizer({}, cache, client=client, max_concurrency=3), ledger)
+            
+            assert len(batch.select_episodes()) == 6
+            assert {e['podcast_title'] for e in batch.select_episodes("podcast 2")} == {"Podcast 2"}
+            assert [e['id'] for e in batch.select_episodes("1")] == [3, 2, 1]
+            assert len(batch.select_episodes(since=timestamp_to_date(700000000 + 2 * 86400))) == 2
+            print("✅ Episodes selected by podcast and publication date")
+            
+            pending, summarized, missing = batch.split_summarized(batch.select_episodes())
+            assert (len(pending), summarized, missing) == (6, 0, 0)
+            progress = batch.run(pending[:4])
+            assert progress.finished == 4 and progress.failed == 0 and client.calls == 4
+            pending, summarized, _ = batch.split_summarized(batch.select_episodes())
+            assert (len(pending), summarized) == (2, 4)
+            assert ledger.get(pending[0]['id']) is None and len(ledger.summarized_ids(range(1, 7))) == 4
+            print("✅ Already summarized episodes skipped on the next run")
+            
+            cache.clear()
+            batch.CHECK_BATCH = 1
+            pending, summarized, missing = batch.split_summarized(batch.select_episodes(), limit=1)
+            assert (len(pending), summarized, missing) == (1, 4, 0)
+            assert all(cache.get(f"transcript_{episode_id}") is None for episode_id in ledger.summarized_ids(range(1, 7)))
+            assert len([i for i in range(1, 7) if cache.get(f"transcript_{i}") is not None]) == 1
+            print("✅ Summaries recorded durably and --limit applied while checking")
+            
+            assert batch.split_summarized(batch.select_episodes(), limit=0)[0] == []
+            import contextlib
+            import io
+            from main import parse_args
+            assert parse_args(['summarize', '--all', '--limit', '2', '--workers', '3']).limit == 2
+            for option, value in (('--limit', '0'), ('--workers', '0'), ('--workers', '-1'), ('--limit', 'x')):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    try:
+                        parse_args(['summarize', '--all', option, value])
+                        raise AssertionError(f"{option} {value} was accepted")
+                    except SystemExit:
+                        pass
+            print("✅ --limit and --workers must be positive")
+            
+            clock = iter([0.0, 30.0, 30.0, 30.0, 30.0]).__next__
+            progress = BatchProgress(10, clock=clock)
+            progress.update(True)
+            progress.update(False)
+            assert progress.status() == "[2/10] 4.0 episodes/min, ETA 2:00"
+            assert format_eta(3725) == "1:02:05"
+            ledger.close()
+            db.close()
+            print("✅ Throughput and ETA reported")
+        
+    except Exception as e:
+        print(f"❌ Batch summarize test failed: {e}")
+        raise
+
+
+def test_map_reduce_summary():
+    """Test chunked map-reduce summarization of long transcripts"""
+    print("\nTesting map-reduce summarization...")
+    
+    try:
+        import asyncio
+        import tempfile
+        from ai.async_summarizer import AsyncTranscriptSummarizer
+        from ai.summarizer import (MAX_CONDENSE_ROUNDS, TranscriptSummarizer, estimate_tokens, fit_notes,
+                                   split_transcript, summary_cache_key)
+        
+        transcript = " ".join(f"Speaker {i % 3} makes point number {i}." for i in range(300))
+        chunks = split_transcript(transcript, 400)
+        assert len(chunks) > 3 and " ".join(chunks) == transcript
+        assert all(len(chunk) <= 1600 and chunk.endswith(".") for chunk in chunks)
+        assert split_transcript("First line\nSecond line", 100) == ["First line\nSecond line"]
+        assert len(split_transcript("word " * 300, 50)) == 8
+        print("✅ Transcripts split on sentence boundaries within the budget")
+        
+        failing = {"part 2 of"}
+        
+        def reply(prompt):
+            if "Notes:" in prompt:
+                return "Summary of the episode"
+            if any(marker in prompt for marker in failing):
+                raise RuntimeError("rate limited")
+            return "Notes on " + prompt.split("Below is ")[1].split(" of ")[0]
+        
+        config = {'openai': {'chunk_tokens': 400, 'chunk_summary_tokens': 100, 'max_concurrency': 3}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = Cache(tmp_dir)
+            client = FakeOpenAI(reply)
+            summarizer = TranscriptSummarizer(config, cache, client=client)
+            assert summarizer.summarize_transcript(transcript, "Long Episode") is None
+            assert client.calls == len(chunks)
+            
+            client.prompts.clear()
+            failing.clear()
+            assert summarizer.summarize_transcript(transcript, "Long Episode") == "Summary of the episode"
+            assert client.calls == 2 and "part 2 of" in client.prompts[0]
+            reduce_prompt = client.prompts[1]
+            assert "Notes on part 1\nNotes on part 2\n" in reduce_prompt
+            assert f"Notes on part {len(chunks)}\n" in reduce_prompt
+            assert chunks[-1] not in reduce_prompt
+            print("✅ Chunks summarized in parallel and retried individually")
+            
+            async_client = FakeOpenAI(reply, is_async=True)
+            async_summarizer = AsyncTranscriptSummarizer(config, cache, client=async_client)
+            other = transcript.replace("point", "claim")
+            assert asyncio.run(async_summarizer.asummarize(other, "Other")) == "Summary of the episode"
+            assert async_client.calls == len(split_transcript(other, 400)) + 1
+            assert cache.get(summary_cache_key(other)) == "Summary of the episode"
+            print("✅ Async summarizer maps and reduces long transcripts")
+            
+            try:
+                TranscriptSummarizer({'openai': {'chunk_tokens': 400, 'chunk_summary_tokens': 200}}, cache,
+                                     client=client)
+                raise AssertionError("chunk_summary_tokens of half the chunk budget was accepted")
+            except ValueError as e:
+                assert "chunk_summary_tokens" in str(e)
+            
+            # Notes longer than their chunk would otherwise be condensed forever
+            verbose = FakeOpenAI(lambda prompt: "Summary of the episode" if "Notes:" in prompt
+                                 else f"Note {verbose.calls} " + "word " * 350)
+            summarizer = TranscriptSummarizer(config, cache, client=verbose)
+            longer = transcript.replace("point", "idea")
+            assert summarizer.summarize_transcript(longer, "Long Episode") == "Summary of the episode"
+            reduce_prompt = verbose.prompts[-1]
+            notes = reduce_prompt.split("Notes:")[1]
+            assert estimate_tokens(notes) < 450 and notes.count("Note ") > len(chunks)
+            assert sum("Notes:" in prompt for prompt in verbose.prompts) == 1
+            assert verbose.calls < len(chunks) * 2 ** MAX_CONDENSE_ROUNDS
+            assert fit_notes(["one two three four", "five"], 4) == "one two\nfive"
+            print("✅ Condensing stops after MAX_CONDENSE_ROUNDS and cuts the notes to fit")
+            
+            counting = FakeOpenAI(lambda prompt: "Notes", is_async=True, delay=lambda prompt: 0.01)
+            async_summarizer = AsyncTranscriptSummarizer(config, cache, client=counting, max_concurrency=2)
+            
+            async def summarize_all():
+                return await asyncio.gather(
+                    async_summarizer.asummarize(transcript.replace("point", "topic"), "Long"),
+                    *(async_summarizer.asummarize(f"Short episode number {i} with enough words to summarize.")
+                      for i in range(4))
+                )
+            
+            assert asyncio.run(summarize_all()) == ["Notes"] * 5
+            assert counting.calls == len(chunks) + 1 + 4 and counting.peak == 2
+            print("✅ Single-shot, chunk and reduce requests share the concurrency limit")
+    
+    except Exception as e:
+        print(f"❌ Map-reduce summary test failed: {e}")
+        raise
+
+
 def test_display():
     """Test display formatting"""
     print("\nTesting display formatting...")
@@ -145,6 +1335,28 @@ def main():
     # Run tests
     test_config()
     test_cache()
+    test_cache_memory_tier()
+    test_cache_sqlite_backend()
+    test_cache_sweep()
+    test_cache_compression()
+    test_cache_stale_while_revalidate()
+    test_cache_single_flight()
+    test_cache_record_format()
+    test_cache_metrics()
+    test_podcast_database()
+    test_library_snapshot()
+    test_library_queries()
+    test_library_sync()
+    test_episode_paging()
+    test_ttml_index()
+    test_ttml_parser()
+    test_segment_index()
+    test_transcript_search()
+    test_title_search()
+    test_models()
+    test_async_summarizer()
+    test_batch_summarize()
+    test_map_reduce_summary()
     test_display()
     test_helpers()
     
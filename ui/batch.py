@@ -0,0 +1,250 @@
+"""
+Headless batch summarization for the `summarize` command
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ai.async_summarizer import AsyncTranscriptSummarizer
+from ai.summarizer import can_summarize, summary_cache_key
+from data.episode_manager import EpisodeManager
+from data.models import Episode, date_to_timestamp
+from data.podcast_db import PodcastDatabase
+from data.summary_ledger import SummaryLedger
+from ui.display import DisplayFormatter
+from utils.cache import Cache
+from utils.helpers import safe_get, save_summary_as_pdf, save_summary_as_rss, truncate_text
+
+
+def format_eta(seconds: float) -> str:
+    """Format a time span as H:MM:SS, or M:SS under an hour"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class BatchProgress:
+    """Counts finished episodes and estimates throughput and time left"""
+    
+    def __init__(self, total: int, clock: Callable[[], float] = time.monotonic):
+        self.total = total
+        self.finished = 0
+        self.failed = 0
+        self._clock = clock
+        self.started = clock()
+    
+    def update(self, succeeded: bool) -> None:
+        self.finished += 1
+        if not succeeded:
+            self.failed += 1
+    
+    @property
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+    
+    @property
+    def rate(self) -> float:
+        """Finished episodes per minute"""
+        return self.finished / self.elapsed * 60 if self.elapsed > 0 else 0.0
+    
+    def eta(self) -> Optional[float]:
+        """Seconds until all episodes are finished at the current rate"""
+        if not self.finished:
+            return None
+        return (self.total - self.finished) * self.elapsed / self.finished
+    
+    def status(self) -> str:
+        eta = self.eta()
+        return (f"[{self.finished}/{self.total}] {self.rate:.1f} episodes/min, "
+                f"ETA {format_eta(eta) if eta is not None else '?'}")
+
+
+class BatchSummarizer:
+    """Summarizes many episodes without the interactive menu
+    
+    Episodes recorded in the SummaryLedger, or whose transcript already
+    has a cached summary, are skipped; the rest are summarized concurrently
+    by an AsyncTranscriptSummarizer and recorded in the ledger as they finish.
+    Each new summary is optionally saved as PDF and/or RSS as it arrives;
+    saving runs on the event loop thread, so the shared RSS feed is only
+    ever written by one episode at a time.
+    """
+    
+    # Episodes whose transcripts are checked at a time by split_summarized
+    CHECK_BATCH = 100
+    
+    def __init__(self, config: Dict[str, Any], episode_manager: EpisodeManager,
+                 summarizer: AsyncTranscriptSummarizer, ledger: Optional[SummaryLedger] = None,
+                 save_pdf: bool = False, save_rss: bool = False):
+        self.config = config
+        self.episode_manager = episode_manager
+        self.summarizer = summarizer
+        self.ledger = ledger
+        self.save_pdf = save_pdf
+        self.save_rss = save_rss
+        self.display = DisplayFormatter()
+        self.logger = logging.getLogger(__name__)
+    
+    def match_podcasts(self, podcast: str) -> List[Dict[str, Any]]:
+        """Subscriptions matching a podcast id or a case-insensitive part of the title"""
+        subscriptions = self.episode_manager.podcast_db.get_subscriptions()
+        if podcast.isdigit():
+            return [subscription for subscription in subscriptions if subscription['id'] == int(podcast)]
+        term = podcast.lower()
+        return [subscription for subscription in subscriptions if term in (subscription['title'] or "").lower()]
+    
+    def select_episodes(self, podcast: Optional[str] = None, since: Optional[str] = None) -> List[Episode]:
+        """Episodes with transcripts, newest first
+        
+        `podcast` limits them to the podcasts matched by match_podcasts and
+        `since` (YYYY-MM-DD) to episodes published on or after that day.
+        Raises ValueError if `podcast` matches nothing.
+        """
+        podcast_db = self.episode_manager.podcast_db
+        since_timestamp = date_to_timestamp(since) if since else None
+        if podcast is None:
+            return podcast_db.get_transcript_episodes(since=since_timestamp)
+        
+        podcasts = self.match_podcasts(podcast)
+        if not podcasts:
+            raise ValueError(f"No podcast with transcripts matches '{podcast}'")
+        episodes = []
+        for match in podcasts:
+            episodes.extend(podcast_db.get_transcript_episodes(match['id'], since_timestamp))
+        episodes.sort(key=lambda episode: (episode['pub_timestamp'], episode['id']), reverse=True)
+        return episodes
+    
+    def split_summarized(self, episodes: List[Episode],
+                         limit: Optional[int] = None) -> Tuple[List[Episode], int, int]:
+        """Drop episodes that are already summarized or have no usable transcript
+        
+        Returns (episodes to summarize, already summarized, without transcript).
+        Episodes in the summary ledger are skipped without reading their
+        transcript; the rest are fetched CHECK_BATCH at a time and cached,
+        so summarizing reads them back from the cache. Summaries found in
+        the cache (e.g. made from the menu) are added to the ledger. With
+        `limit`, checking stops once that many episodes are pending, so the
+        counts then only cover the episodes checked.
+        """
+        done = self.ledger.summarized_ids(episode['id'] for episode in episodes) if self.ledger else set()
+        summarized = len(done)
+        candidates = [episode for episode in episodes if episode['id'] not in done]
+        pending: List[Episode] = []
+        missing = 0
+        for start in range(0, len(candidates), self.CHECK_BATCH):
+            if limit is not None and len(pending) >= limit:
+                break
+            window = candidates[start:start + self.CHECK_BATCH]
+            transcripts = dict(self.episode_manager.get_episode_transcripts([episode['id'] for episode in window]))
+            for episode in window:
+                transcript = transcripts.get(episode['id'])
+                if not can_summarize(transcript):
+                    missing += 1
+                    continue
+                summary = self.episode_manager.cache.get(summary_cache_key(transcript))
+                if summary is not None:
+                    summarized += 1
+                    if self.ledger:
+                        self.ledger.record(episode['id'], summary)
+                    continue
+                pending.append(episode)
+                if limit is not None and len(pending) >= limit:
+                    return pending, summarized, missing
+        return pending, summarized, missing
+    
+    def run(self, episodes: List[Episode]) -> BatchProgress:
+        """Summarize episodes, printing progress as each one finishes"""
+        progress = BatchProgress(len(episodes))
+        
+        def on_result(episode: Episode, summary: Optional[str]) -> None:
+            progress.update(summary is not None)
+            if summary:
+                if self.ledger:
+                    self.ledger.record(episode['id'], summary)
+                self._save(episode, summary)
+            mark = "✅" if summary else "❌"
+            title = truncate_text(f"{episode['podcast_title'] or 'Unknown'} - {episode['title'] or 'Untitled'}", 60)
+            print(f"{progress.status()} {mark} {title}", flush=True)
+        
+        asyncio.run(self._summarize(episodes, on_result))
+        return progress
+    
+    async def _summarize(self, episodes: List[Episode],
+                         on_result: Callable[[Episode, Optional[str]], None]) -> None:
+        try:
+            await self.summarizer.asummarize_many(
+                episodes, lambda episode: self.episode_manager.get_episode_transcript(episode['id']), on_result
+            )
+        finally:
+            await self.summarizer.aclose()
+    
+    def _save(self, episode: Episode, summary: str) -> None:
+        """Write a new summary to the requested outputs"""
+        details = {
+            'summary': summary,
+            'episode_title': episode['title'] or "Unknown Episode",
+            'podcast_title': episode['podcast_title'] or "",
+            'episode_date': episode['pub_date_formatted'],
+            'duration': episode['duration_formatted'],
+        }
+        try:
+            if self.save_pdf:
+                directory = safe_get(self.config, 'save', 'directory', default='~/Documents/podcast-summaries')
+                if not save_summary_as_pdf(save_directory=directory, **details):
+                    print(self.display.format_error(f"Failed to save PDF for '{details['episode_title']}'"))
+            if self.save_rss:
+                directory = safe_get(self.config, 'rss', 'directory', default='~/Documents/podcast-summaries')
+                if not save_summary_as_rss(save_directory=directory, **details):
+                    print(self.display.format_error(f"Failed to save RSS item for '{details['episode_title']}'"))
+        except Exception as e:
+            self.logger.error(f"Error saving summary of episode {episode['id']}: {e}")
+
+
+def run_summarize_command(config: Dict[str, Any], podcast: Optional[str] = None,
+                          since: Optional[str] = None, workers: Optional[int] = None,
+                          limit: Optional[int] = None, pdf: bool = False, rss: bool = False) -> int:
+    """Run the `summarize` command; returns the process exit code"""
+    display = DisplayFormatter()
+    if pdf and not safe_get(config, 'save', 'enabled', default=True):
+        print(display.format_error("Summary saving is disabled in configuration; not writing PDFs."))
+        pdf = False
+    if rss and not safe_get(config, 'rss', 'enabled', default=False):
+        print(display.format_error("RSS saving is disabled in configuration; not writing RSS items."))
+        rss = False
+    
+    cache = Cache.from_config(config)
+    podcast_db = PodcastDatabase.from_config(config, cache.cache_dir)
+    ledger = SummaryLedger(str(cache.cache_dir / "summaries.sqlite"))
+    try:
+        episode_manager = EpisodeManager(podcast_db, cache)
+        summarizer = AsyncTranscriptSummarizer(config, cache, max_concurrency=workers)
+        batch = BatchSummarizer(config, episode_manager, summarizer, ledger, save_pdf=pdf, save_rss=rss)
+        
+        try:
+            episodes = batch.select_episodes(podcast, since)
+        except ValueError as e:
+            print(display.format_error(str(e)))
+            return 1
+        print(display.format_loading(f"Checking {len(episodes)} episodes with transcripts"))
+        pending, summarized, missing = batch.split_summarized(episodes, limit)
+        print(f"Skipping {summarized} already summarized and {missing} without a usable transcript; "
+              f"summarizing {len(pending)} with {summarizer.max_concurrency} workers\n")
+        if not pending:
+            return 0
+        
+        progress = batch.run(pending)
+        succeeded = progress.finished - progress.failed
+        print(f"\nSummarized {succeeded} of {progress.total} episodes in {format_eta(progress.elapsed)} "
+              f"({progress.rate:.1f} episodes/min)")
+        if progress.failed:
+            print(display.format_error(f"{progress.failed} episodes failed; run the command again to retry them"))
+            return 1
+        print(display.format_success("Done"))
+        return 0
+    finally:
+        ledger.close()
+        podcast_db.close()
+        cache.close()
@@ -51,6 +51,28 @@ class DisplayFormatter:
         
         return output
     
+    @staticmethod
+    def format_search_results(results: List[Dict[str, Any]], query: str = "") -> str:
+        """Format transcript search results for display"""
+        if not results:
+            return f"No transcripts mention \"{query}\"."
+        
+        output = f"Transcripts matching \"{query}\":\n"
+        output += "=" * 60 + "\n\n"
+        
+        for i, result in enumerate(results, 1):
+            title = result.get('title_display', 'Untitled')
+            podcast_title = result.get('podcast_title') or 'Unknown'
+            pub_date = result.get('pub_date_formatted', 'Unknown')
+            
+            output += f"{i}. {title}\n"
+            output += f"   {podcast_title} | Date: {pub_date}\n"
+            if result.get('snippet'):
+                output += f"   {result['snippet']}\n"
+            output += "\n"
+        
+        return output
+    
     @staticmethod
     def format_summary(summary: str, episode_title: str = "") -> str:
         """Format the AI-generated summary"""
@@ -112,6 +134,35 @@ class DisplayFormatter:
         """Format cache statistics"""
         output = "Cache Statistics:\n"
         output += "=" * 20 + "\n"
-        output += f"Files: {stats.get('files', 0)}\n"
+        output += f"Backend: {stats.get('backend', 'file')}\n"
+        output += f"Entries: {stats.get('entries', stats.get('files', 0))}\n"
         output += f"Size: {stats.get('size_mb', 0):.2f} MB\n"
+        output += f"Memory: {stats.get('memory_entries', 0)} entries "
+        output += f"({stats.get('memory_bytes', 0) / (1024 * 1024):.2f} MB)\n"
+        output += f"Memory hits/misses: {stats.get('memory_hits', 0)}/{stats.get('memory_misses', 0)}\n"
+        output += f"Disk hits/misses: {stats.get('disk_hits', 0)}/{stats.get('disk_misses', 0)}\n"
+        if stats.get('stale_served'):
+            output += f"Stale reads refreshed in background: {stats['stale_served']}\n"
+        if stats.get('max_size_bytes'):
+            output += f"Quota: {stats['max_size_bytes'] / (1024 * 1024):.0f} MB\n"
+        last_sweep = stats.get('last_sweep')
+        if last_sweep:
+            output += (f"Last sweep: removed {last_sweep['entries_removed']} entries, "
+                       f"reclaimed {last_sweep['bytes_reclaimed'] / (1024 * 1024):.2f} MB\n")
+        
+        namespaces = stats.get('namespaces')
+        if namespaces:
+            output += "\nBy namespace:\n"
+            output += f"{'Namespace':<14}{'Hit %':>7}{'Hits':>7}{'Miss':>7}{'Exp':>6}{'Bad':>5}"
+            output += f"{'Read p50/p95 ms':>18}{'Written':>11}\n"
+            for name, ns in namespaces.items():
+                hits = ns.get('memory_hit', 0) + ns.get('disk_hit', 0)
+                latency = ns.get('read_latency', {})
+                p50 = latency.get('p50_ms')
+                p95 = latency.get('p95_ms')
+                latency_text = (f"{'>500' if p50 is None else p50}/"
+                                f"{'>500' if p95 is None else p95}")
+                output += f"{name:<14}{ns.get('hit_ratio', 0) * 100:>6.1f}%{hits:>7}"
+                output += f"{ns.get('miss', 0):>7}{ns.get('expired', 0):>6}{ns.get('corrupt', 0):>5}"
+                output += f"{latency_text:>18}{ns.get('bytes_written', 0) / 1024:>9.1f}KB\n"
         return output 
\ No newline at end of file
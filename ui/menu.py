@@ -3,9 +3,12 @@ Main menu system for Podcast CLI
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from data.podcast_db import PodcastDatabase
 from data.episode_manager import EpisodeManager
+from data.library_sync import LibrarySync
+from data.models import Podcast
+from data.transcript_search import TranscriptSearchIndex
 from ai.summarizer import TranscriptSummarizer
 from ui.display import DisplayFormatter
 from utils.cache import Cache
@@ -20,19 +23,33 @@ class PodcastMenu:
         self.logger = logging.getLogger(__name__)
         
         # Initialize components
-        database_path = safe_get(config, 'podcast_app', 'database_path')
-        self.podcast_db = PodcastDatabase(database_path)
+        self.cache = Cache.from_config(config)
+        self.cache.start_background_sweep(
+            safe_get(config, 'cache', 'sweep_interval_minutes', default=0)
+        )
         
-        cache_dir = safe_get(config, 'cache', 'directory', default="~/.cache/podcast-cli")
-        self.cache = Cache(cache_dir)
+        self.podcast_db = PodcastDatabase.from_config(config, self.cache.cache_dir)
         
-        self.episode_manager = EpisodeManager(self.podcast_db, self.cache)
+        self.library_sync = None
+        if safe_get(config, 'podcast_app', 'incremental_sync', default=True):
+            self.library_sync = LibrarySync(self.podcast_db, str(self.cache.cache_dir / "library.sqlite"))
+        
+        self.transcript_search = TranscriptSearchIndex(
+            self.podcast_db, str(self.cache.cache_dir / "search.sqlite")
+        )
+        # Indexed while the user browses, so the first search does not wait for it
+        self.transcript_search.start_background_update()
+        
+        self.episode_manager = EpisodeManager(
+            self.podcast_db, self.cache, self.library_sync, self.transcript_search
+        )
         self.summarizer = TranscriptSummarizer(config, self.cache)
         self.display = DisplayFormatter()
         
         # State
         self.current_podcast = None
         self.current_episodes = []
+        self.current_page = {'before': None, 'after': None}
     
     def run(self):
         """Main application loop"""
@@ -63,12 +80,15 @@ class PodcastMenu:
                 return
             
             print(self.display.format_subscriptions_list(subscriptions))
-            print("\nType 'exit' to quit the application, 'help' for help, or enter a number to select a podcast.")
+            print("\nType 'exit' to quit the application, 'help' for help, 's' to search transcripts, or enter a number to select a podcast.")
             
             # Get user selection
-            choice = self._get_user_choice(len(subscriptions))
+            choice = self._get_user_choice(len(subscriptions), ['s'])
             if choice is None:
                 return
+            if choice == 's':
+                self.show_search_menu()
+                return
             
             selected_podcast = subscriptions[choice - 1]
             self.current_podcast = selected_podcast
@@ -79,34 +99,86 @@ class PodcastMenu:
             print(self.display.format_error(f"Error loading subscriptions: {e}"))
             self.logger.error(f"Error in main menu: {e}")
     
-    def show_episodes_menu(self, podcast: Dict[str, Any]):
-        """Display episodes for a selected podcast"""
+    def show_search_menu(self):
+        """Search all transcripts and pick an episode from the results"""
         try:
-            print(f"\n{self.display.format_loading('Loading episodes')}")
-            
-            episodes = self.episode_manager.get_episodes(podcast['id'], limit=10)
-            self.current_episodes = episodes
-            
-            if not episodes:
-                print("No episodes found for this podcast.")
-                print("\nType 'exit' to quit or 'back' to return to podcasts.")
-                user_input = input().strip().lower()
-                if user_input in ['exit', 'quit', 'q']:
-                    return
-                elif user_input in ['back', 'b']:
-                    return
+            print("\nSearch transcripts for:")
+            query = input().strip()
+            if not query:
                 return
             
-            print(self.display.format_episodes_list(episodes, podcast['title']))
-            print("\nType 'exit' to quit, 'back' to return to podcasts, or enter a number to select an episode.")
+            print(f"\n{self.display.format_loading('Searching transcripts')}")
+            results = self.episode_manager.search_transcripts(query, limit=10)
+            if self.transcript_search.updating:
+                print("Transcripts are still being indexed; results may be incomplete.")
+            print(self.display.format_search_results(results, query))
+            if not results:
+                input("\nPress Enter to continue...")
+                return
             
-            # Get user selection
-            choice = self._get_user_choice(len(episodes))
+            print("\nType 'back' to return to podcasts, or enter a number to select an episode.")
+            choice = self._get_user_choice(len(results))
             if choice is None:
                 return
             
-            selected_episode = episodes[choice - 1]
-            self.show_episode_actions(selected_episode, podcast['title'])
+            selected_episode = results[choice - 1]
+            # "Back to Episodes" should lead to this episode's podcast
+            self.current_podcast = Podcast(id=selected_episode['podcast_id'],
+                                           title=selected_episode.get('podcast_title'))
+            self.current_page = {'before': None, 'after': None}
+            self.show_episode_actions(selected_episode, selected_episode.get('podcast_title') or "")
+            
+        except Exception as e:
+            print(self.display.format_error(f"Error searching transcripts: {e}"))
+            self.logger.error(f"Error in search menu: {e}")
+    
+    def show_episodes_menu(self, podcast: Dict[str, Any], before=None, after=None):
+        """Display episodes for a selected podcast, one page at a time"""
+        try:
+            while True:
+                print(f"\n{self.display.format_loading('Loading episodes')}")
+                
+                page = self.episode_manager.get_episodes_page(
+                    podcast['id'], limit=10, before=before, after=after
+                )
+                episodes = page['episodes']
+                self.current_episodes = episodes
+                self.current_page = {'before': before, 'after': after}
+                
+                if not episodes:
+                    print("No episodes found for this podcast.")
+                    print("\nType 'exit' to quit or 'back' to return to podcasts.")
+                    user_input = input().strip().lower()
+                    if user_input in ['exit', 'quit', 'q']:
+                        return
+                    elif user_input in ['back', 'b']:
+                        return
+                    return
+                
+                print(self.display.format_episodes_list(episodes, podcast['title']))
+                commands, paging_hint = [], ""
+                if page['next']:
+                    commands.append('n')
+                    paging_hint += " 'n' for older episodes,"
+                if page['previous']:
+                    commands.append('p')
+                    paging_hint += " 'p' for newer episodes,"
+                print(f"\nType 'exit' to quit, 'back' to return to podcasts,{paging_hint} or enter a number to select an episode.")
+                
+                # Get user selection
+                choice = self._get_user_choice(len(episodes), commands)
+                if choice is None:
+                    return
+                if choice == 'n':
+                    before, after = page['next'], None
+                    continue
+                if choice == 'p':
+                    before, after = None, page['previous']
+                    continue
+                
+                selected_episode = episodes[choice - 1]
+                self.show_episode_actions(selected_episode, podcast['title'])
+                return
             
         except Exception as e:
             print(self.display.format_error(f"Error loading episodes: {e}"))
@@ -134,7 +206,7 @@ class PodcastMenu:
                 self.save_summary_as_rss(episode, podcast_title)
             elif choice == 5:  # Back to Episodes
                 if self.current_podcast:
-                    self.show_episodes_menu(self.current_podcast)
+                    self.show_episodes_menu(self.current_podcast, **self.current_page)
                 return
             elif choice == 6:  # Back to Podcasts
                 return
@@ -281,12 +353,19 @@ class PodcastMenu:
             print(self.display.format_error(f"Error saving RSS feed item: {e}"))
             self.logger.error(f"Error in RSS saving: {e}")
     
-    def _get_user_choice(self, max_options: int) -> Optional[int]:
-        """Get user input for menu selection"""
+    def _get_user_choice(self, max_options: int,
+                         commands: Optional[List[str]] = None) -> Optional[Union[int, str]]:
+        """Get user input for menu selection
+        
+        Any of `commands` (e.g. 'n'/'p' for paging) is returned as typed.
+        """
         while True:
             try:
                 user_input = input().strip()
                 
+                if commands and user_input.lower() in commands:
+                    return user_input.lower()
+                
                 # Handle exit commands
                 if user_input.lower() in ['q', 'quit', 'exit']:
                     return None
@@ -321,6 +400,8 @@ Podcast CLI Help
 
 Navigation:
 - Enter numbers to select options
+- Type 'n' / 'p' for the next / previous page of episodes
+- Type 's' on the podcast list to search all transcripts
 - Type 'q', 'quit', or 'exit' to exit
 - Use Ctrl+C to exit at any time
 
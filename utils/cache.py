@@ -3,81 +3,440 @@ Caching utilities for Podcast CLI
 """
 
 import json
-import pickle
-from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Any, Optional, Dict
-import hashlib
+from typing import Any, Callable, Optional, Dict, Iterator, List, Tuple
+
+from utils.cache_backends import CACHE_BACKENDS, EVICTION_POLICIES, FileLock, hash_key
+from utils.cache_format import (
+    COMPRESSION_CODECS, CorruptRecordError, decode_record, encode_record, read_created_at
+)
+from utils.cache_metrics import CacheMetrics
+from utils.helpers import safe_get
+
+
+class MemoryCache:
+    """Bounded in-process LRU cache used as the first tier of Cache"""
+    
+    def __init__(self, max_entries: int = 256, max_bytes: int = 32 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Get a (value, created_at) pair and mark it as most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0], entry[1]
+    
+    def set(self, key: str, value: Any, timestamp: float, size: int) -> None:
+        """Store a value, evicting least recently used entries to stay in bounds"""
+        # Values larger than the whole tier would only flush everything else
+        if self.max_entries <= 0 or size > self.max_bytes:
+            self.delete(key)
+            return
+        
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+            
+            self._entries[key] = (value, timestamp, size)
+            self.current_bytes += size
+            
+            while (len(self._entries) > self.max_entries
+                   or self.current_bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+    
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[2]
+    
+    def clear(self) -> None:
+        """Remove all entries"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+    
+    def keys(self) -> List[str]:
+        """Snapshot of the cached keys, least recently used first"""
+        with self._lock:
+            return list(self._entries)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class Cache:
-    """Simple file-based cache implementation"""
+    """Two-tier cache: an in-memory LRU in front of a persistent store
+    
+    The persistent tier is either one pickle file per key (`file`) or a
+    single SQLite database (`sqlite`), see utils.cache_backends.
+    Values served from the memory tier are shared objects, so callers
+    should treat cached values as read-only.
+    
+    `get` can serve stale-while-revalidate: past `stale_after_hours` it
+    returns the cached value immediately and refreshes it in a background
+    thread, and only past `max_age_hours` does the caller have to wait.
+    
+    `get_or_compute` is single-flight: concurrent misses for the same key,
+    in this process or another one sharing the cache directory, run the
+    computation once and the other callers wait for its result.
     
-    def __init__(self, cache_dir: str = "~/.cache/podcast-cli"):
+    Expired entries are only dropped lazily by `get`; `sweep` (usually run
+    from `start_background_sweep`) removes entries older than
+    `max_age_hours` and evicts down to `max_size_bytes`.
+    """
+    
+    def __init__(self, cache_dir: str = "~/.cache/podcast-cli",
+                 memory_max_entries: int = 256,
+                 memory_max_bytes: int = 32 * 1024 * 1024,
+                 backend: str = "file",
+                 max_age_hours: float = 24,
+                 stale_after_hours: Optional[float] = None,
+                 max_size_bytes: Optional[int] = None,
+                 eviction_policy: str = "lru",
+                 compression: Optional[str] = "zlib",
+                 compression_level: int = 6,
+                 compression_threshold: int = 8 * 1024):
         self.cache_dir = Path(cache_dir).expanduser()
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.logger = logging.getLogger(__name__)
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(
+                f"Unknown cache backend '{backend}'. "
+                f"Choose one of: {', '.join(CACHE_BACKENDS)}"
+            )
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(
+                f"Unknown eviction policy '{eviction_policy}'. "
+                f"Choose one of: {', '.join(EVICTION_POLICIES)}"
+            )
+        if compression and compression not in COMPRESSION_CODECS:
+            raise ValueError(
+                f"Unknown cache compression '{compression}'. "
+                f"Choose one of: {', '.join(COMPRESSION_CODECS)}"
+            )
+        self.store = CACHE_BACKENDS[backend](self.cache_dir)
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compression_threshold = compression_threshold
+        self.memory = MemoryCache(memory_max_entries, memory_max_bytes)
+        self.max_age_hours = max_age_hours
+        self.stale_after_hours = stale_after_hours
+        self.max_size_bytes = max_size_bytes
+        self.eviction_policy = eviction_policy
+        self.metrics = CacheMetrics()
+        self.stale_served = 0
+        self._revalidating = set()
+        self._revalidate_lock = threading.Lock()
+        self._flights: Dict[str, list] = {}
+        self._locks_dir = self.cache_dir / "locks"
+        self._flights_lock = threading.Lock()
+        self.last_sweep: Optional[Dict[str, Any]] = None
+        self._sweep_lock = threading.Lock()
+        self._sweep_stop = threading.Event()
+        self._sweep_thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "Cache":
+        """Create a cache from the `cache` section of the configuration"""
+        max_size_mb = safe_get(config, 'cache', 'max_size_mb', default=500)
+        return cls(
+            cache_dir=safe_get(config, 'cache', 'directory', default="~/.cache/podcast-cli"),
+            memory_max_entries=safe_get(config, 'cache', 'memory_max_entries', default=256),
+            memory_max_bytes=int(safe_get(config, 'cache', 'memory_max_mb', default=32) * 1024 * 1024),
+            backend=safe_get(config, 'cache', 'backend', default="file"),
+            max_age_hours=safe_get(config, 'cache', 'max_age_hours', default=24),
+            stale_after_hours=safe_get(config, 'cache', 'stale_after_hours', default=1),
+            max_size_bytes=(int(max_size_mb * 1024 * 1024) if max_size_mb else None),
+            eviction_policy=safe_get(config, 'cache', 'eviction_policy', default="lru"),
+            compression=safe_get(config, 'cache', 'compression', default="zlib") or None,
+            compression_level=safe_get(config, 'cache', 'compression_level', default=6),
+            compression_threshold=int(safe_get(config, 'cache', 'compression_threshold_kb', default=8) * 1024)
+        )
     
-    def _get_cache_path(self, key: str) -> Path:
-        """Get the cache file path for a given key"""
-        # Create a hash of the key to use as filename
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return self.cache_dir / f"{key_hash}.cache"
+    @staticmethod
+    def _is_expired(created_at: float, max_age_hours: float) -> bool:
+        """Check whether an entry written at `created_at` is older than allowed"""
+        return time.time() - created_at > max_age_hours * 3600
     
-    def get(self, key: str, max_age_hours: int = 24) -> Optional[Any]:
-        """Get a value from cache if it exists and is not expired"""
-        cache_path = self._get_cache_path(key)
+    def get(self, key: str, max_age_hours: Optional[float] = None,
+            revalidate: Optional[Callable[[], Any]] = None,
+            stale_after_hours: Optional[float] = None) -> Optional[Any]:
+        """Get a value from cache if it exists and is not expired
+        
+        If `revalidate` is given and the entry is older than
+        `stale_after_hours`, the stale value is returned and `revalidate()`
+        is run in a background thread to refresh it.
+        """
+        if max_age_hours is None:
+            max_age_hours = self.max_age_hours
+        if stale_after_hours is None:
+            stale_after_hours = self.stale_after_hours
         
-        if not cache_path.exists():
-            return None
+        started = time.perf_counter()
+        value, created_at, outcome, size = self._lookup(key, max_age_hours)
+        self.metrics.record_read(key, outcome, (time.perf_counter() - started) * 1000, size)
+        
+        if value is not None:
+            self._maybe_revalidate(key, created_at, stale_after_hours, revalidate)
+        return value
+    
+    def _lookup(self, key: str, max_age_hours: float) -> Tuple[Any, float, str, int]:
+        """Find a fresh entry in the memory tier, then the store
+        
+        Returns (value, created_at, outcome, bytes read from the store).
+        """
+        entry = self.memory.get(key)
+        if entry is not None:
+            value, created_at = entry
+            if not self._is_expired(created_at, max_age_hours):
+                return value, created_at, 'memory_hit', 0
+            self.memory.delete(key)
+        
+        raw = self.store.read(key)
+        if raw is None:
+            return None, 0.0, 'miss', 0
         
         try:
-            with open(cache_path, 'rb') as f:
-                cached_data = pickle.load(f)
-            
-            # Check if cache is expired
-            cached_time = cached_data.get('timestamp')
-            if cached_time:
-                age = datetime.now() - cached_time
-                if age > timedelta(hours=max_age_hours):
-                    cache_path.unlink()  # Remove expired cache
-                    return None
+            # The header alone decides expiry, so expired bodies are never decoded
+            header_created_at = read_created_at(raw)
+            if header_created_at is not None and self._is_expired(header_created_at, max_age_hours):
+                self.store.delete(key)  # Remove expired cache
+                return None, header_created_at, 'expired', len(raw)
             
-            return cached_data.get('data')
+            created_at, value, size = decode_record(raw)
+            if self._is_expired(created_at, max_age_hours):
+                self.store.delete(key)
+                return None, created_at, 'expired', len(raw)
+        except CorruptRecordError as e:
+            self.logger.warning(f"Removing corrupt cache entry '{key}': {e}")
+            self.store.delete(key)
+            return None, 0.0, 'corrupt', len(raw)
+        
+        if header_created_at is None:
+            # Migrate a legacy record, so the sweep sees the same write time as get
+            self._write(key, value, created_at)
+        self.memory.set(key, value, created_at, size)
+        return value, created_at, 'disk_hit', len(raw)
+    
+    def _maybe_revalidate(self, key: str, cached_time: float,
+                          stale_after_hours: Optional[float],
+                          revalidate: Optional[Callable[[], Any]]) -> None:
+        """Refresh a stale entry in the background, at most once per key at a time"""
+        if revalidate is None or stale_after_hours is None:
+            return
+        if not self._is_expired(cached_time, stale_after_hours):
+            return
+        
+        self.stale_served += 1
+        with self._revalidate_lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+        
+        def run():
+            try:
+                value = revalidate()
+                if value is not None:
+                    self.set(key, value)
+            except Exception as e:
+                self.logger.warning(f"Background refresh of cache key '{key}' failed: {e}")
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(key)
+        
+        threading.Thread(target=run, name=f"cache-refresh-{key}", daemon=True).start()
+    
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       max_age_hours: Optional[float] = None,
+                       stale_while_revalidate: bool = False) -> Optional[Any]:
+        """Get a value from cache, computing and storing it on a miss
+        
+        Only one caller computes a missing key; the others block until it
+        is done and then read the stored result. A `compute` result of None
+        is not cached. With `stale_while_revalidate`, stale hits are served
+        and refreshed in the background as in `get`.
+        """
+        revalidate = compute if stale_while_revalidate else None
+        value = self.get(key, max_age_hours, revalidate=revalidate)
+        if value is not None:
+            return value
+        
+        with self.single_flight(key):
+            # Another caller may have filled the key while we waited
+            value = self._lookup(key, max_age_hours or self.max_age_hours)[0]
+            if value is not None:
+                return value
             
-        except (pickle.PickleError, EOFError, KeyError):
-            # Remove corrupted cache file
-            if cache_path.exists():
-                cache_path.unlink()
-            return None
+            value = compute()
+            if value is not None:
+                self.set(key, value)
+            return value
+    
+    @contextmanager
+    def single_flight(self, key: str) -> Iterator[None]:
+        """Hold the lock that serializes filling `key`
+        
+        Shared by threads of this process (an in-memory lock) and by other
+        processes using the cache directory (a FileLock). Callers check the
+        cache again once inside, as get_or_compute does. The lock may be
+        released from another thread than the one that took it.
+        """
+        with self._flights_lock:
+            flight = self._flights.setdefault(key, [threading.Lock(), 0])
+            flight[1] += 1
+        try:
+            with flight[0], self.flight_lock(key):
+                yield
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if flight[1] == 0:
+                    del self._flights[key]
+    
+    def flight_lock(self, key: str) -> FileLock:
+        """The cross-process lock taken by single_flight(key)
+        
+        For callers that cannot block a thread while waiting, such as the
+        async summarizer, which polls it with `acquire(blocking=False)`.
+        """
+        return FileLock(self._locks_dir / f"{hash_key(key)}.lock")
     
     def set(self, key: str, value: Any) -> None:
         """Store a value in cache with current timestamp"""
-        cache_path = self._get_cache_path(key)
-        
-        cached_data = {
-            'data': value,
-            'timestamp': datetime.now()
-        }
+        started = time.perf_counter()
+        created_at = time.time()
         
         try:
-            with open(cache_path, 'wb') as f:
-                pickle.dump(cached_data, f)
+            record, size = self._write(key, value, created_at)
+            self.memory.set(key, value, created_at, size)
+            self.metrics.record_write(key, (time.perf_counter() - started) * 1000, len(record))
         except Exception as e:
             # Log error but don't fail the application
+            self.memory.delete(key)
             print(f"Warning: Failed to cache data: {e}")
     
+    def _write(self, key: str, value: Any, created_at: float) -> Tuple[bytes, int]:
+        """Encode a value and write it to the store; returns (record, body size)"""
+        record, size = encode_record(
+            value, created_at, self.compression,
+            self.compression_level, self.compression_threshold
+        )
+        self.store.write(key, record, created_at)
+        return record, size
+    
     def clear(self) -> None:
         """Clear all cached data"""
-        for cache_file in self.cache_dir.glob("*.cache"):
-            cache_file.unlink()
+        self.memory.clear()
+        self.store.clear()
     
-    def get_stats(self) -> Dict[str, int]:
+    def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
-        cache_files = list(self.cache_dir.glob("*.cache"))
-        total_size = sum(f.stat().st_size for f in cache_files)
+        store_stats = self.store.stats()
+        total_size = store_stats['size_bytes']
+        totals = self.metrics.totals()
+        reads = sum(totals.values())
         
         return {
-            'files': len(cache_files),
+            'backend': self.store.name,
+            'entries': store_stats['entries'],
             'size_bytes': total_size,
-            'size_mb': total_size / (1024 * 1024)
-        } 
\ No newline at end of file
+            'size_mb': total_size / (1024 * 1024),
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory.current_bytes,
+            'memory_hits': totals['memory_hit'],
+            'memory_misses': reads - totals['memory_hit'],
+            'disk_hits': totals['disk_hit'],
+            'disk_misses': totals['miss'] + totals['expired'] + totals['corrupt'],
+            'expirations': totals['expired'],
+            'corrupt_evictions': totals['corrupt'],
+            'stale_served': self.stale_served,
+            'max_size_bytes': self.max_size_bytes,
+            'last_sweep': self.last_sweep,
+            'namespaces': self.metrics.snapshot()
+        }
+    
+    def get_stats_json(self, indent: Optional[int] = 2) -> str:
+        """Get cache statistics as a JSON document for dashboards"""
+        return json.dumps(self.get_stats(), indent=indent)
+    
+    def sweep(self) -> Dict[str, Any]:
+        """Remove expired entries and enforce the size quota
+        
+        Returns a report with the number of entries removed and bytes
+        reclaimed. Removed entries are dropped from the memory tier too,
+        and get_or_compute lock files not currently held are deleted.
+        """
+        with self._sweep_lock:
+            started = time.monotonic()
+            cutoff = time.time() - self.max_age_hours * 3600
+            removed_ids, reclaimed = self.store.evict(cutoff, self.max_size_bytes, self.eviction_policy)
+            removed = len(removed_ids)
+            if removed_ids:
+                removed_ids = set(removed_ids)
+                for key in self.memory.keys():
+                    if hash_key(key) in removed_ids:
+                        self.memory.delete(key)
+            locks_removed = FileLock.remove_idle(self._locks_dir)
+            
+            self.last_sweep = {
+                'entries_removed': removed,
+                'bytes_reclaimed': reclaimed,
+                'locks_removed': locks_removed,
+                'duration_seconds': time.monotonic() - started,
+                'finished_at': datetime.now().isoformat(timespec='seconds')
+            }
+            if removed:
+                self.logger.info(
+                    f"Cache sweep removed {removed} entries, "
+                    f"reclaimed {reclaimed / (1024 * 1024):.2f} MB"
+                )
+            return self.last_sweep
+    
+    def start_background_sweep(self, interval_minutes: float = 0) -> None:
+        """Run `sweep` in a daemon thread, once now and then every
+        `interval_minutes` (0 sweeps only once)
+        """
+        if self._sweep_thread and self._sweep_thread.is_alive():
+            return
+        
+        def run():
+            while True:
+                try:
+                    self.sweep()
+                except Exception as e:
+                    self.logger.warning(f"Cache sweep failed: {e}")
+                if interval_minutes <= 0 or self._sweep_stop.wait(interval_minutes * 60):
+                    return
+        
+        self._sweep_stop.clear()
+        self._sweep_thread = threading.Thread(target=run, name="cache-sweep", daemon=True)
+        self._sweep_thread.start()
+    
+    def stop_background_sweep(self) -> None:
+        """Stop the background sweep thread after its current pass"""
+        self._sweep_stop.set()
+        if self._sweep_thread:
+            self._sweep_thread.join()
+            self._sweep_thread = None
+    
+    def close(self) -> None:
+        """Stop background work and release the persistent store"""
+        self.stop_background_sweep()
+        self.store.close()
@@ -0,0 +1,461 @@
+"""
+Storage backends for the Podcast CLI cache
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple
+
+from utils.cache_format import HEADER, CorruptRecordError, decode_record, read_created_at
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+def hash_key(key: str) -> str:
+    """Hash a cache key into the identifier used by every backend"""
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+EVICTION_POLICIES = ("lru", "age")
+
+
+class FileLock:
+    """Exclusive advisory lock held on a lock file for the duration of a `with` block
+    
+    Uses flock(2), so it coordinates separate processes sharing the cache
+    directory. Where fcntl is unavailable the lock is a no-op.
+    
+    Idle lock files may be deleted by `remove_idle`. A locker that opened
+    a file just before it was deleted notices once it holds the lock (the
+    path no longer leads to the file it locked) and starts over, so two
+    callers never hold "the" lock on different files.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self._fd: Optional[int] = None
+    
+    def acquire(self, blocking: bool = True) -> bool:
+        """Take the lock; without `blocking`, return False at once if it is held"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        while True:
+            fd = os.open(str(self.path), os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is None:
+                break
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        self._fd = fd
+        return True
+    
+    def release(self) -> None:
+        if self._fd is not None:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+    
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+    
+    @staticmethod
+    def remove_idle(directory: Path) -> int:
+        """Delete the `*.lock` files in `directory` that nobody holds
+        
+        Returns the number of files removed. Without fcntl a held lock
+        cannot be told apart from an idle one, so nothing is removed.
+        """
+        if fcntl is None or not directory.is_dir():
+            return 0
+        removed = 0
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".lock"):
+                continue
+            try:
+                fd = os.open(entry.path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                continue
+            try:
+                # Unlinked while locked, so a waiting locker retries on a fresh file
+                os.unlink(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            finally:
+                os.close(fd)
+        return removed
+
+
+class FileCacheStore:
+    """Stores each cache entry as its own `<md5>.cache` file
+    
+    Writes go to a temporary file that is renamed over the entry, so
+    readers in other processes never see a partially written record.
+    The file mtime is the write time and the atime is set explicitly on
+    every read, so LRU eviction does not depend on filesystem atime
+    mount options.
+    """
+    
+    name = "file"
+    
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = cache_dir
+    
+    def _path(self, key: str) -> Path:
+        """Get the cache file path for a given key"""
+        return self.cache_dir / f"{hash_key(key)}.cache"
+    
+    def read(self, key: str) -> Optional[bytes]:
+        """Read the raw record for a key, or None if it does not exist"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+                os.utime(f.fileno(), (time.time(), os.fstat(f.fileno()).st_mtime))
+            return data
+        except FileNotFoundError:
+            return None
+    
+    def write(self, key: str, data: bytes, created_at: float) -> None:
+        """Atomically write the raw record for a key"""
+        fd, tmp_path = tempfile.mkstemp(dir=str(self.cache_dir), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+    
+    def delete(self, key: str) -> None:
+        """Delete the record for a key if present"""
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+    
+    def clear(self) -> None:
+        """Delete all records"""
+        for cache_file in self.cache_dir.glob("*.cache"):
+            cache_file.unlink()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Count records and bytes on disk"""
+        cache_files = list(self.cache_dir.glob("*.cache"))
+        return {
+            'entries': len(cache_files),
+            'size_bytes': sum(f.stat().st_size for f in cache_files)
+        }
+    
+    def evict(self, cutoff: Optional[float], max_bytes: Optional[int],
+              policy: str = "lru") -> Tuple[List[str], int]:
+        """Delete entries written before `cutoff`, then the least recently
+        used (or oldest) ones until at most `max_bytes` remain
+        
+        Returns (hashed keys of the removed entries, bytes reclaimed).
+        """
+        entries = []
+        stale_tmp_before = time.time() - 3600
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".tmp"):
+                # Left behind by a writer that died between write and rename
+                try:
+                    if entry.stat().st_mtime < stale_tmp_before:
+                        os.unlink(entry.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            if not entry.name.endswith(".cache"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((entry.path, st.st_size, st.st_mtime, st.st_atime))
+        
+        removed: List[str] = []
+        reclaimed = 0
+        
+        def remove(path: str, size: int) -> None:
+            nonlocal reclaimed
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                return
+            removed.append(os.path.basename(path)[:-len(".cache")])
+            reclaimed += size
+        
+        if cutoff is not None:
+            kept = []
+            for path, size, created_at, last_access in entries:
+                if created_at < cutoff and not self._is_legacy(path):
+                    remove(path, size)
+                else:
+                    kept.append((path, size, created_at, last_access))
+            entries = kept
+        
+        if max_bytes is not None:
+            total = sum(size for _, size, _, _ in entries)
+            order = 3 if policy == "lru" else 2
+            for path, size, *_ in sorted(entries, key=lambda e: e[order]):
+                if total <= max_bytes:
+                    break
+                remove(path, size)
+                total -= size
+        
+        return removed, reclaimed
+    
+    @staticmethod
+    def _is_legacy(path: str) -> bool:
+        """Whether a file holds a record from an older version
+        
+        Their age is only known once decoded, so they are left for `get` to
+        expire or migrate rather than aged out by file time.
+        """
+        try:
+            with open(path, 'rb') as f:
+                return read_created_at(f.read(HEADER.size)) is None
+        except (OSError, CorruptRecordError):
+            return False
+    
+    def close(self) -> None:
+        """Nothing to release for plain files"""
+
+
+class SQLiteCacheStore:
+    """Stores all cache entries in a single WAL-mode SQLite file
+    
+    Entry count and total size are kept in a one-row totals table by
+    triggers, so stats never have to scan the entries.
+    """
+    
+    name = "sqlite"
+    
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        key TEXT PRIMARY KEY,
+        blob BLOB NOT NULL,
+        created_at REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_entries_created_at ON entries(created_at);
+    CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+    
+    CREATE TABLE IF NOT EXISTS totals (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        size_bytes INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO totals (id, entries, size_bytes) VALUES (0, 0, 0);
+    
+    CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+        UPDATE totals SET entries = entries + 1, size_bytes = size_bytes + new.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+        UPDATE totals SET entries = entries - 1, size_bytes = size_bytes - old.size WHERE id = 0;
+    END;
+    CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+        UPDATE totals SET size_bytes = size_bytes - old.size + new.size WHERE id = 0;
+    END;
+    """
+    
+    def __init__(self, cache_dir: Path, filename: str = "cache.sqlite"):
+        self.cache_dir = cache_dir
+        self.db_path = cache_dir / filename
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        
+        is_new = not self.db_path.exists()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False,
+                                     isolation_level=None)
+        # Only takes effect on a new database; lets evict() hand pages back
+        self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        
+        if is_new:
+            imported = self.import_files(cache_dir)
+            if imported:
+                self.logger.info(f"Imported {imported} file cache entries into {self.db_path}")
+    
+    def read(self, key: str) -> Optional[bytes]:
+        """Read the raw record for a key and record the access time"""
+        key_id = hash_key(key)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT blob FROM entries WHERE key = ?", (key_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key_id)
+            )
+        return row[0]
+    
+    def write(self, key: str, data: bytes, created_at: float) -> None:
+        """Insert or replace the raw record for a key"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (key, blob, created_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET blob = excluded.blob, "
+                "created_at = excluded.created_at, size = excluded.size, "
+                "last_access = excluded.last_access",
+                (hash_key(key), sqlite3.Binary(data), created_at, len(data), time.time())
+            )
+    
+    def delete(self, key: str) -> None:
+        """Delete the record for a key if present"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (hash_key(key),))
+    
+    def clear(self) -> None:
+        """Delete all records"""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Read entry count and size from the aggregate totals row"""
+        with self._lock:
+            entries, size_bytes = self._conn.execute(
+                "SELECT entries, size_bytes FROM totals WHERE id = 0"
+            ).fetchone()
+        return {'entries': entries, 'size_bytes': size_bytes}
+    
+    def evict(self, cutoff: Optional[float], max_bytes: Optional[int],
+              policy: str = "lru") -> Tuple[List[str], int]:
+        """Delete entries created before `cutoff`, then the least recently
+        used (or oldest) ones until at most `max_bytes` remain
+        
+        Both passes walk an index, so the cost is proportional to the
+        number of evicted entries. Returns (hashed keys of the removed
+        entries, bytes reclaimed).
+        """
+        order_column = "last_access" if policy == "lru" else "created_at"
+        removed: List[str] = []
+        reclaimed = 0
+        
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if cutoff is not None:
+                    expired = self._conn.execute(
+                        "SELECT key, size FROM entries WHERE created_at < ?", (cutoff,)
+                    ).fetchall()
+                    self._conn.execute("DELETE FROM entries WHERE created_at < ?", (cutoff,))
+                    removed.extend(key_id for key_id, _ in expired)
+                    reclaimed += sum(size for _, size in expired)
+                
+                if max_bytes is not None:
+                    total = self._conn.execute(
+                        "SELECT size_bytes FROM totals WHERE id = 0"
+                    ).fetchone()[0]
+                    victims = []
+                    cursor = self._conn.execute(
+                        f"SELECT key, size FROM entries ORDER BY {order_column}"
+                    )
+                    for key_id, size in cursor:
+                        if total <= max_bytes:
+                            break
+                        victims.append(key_id)
+                        total -= size
+                        reclaimed += size
+                    cursor.close()
+                    self._conn.executemany("DELETE FROM entries WHERE key = ?",
+                                           [(key_id,) for key_id in victims])
+                    removed.extend(victims)
+                
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            if removed:
+                self._conn.execute("PRAGMA incremental_vacuum")
+        
+        return removed, reclaimed
+    
+    def import_files(self, cache_dir: Path, remove: bool = True) -> int:
+        """Import `<md5>.cache` files written by FileCacheStore
+        
+        The file stem already is the hashed key, so entries stay reachable
+        under their original keys. Returns the number of imported entries.
+        """
+        imported = 0
+        batch = []
+        for cache_file in cache_dir.glob("*.cache"):
+            try:
+                data = cache_file.read_bytes()
+                created_at = cache_file.stat().st_mtime
+            except OSError as e:
+                self.logger.warning(f"Could not import cache file {cache_file}: {e}")
+                continue
+            try:
+                header_created_at = read_created_at(data)
+                # Legacy records carry their write time (if any) in the body
+                created_at = header_created_at or decode_record(data)[0]
+            except CorruptRecordError:
+                pass
+            batch.append((cache_file, (cache_file.stem, sqlite3.Binary(data), created_at,
+                                       len(data), created_at)))
+            if len(batch) >= 200:
+                imported += self._import_batch(batch, remove)
+                batch = []
+        if batch:
+            imported += self._import_batch(batch, remove)
+        return imported
+    
+    def _import_batch(self, batch, remove: bool) -> int:
+        """Insert one batch of imported files in a single transaction"""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO entries (key, blob, created_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [row for _, row in batch]
+            )
+            self._conn.execute("COMMIT")
+        if remove:
+            for cache_file, _ in batch:
+                cache_file.unlink()
+        return len(batch)
+    
+    def close(self) -> None:
+        """Close the database connection"""
+        with self._lock:
+            self._conn.close()
+
+
+CACHE_BACKENDS = {
+    FileCacheStore.name: FileCacheStore,
+    SQLiteCacheStore.name: SQLiteCacheStore,
+}
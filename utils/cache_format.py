@@ -0,0 +1,132 @@
+"""
+Binary record format for Podcast CLI cache entries
+
+Every record starts with a fixed 15-byte header:
+
+    magic   3s  b'PCC'
+    version B   format version (currently 1)
+    codec   B   compression codec of the body (none/zlib/lzma)
+    format  B   serialization of the body (marshal/pickle)
+    created d   write time as a Unix timestamp (big-endian float64)
+
+followed by the body. The plain dict/list/str values this app caches are
+serialized with marshal; anything marshal cannot handle falls back to
+pickle. Expiry can be decided from the header alone, without touching
+the body.
+
+Records written by older versions (a pickled {'data', 'timestamp'} dict,
+optionally zlib/lzma compressed behind a b'PCZ' prefix) are still read.
+Older versions never expired records without a timestamp; those count as
+written when they are first read after the upgrade.
+"""
+
+import lzma
+import marshal
+import pickle
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+MAGIC = b'PCC'
+VERSION = 1
+HEADER = struct.Struct('>3sBBBd')
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_LZMA = 2
+
+FORMAT_MARSHAL = 0
+FORMAT_PICKLE = 1
+
+COMPRESSION_CODECS = {
+    'zlib': (CODEC_ZLIB, lambda data, level: zlib.compress(data, level)),
+    'lzma': (CODEC_LZMA, lambda data, level: lzma.compress(data, preset=level)),
+}
+DECOMPRESSORS = {
+    CODEC_NONE: bytes,
+    CODEC_ZLIB: zlib.decompress,
+    CODEC_LZMA: lzma.decompress,
+}
+LOADERS = {
+    FORMAT_MARSHAL: marshal.loads,
+    FORMAT_PICKLE: pickle.loads,
+}
+
+# Prefix and codec ids used by compressed records before this format existed
+LEGACY_COMPRESSED_MAGIC = b'PCZ'
+LEGACY_DECOMPRESSORS = {b'z': zlib.decompress, b'x': lzma.decompress}
+
+
+class CorruptRecordError(ValueError):
+    """Raised when a cache record cannot be decoded"""
+
+
+def encode_record(value: Any, created_at: float, compression: Optional[str] = None,
+                  level: int = 6, threshold: int = 0) -> Tuple[bytes, int]:
+    """Serialize a value into a record
+    
+    Returns the record and the uncompressed body size, which approximates
+    the value's in-memory footprint.
+    """
+    try:
+        body = marshal.dumps(value)
+        body_format = FORMAT_MARSHAL
+    except ValueError:
+        body = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        body_format = FORMAT_PICKLE
+    
+    size = len(body)
+    codec = CODEC_NONE
+    if compression and size >= threshold:
+        codec_id, compress = COMPRESSION_CODECS[compression]
+        compressed = compress(body, level)
+        if len(compressed) < size:
+            body = compressed
+            codec = codec_id
+    
+    return HEADER.pack(MAGIC, VERSION, codec, body_format, created_at) + body, size
+
+
+def read_created_at(record: bytes) -> Optional[float]:
+    """Read the write time from a record header, or None for legacy records"""
+    if not record.startswith(MAGIC):
+        return None
+    if len(record) < HEADER.size:
+        raise CorruptRecordError("Truncated cache record header")
+    return HEADER.unpack_from(record)[4]
+
+
+def decode_record(record: bytes) -> Tuple[float, Any, int]:
+    """Deserialize a record into (created_at, value, body size)"""
+    if not record.startswith(MAGIC):
+        return _decode_legacy(record)
+    if len(record) < HEADER.size:
+        raise CorruptRecordError("Truncated cache record header")
+    
+    _, version, codec, body_format, created_at = HEADER.unpack_from(record)
+    if version != VERSION or codec not in DECOMPRESSORS or body_format not in LOADERS:
+        raise CorruptRecordError(
+            f"Unsupported cache record (version {version}, codec {codec}, format {body_format})"
+        )
+    try:
+        body = DECOMPRESSORS[codec](record[HEADER.size:])
+        return created_at, LOADERS[body_format](body), len(body)
+    except Exception as e:
+        raise CorruptRecordError(f"Could not decode cache record: {e}") from e
+
+
+def _decode_legacy(record: bytes) -> Tuple[float, Any, int]:
+    """Decode a pickled {'data', 'timestamp'} record from older versions"""
+    try:
+        payload = record
+        if record.startswith(LEGACY_COMPRESSED_MAGIC):
+            prefix = len(LEGACY_COMPRESSED_MAGIC)
+            payload = LEGACY_DECOMPRESSORS[record[prefix:prefix + 1]](record[prefix + 1:])
+        cached_data = pickle.loads(payload)
+        timestamp = cached_data.get('timestamp')
+        created_at = timestamp.timestamp() if isinstance(timestamp, datetime) else time.time()
+        return created_at, cached_data.get('data'), len(payload)
+    except Exception as e:
+        raise CorruptRecordError(f"Could not decode legacy cache record: {e}") from e
@@ -0,0 +1,130 @@
+"""
+Per-namespace cache instrumentation for Podcast CLI
+"""
+
+import bisect
+import threading
+from typing import Any, Dict, Optional
+
+# Upper bounds (milliseconds) of the latency histogram buckets; the last
+# bucket collects everything slower
+LATENCY_BUCKETS_MS = [0.05, 0.1, 0.5, 1, 5, 10, 50, 100, 500]
+
+READ_OUTCOMES = ('memory_hit', 'disk_hit', 'miss', 'expired', 'corrupt')
+
+
+def key_namespace(key: str) -> str:
+    """Map a cache key to its namespace, e.g. `episodes_12_10` -> `episodes`"""
+    return key.split('_', 1)[0]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.total_ms = 0.0
+    
+    def record(self, elapsed_ms: float) -> None:
+        """Add one observation"""
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+        self.total_ms += elapsed_ms
+    
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket containing the given percentile
+        
+        Returns None when it falls in the overflow bucket.
+        """
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        threshold = fraction * total
+        running = 0
+        for i, count in enumerate(self.counts[:-1]):
+            running += count
+            if running >= threshold:
+                return LATENCY_BUCKETS_MS[i]
+        return None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable summary of the histogram"""
+        total = sum(self.counts)
+        return {
+            'count': total,
+            'mean_ms': self.total_ms / total if total else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'buckets_ms': LATENCY_BUCKETS_MS + ['inf'],
+            'counts': list(self.counts),
+        }
+
+
+class CacheMetrics:
+    """Counters and latency histograms for cache reads and writes, by key namespace"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Dict[str, Any]] = {}
+    
+    def _namespace(self, key: str) -> Dict[str, Any]:
+        name = key_namespace(key)
+        stats = self._namespaces.get(name)
+        if stats is None:
+            stats = {outcome: 0 for outcome in READ_OUTCOMES}
+            stats.update({
+                'writes': 0,
+                'bytes_read': 0,
+                'bytes_written': 0,
+                'read_latency': LatencyHistogram(),
+                'write_latency': LatencyHistogram(),
+            })
+            self._namespaces[name] = stats
+        return stats
+    
+    def record_read(self, key: str, outcome: str, elapsed_ms: float, size: int = 0) -> None:
+        """Record one `get` and how it was answered"""
+        with self._lock:
+            stats = self._namespace(key)
+            stats[outcome] += 1
+            stats['bytes_read'] += size
+            stats['read_latency'].record(elapsed_ms)
+    
+    def record_write(self, key: str, elapsed_ms: float, size: int) -> None:
+        """Record one `set`"""
+        with self._lock:
+            stats = self._namespace(key)
+            stats['writes'] += 1
+            stats['bytes_written'] += size
+            stats['write_latency'].record(elapsed_ms)
+    
+    def totals(self) -> Dict[str, int]:
+        """Read outcome counts summed over all namespaces"""
+        with self._lock:
+            return {
+                outcome: sum(stats[outcome] for stats in self._namespaces.values())
+                for outcome in READ_OUTCOMES
+            }
+    
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """JSON-serializable copy of all namespace metrics"""
+        with self._lock:
+            result = {}
+            for name, stats in sorted(self._namespaces.items()):
+                hits = stats['memory_hit'] + stats['disk_hit']
+                reads = hits + stats['miss'] + stats['expired'] + stats['corrupt']
+                entry = {outcome: stats[outcome] for outcome in READ_OUTCOMES}
+                entry.update({
+                    'hit_ratio': hits / reads if reads else 0.0,
+                    'writes': stats['writes'],
+                    'bytes_read': stats['bytes_read'],
+                    'bytes_written': stats['bytes_written'],
+                    'read_latency': stats['read_latency'].to_dict(),
+                    'write_latency': stats['write_latency'].to_dict(),
+                })
+                result[name] = entry
+            return result
+    
+    def reset(self) -> None:
+        """Forget all recorded metrics"""
+        with self._lock:
+            self._namespaces.clear()